@@ -1,13 +1,16 @@
 import sys, os, time, cv2, glob
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QFrame
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt, QTimer
-from pyzbar import pyzbar
 
-from modules import paint_model, qr_module, utils
-from modules import hand_module  # MediaPipe wrapper
+from modules import qr_module, qr_scanner, utils, timerlog, boot, paint_worker, best_frame, face_module
+from modules import cpu_budget
+from modules.shared import sampler  # qr-reader/read_qrcode_module/sampler.py (ใช้ร่วมกับ station)
+from modules import hand_module  # MediaPipe wrapper (import mediapipe ตอนสร้าง HandTracker)
+# paint_model (torch) ไม่ถูก import ใน process นี้: AI Paint รันใน worker process (modules/paint_worker.py)
 
 SPACING_X = 10
 
@@ -44,6 +47,8 @@ class MainWindow(QWidget):
         self.countdown_active = False
         self.countdown_start = None
         self.countdown_time = 3  # seconds
+        # เฟรมล่าสุดระหว่างนับถอยหลัง (+3 เฟรมหลังชัตเตอร์) เลือกเฟรมที่คมและแสงดีที่สุด (modules/best_frame.py)
+        self.frame_ring = best_frame.FrameRing(size=int(os.environ.get("KIOS_BEST_FRAMES", "8")), after=3)
 
         # Gesture debounce -> then countdown
         self.gesture_hold_active = False
@@ -56,6 +61,9 @@ class MainWindow(QWidget):
         self._last_key_time = 0                # debounce for key spamming
 
         self.captured_path = None
+        self.paint_src_path = None             # ภาพที่ส่งเข้า paint: crop หน้า หรือ captured_path ถ้าไม่เจอหน้า
+        self.paint_size = 512
+        self.face_paint_size = int(os.environ.get("KIOS_FACE_PAINT_SIZE", "256"))  # โลโก้ใน QR ~115 px
         self.painted_path = None
         self.current_token = None
         self.qr_path = None
@@ -137,32 +145,67 @@ class MainWindow(QWidget):
         body_layout.addWidget(self.right_frame, alignment=Qt.AlignCenter)
         self.setLayout(body_layout)
 
+        # --- Logging init & Process timing (added) ---
+        utils.ensure_dir(LOG_DIR)
+        self.log_path = os.path.join(LOG_DIR, datetime.now().strftime("kios_%Y%m%d.log"))
+        # stage timing: logs/spans_YYYYMMDD.jsonl (python -m modules.timerlog)
+        self.instr = timerlog.Instrument(LOG_DIR, flush_interval=60)
+        self._proc_span = None
+        # Prometheus endpoint (ตั้ง KIOS_METRICS_PORT=9109 เพื่อเปิด): span stats + CPU temp/throttle
+        self.metrics_server = None
+        metrics_port = os.environ.get("KIOS_METRICS_PORT")
+        if metrics_port:
+            try:
+                from modules import metrics
+                self.metrics_server = metrics.serve(self.instr, int(metrics_port))
+                self.log(f"[METRICS] http://localhost:{metrics_port}/metrics")
+            except Exception as e:
+                self.log(f"[METRICS] disabled: {e}")
+        # sampling profiler: กด P / kill -USR1 <pid> / env KIOS_PROFILE=วินาที -> logs/profiles/
+        self.sampler = sampler.install(sampler.StackSampler(os.path.join(LOG_DIR, "profiles"), name="kios"),
+                                       env_prefix="KIOS_PROFILE")
+        # QR decoder สำหรับขั้น capture: env KIOS_QR_DECODER เช่น zbar,wechat (modules/qr_scanner.py)
+        self.qr_decoder = qr_scanner.make_decoder()
+        self.log(f"[QR] decoder: {self.qr_decoder.name}")
+        # --------------------------------------------
+
+        # --- Boot: UI ขึ้นก่อน กล้อง + MediaPipe เปิดขนานกันใน thread เบื้องหลัง ---
+        # เวลา ui/first_frame/ready -> logs/boot_YYYYMMDD.jsonl (python -m modules.boot)
+        self.boot = boot.BootTimer(LOG_DIR)
+        self._boot_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="boot")
+
         # --- Camera (UVC via V4L2 + MJPG) ---
         self.cap = None
         self._cam_fail_count = 0
-        self._open_camera_with_retry()
+        self._cam_future = None
+        self._open_camera_async()
 
         # --- MediaPipe ---
         self.hand_tracker = None
-        try:
-            self.hand_tracker = hand_module.HandTracker(max_hands=1)
-            self.log("[MP] HandTracker initialized OK")
-        except Exception as e:
-            self.log(f"[MP] HandTracker disabled: {e}")
+        self._hand_future = self._boot_pool.submit(self._make_hand_tracker)
+        # Face crop ก่อน paint (ใช้ mediapipe ตัวเดียวกับ HandTracker)
+        self.face_locator = None
+        self._face_future = self._boot_pool.submit(self._make_face_locator)
+
+        # --- AI Paint (torch) : worker process เริ่มเมื่อใช้ ปิดเองเมื่อว่าง KIOS_PAINT_IDLE วินาที ---
+        self.paint = paint_worker.PaintService(log=self.log)
+        self._paint_future = None
+        # progressive: AI เปิด -> QR (โลโก้โหมดเร็ว) ขึ้นทันที แล้วสลับเป็นภาพ AI เมื่อเสร็จ (token เดิม)
+        # KIOS_PROGRESSIVE=0 = รอภาพ AI ก่อนสร้าง QR แบบเดิม
+        self.progressive_paint = os.environ.get("KIOS_PROGRESSIVE", "1") != "0"
+        self._progressive_pending = False
+        self._swap_job = None  # (future, captured_path, token, fast_ms, submitted perf_counter)
+
+        # --- CPU budget: core/thread ของ kiosk (Qt + MediaPipe) กับ paint worker (torch) ตาม state ---
+        self.cpu = cpu_budget.CpuBudget(paint=self.paint, log=self.log)
+        if os.environ.get("KIOS_WARM_PAINT") == "1":
+            self._warm_paint()
 
         # Timer
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(30)
 
-        # --- Logging init & Process timing (added) ---
-        utils.ensure_dir(LOG_DIR)
-        self.log_path = os.path.join(LOG_DIR, datetime.now().strftime("kios_%Y%m%d.log"))
-        self._t_proc_start = None
-        self._t_paint_dur = None
-        self._t_qr_dur = None
-        # --------------------------------------------
-
     # ---------------- Logging functions (added) ----------------
     def log(self, msg: str):
         line = f"[{_ts()}] {msg}"
@@ -172,18 +215,6 @@ class MainWindow(QWidget):
                 f.write(line + "\n")
         except Exception as e:
             print(f"[{_ts()}] [LOG WRITE ERROR] {e}", flush=True)
-
-    def _append_proc_csv(self, total_s: float, paint_s: float, qr_s: float):
-        try:
-            utils.ensure_dir(LOG_DIR)
-            csv_path = os.path.join(LOG_DIR, "proc_times.csv")
-            new_file = not os.path.exists(csv_path)
-            with open(csv_path, "a", encoding="utf-8") as f:
-                if new_file:
-                    f.write("timestamp,total_sec,paint_sec,qr_sec\n")
-                f.write(f"{_ts()},{total_s:.3f},{paint_s:.3f},{qr_s:.3f}\n")
-        except Exception as e:
-            self.log(f"[PROC/CSV] write error: {e}")
     # -----------------------------------------------------------
 
     # ---------- Camera open helpers ----------
@@ -204,10 +235,126 @@ class MainWindow(QWidget):
         for idx in (0, 1):
             cap = self._open_uvc(idx)
             if cap is not None:
-                self.cap = cap
                 self.log(f"[Cam] opened /dev/video{idx} (MJPG, 640x480@30)")
-                return
+                return cap
         self.log("[Cam] cannot open UVC (/dev/video0/1).")
+        return None
+
+    def _open_camera_async(self):
+        """เปิดกล้องใน thread เบื้องหลัง (ไม่ให้ UI ค้างตอน boot/reconnect) ผลรับใน _poll_boot()"""
+        if self._cam_future is None:
+            self._cam_future = self._boot_pool.submit(self._open_camera_with_retry)
+
+    # ---------- Background boot helpers ----------
+    def _make_hand_tracker(self):
+        try:
+            tracker = hand_module.HandTracker(max_hands=1)
+            self.log("[MP] HandTracker initialized OK")
+            return tracker
+        except Exception as e:
+            self.log(f"[MP] HandTracker disabled: {e}")
+            return None
+
+    def _make_face_locator(self):
+        try:
+            locator = face_module.FaceLocator()
+            self.log(f"[FACE] locator: {locator.backend}")
+            return locator if locator.backend else None
+        except Exception as e:
+            self.log(f"[FACE] locator disabled: {e}")
+            return None
+
+    def _prepare_paint_source(self, frame):
+        """crop จัตุรัสรอบหน้าสำหรับขั้น paint (paint_size เล็กลง); ไม่เจอหน้า -> ภาพเต็มแบบเดิม"""
+        self.paint_src_path, self.paint_size = self.captured_path, 512
+        if self.face_locator is None:
+            return
+        with self.instr.span("face") as sp:
+            try:
+                box = self.face_locator.locate(frame)
+            except Exception as e:
+                self.log(f"[FACE] locate error: {e}")
+                box = None
+            if box is not None:
+                crop = face_module.crop_square(frame, box)
+                self.paint_src_path = os.path.join("output/raw", utils.timestamp_name("face", "jpg"))
+                cv2.imwrite(self.paint_src_path, crop)
+                self.paint_size = self.face_paint_size
+        if box is None:
+            self.log(f"[PROC] face: not found ({sp.wall_ms:.1f} ms) -> paint full frame")
+        else:
+            self.log(f"[PROC] face {box} -> crop {crop.shape[1]}x{crop.shape[0]}, paint {self.paint_size}px "
+                     f"({sp.wall_ms:.1f} ms, {self.face_locator.backend})")
+
+    def _warm_paint_worker(self):
+        t0 = time.perf_counter()
+        try:
+            self.paint.warm(style=self.current_style, size=512)
+            self.log(f"[AI] paint worker ready in {time.perf_counter() - t0:.1f}s (worker RSS {self.paint.worker_rss_mb()} MB)")
+        except Exception as e:
+            self.log(f"[AI] paint worker warm failed: {e}")
+
+    def _warm_paint(self):
+        """เริ่ม paint worker + โหลดโมเดลใน thread เบื้องหลัง (ทุกครั้งที่เปิด AI Paint เผื่อ worker ถูกปิดไปแล้ว)"""
+        if self._paint_future is None or self._paint_future.done():
+            self._paint_future = self._boot_pool.submit(self._warm_paint_worker)
+
+    def _paint_and_qr(self, src_path, size, token):
+        """(thread เบื้องหลัง) ภาพ AI + QR ของ token เดิม -> (painted, qr, paint_ms, qr_ms)"""
+        with self.instr.span("paint_ai") as sp:
+            painted = self.paint.generate_paint(src_path, style=self.current_style, size=size)
+        self.instr.record(f"paint_ai@{self.cpu.current}", sp.wall_ms)
+        with self.instr.span("qr_ai") as sq:
+            qr_path = qr_module.generate_qr_with_logo(
+                token, painted, output_dir="output/qr_ai", logo_scale=0.31, border_ratio=0.032
+            )
+        return painted, qr_path, sp.wall_ms, sq.wall_ms
+
+    def _poll_paint_swap(self):
+        """เรียกจาก UI thread: ภาพ AI เสร็จ -> แทน QR บนจอ (ถ้ายังเป็นผู้ใช้คนเดิม)"""
+        if self._swap_job is None or not self._swap_job[0].done():
+            return
+        future, captured_path, token, fast_ms, submitted = self._swap_job
+        self._swap_job = None
+        try:
+            painted, qr_path, paint_ms, qr_ms = future.result()
+        except Exception as e:
+            self.log(f"[Flow] progressive AI paint failed -> keep fast QR: {e}")
+            return
+        if token != self.current_token or captured_path != self.captured_path:
+            self.log(f"[Flow] progressive AI result for old token {token} dropped")
+            return
+        self.painted_path, self.qr_path = painted, qr_path
+        self._qr_thumb_cache_img = None
+        self.lbl_qr.setPixmap(QPixmap(self.qr_path).scaled(300, 300, Qt.KeepAspectRatio))
+        ai_ms = paint_ms + qr_ms
+        self.instr.record("proc_swap", ai_ms)
+        swap_ms = fast_ms + (time.perf_counter() - submitted) * 1000.0
+        self.log(f"[PROC] progressive swap token {token}: fast QR {fast_ms / 1000.0:.3f}s, "
+                 f"AI QR {ai_ms / 1000.0:.3f}s (paint {paint_ms / 1000.0:.3f}s + qr {qr_ms / 1000.0:.3f}s), "
+                 f"swapped {swap_ms / 1000.0:.3f}s after capture")
+
+    def _poll_boot(self):
+        """เรียกทุกเฟรมจาก UI thread: รับผลจาก thread เบื้องหลัง + บันทึกเวลา boot"""
+        self.boot.mark("ui")
+        if self._cam_future is not None and self._cam_future.done():
+            self.cap = self._cam_future.result()
+            self._cam_future = None
+            if self.cap is not None:
+                self.boot.mark("camera")
+        if self._face_future is not None and self._face_future.done():
+            self.face_locator = self._face_future.result()
+            self._face_future = None
+        if self._hand_future is not None and self._hand_future.done():
+            self.hand_tracker = self._hand_future.result()
+            self._hand_future = None
+            self.boot.mark("hand")
+        if "first_frame" in self.boot and "hand" in self.boot and "ready" not in self.boot:
+            self.boot.mark("ready")
+            self.log(f"[BOOT] {self.boot.summary()}")
+            self.boot.write(ai_paint_warm=self._paint_future is not None)
+            if os.environ.get("KIOS_BOOT_EXIT") == "1":  # python -m modules.boot --runs N
+                self.close()
 
     # ---------- Helper: draw HUD (toggles/status) ----------
     def _draw_hud(self, frame_bgr):
@@ -324,6 +471,7 @@ class MainWindow(QWidget):
         self.countdown_start = None
         self.gesture_hold_active = False
         self.gesture_hold_start = None
+        self.frame_ring.clear()
         self.cleanup_output()
         self.lbl_uuid.setText("uuid : ")
         self.lbl_qr.setText("[ QR CODE ]")
@@ -331,18 +479,36 @@ class MainWindow(QWidget):
         self.state = "take_pic"
         self.log("[Action] Restart to initial state")
 
+    def _cpu_profile(self):
+        if self.state in ("generate_paint", "generate_qr") or self._swap_job is not None:
+            return "painting"
+        if self.state == "take_pic" and self.hand_tracker is not None:
+            return "tracking"
+        return "idle"
+
     def update_frame(self):
+        # สลับ profile ตอนเปลี่ยน state (apply ไม่ทำอะไรถ้า profile เดิม)
+        self.cpu.apply(self._cpu_profile())
+        with self.instr.span("frame", memory=False) as sp:
+            self._update_frame()
+        self.instr.record(f"frame@{self.cpu.current}", sp.wall_ms)
+
+    def _update_frame(self):
+        self._poll_boot()
+        self._poll_paint_swap()
         if self.cap is None:
             show_frame = self._blank_canvas(640, 480)
-            cv2.putText(show_frame, "ไม่พบกล้อง / กล้องไม่พร้อม", (40, 240),
+            msg = "กำลังเปิดกล้อง..." if self._cam_future is not None else "ไม่พบกล้อง / กล้องไม่พร้อม"
+            cv2.putText(show_frame, msg, (40, 240),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2, cv2.LINE_AA)
             rgb = cv2.cvtColor(show_frame, cv2.COLOR_BGR2RGB)
             img = QImage(rgb.data, rgb.shape[1], rgb.shape[0], rgb.shape[1]*3, QImage.Format_RGB888)
             self.lbl_camera.setPixmap(QPixmap.fromImage(img))
-            self._open_camera_with_retry()
+            self._open_camera_async()
             return
 
-        ret, frame = self.cap.read()
+        with self.instr.span("capture", memory=False):
+            ret, frame = self.cap.read()
         if not ret or frame is None or frame.size == 0:
             self._cam_fail_count += 1
             if self._cam_fail_count >= 10:
@@ -352,7 +518,7 @@ class MainWindow(QWidget):
                 except:
                     pass
                 self.cap = None
-                self._open_camera_with_retry()
+                self._open_camera_async()
                 self._cam_fail_count = 0
 
             show_frame = self._blank_canvas(640, 480)
@@ -364,6 +530,7 @@ class MainWindow(QWidget):
             return
         else:
             self._cam_fail_count = 0
+            self.boot.mark("first_frame")
 
         if self.preview_enabled:
             show_frame = frame.copy()
@@ -377,7 +544,8 @@ class MainWindow(QWidget):
         if self.state == "take_pic" and self.hand_tracker is not None:
             try:
                 _proc_frame = frame if frame is not None else np.zeros((480,640,3), dtype=np.uint8)
-                proc_vis, hand_info = self.hand_tracker.process(_proc_frame, draw=self.preview_enabled)
+                with self.instr.span("hand", memory=False):
+                    proc_vis, hand_info = self.hand_tracker.process(_proc_frame, draw=self.preview_enabled)
 
                 if self.preview_enabled:
                     show_frame = proc_vis
@@ -448,49 +616,57 @@ class MainWindow(QWidget):
                     (tw, th), _ = cv2.getTextSize(count_text, cv2.FONT_HERSHEY_SIMPLEX, 2, 4)
                     cv2.putText(show_frame, count_text, (w//2 - tw//2, h//2 + th//2),
                                 cv2.FONT_HERSHEY_SIMPLEX, 2, (0,255,0), 4, cv2.LINE_AA)
-                else:
+                with self.instr.span("frame_score", memory=False):
+                    self.frame_ring.push(frame)
+                if remaining <= 0:
+                    self.frame_ring.shutter()
+                if self.frame_ring.ready:
+                    best, info = self.frame_ring.best()
+                    self.frame_ring.clear()
                     utils.ensure_dir("output/raw")
                     self.captured_path = os.path.join("output/raw", utils.timestamp_name("capture", "jpg"))
-                    cv2.imwrite(self.captured_path, frame)
+                    cv2.imwrite(self.captured_path, best)
                     self.log(f"[Flow] saved raw (countdown): {self.captured_path}")
+                    self._prepare_paint_source(best)
+                    self.log(f"[PROC] best frame {info['index'] + 1}/{info['count']} score {info['score']:.0f} "
+                             f"(sharp {info['sharpness']:.0f}, expo {info['exposure']:.2f}; last frame {info['last_score']:.0f}) "
+                             f"{info['age_ms']:.0f} ms before last, scoring {info['score_ms']:.2f} ms/frame")
                     self.state = "generate_paint"
                     self.countdown_active = False
 
                     # === START MAIN PROCESS TIMER (capture -> QR) ===
-                    self._t_proc_start = time.time()
-                    self._t_paint_dur = None
-                    self._t_qr_dur = None
+                    self._proc_span = self.instr.begin("proc")
 
         elif self.state == "generate_paint":
             self.lbl_state.setText(f"กำลังสร้างภาพสำหรับฝังใน QR... ({'AI เปิด' if self.ai_paint_enabled else 'โหมดเร็ว'})")
+            # progressive: ใช้โลโก้โหมดเร็วก่อน ภาพ AI ทำต่อเบื้องหลังหลังได้ token (ขั้น generate_qr)
+            self._progressive_pending = self.ai_paint_enabled and self.progressive_paint
             try:
-                t0 = time.time()  # timing
-                if self.ai_paint_enabled:
-                    self.painted_path = paint_model.generate_paint(self.captured_path, style=self.current_style, size=512)
-                    self.log(f"[Flow] paint saved: {self.painted_path}")
-                else:
-                    self.painted_path = self._fast_make_painted(self.captured_path, target_size=512)
-                    self.log(f"[Flow] fast-painted saved: {self.painted_path}")
-                self._t_paint_dur = time.time() - t0
-                self.log(f"[PROC] paint duration: {self._t_paint_dur:.3f}s")
+                with self.instr.span("paint_ai" if self.ai_paint_enabled and not self._progressive_pending else "paint_fast") as sp:
+                    if self.ai_paint_enabled and not self._progressive_pending:
+                        self.painted_path = self.paint.generate_paint(self.paint_src_path, style=self.current_style, size=self.paint_size)
+                        self.log(f"[Flow] paint saved: {self.painted_path}")
+                    else:
+                        self.painted_path = self._fast_make_painted(self.paint_src_path, target_size=512)
+                        self.log(f"[Flow] fast-painted saved: {self.painted_path}")
+                self.log(f"[PROC] paint duration: {sp.wall_ms / 1000.0:.3f}s (cpu {sp.cpu_ms / 1000.0:.3f}s)")
+                self.instr.record(f"paint@{self.cpu.current}", sp.wall_ms)
             except Exception as e:
                 self.log(f"[Flow] paint step error -> fallback to fast: {e}")
-                t0 = time.time()  # timing fallback
-                self.painted_path = self._fast_make_painted(self.captured_path, target_size=512)
-                self._t_paint_dur = time.time() - t0
-                self.log(f"[PROC] paint duration (fallback fast): {self._t_paint_dur:.3f}s")
+                with self.instr.span("paint_fallback") as sp:
+                    self.painted_path = self._fast_make_painted(self.paint_src_path, target_size=512)
+                self.log(f"[PROC] paint duration (fallback fast): {sp.wall_ms / 1000.0:.3f}s")
 
             self.state = "generate_qr"
 
         elif self.state == "generate_qr":
             self.lbl_state.setText("ถ่ายรูปแผ่นทางด้านซ้าย และนำ QR code มาตรวจสอบกับกล้อง")
-            t1 = time.time()  # timing qr
-            self.current_token = qr_module.gen_token(22)
-            self.qr_path = qr_module.generate_qr_with_logo(
-                self.current_token, self.painted_path, logo_scale=0.31, border_ratio=0.032
-            )
-            self._t_qr_dur = time.time() - t1
-            self.log(f"[PROC] qr generation duration: {self._t_qr_dur:.3f}s")
+            with self.instr.span("qr") as sp:
+                self.current_token = qr_module.gen_token(22)
+                self.qr_path = qr_module.generate_qr_with_logo(
+                    self.current_token, self.painted_path, logo_scale=0.31, border_ratio=0.032
+                )
+            self.log(f"[PROC] qr generation duration: {sp.wall_ms / 1000.0:.3f}s")
 
             self.log(f"[Flow] token: {self.current_token}")
             self.lbl_uuid.setText(f"uuid : {self.current_token}")
@@ -500,26 +676,30 @@ class MainWindow(QWidget):
                 self._draw_qr_image_preview(show_frame, box_size=256)
 
             # === TOTAL (capture -> QR done) ===
-            if self._t_proc_start is not None:
-                total = time.time() - self._t_proc_start
-                paint_s = self._t_paint_dur or 0.0
-                qr_s = self._t_qr_dur or 0.0
-                self.log(f"[PROC] capture->qr TOTAL: {total:.3f}s (paint={paint_s:.3f}s, qr={qr_s:.3f}s)")
-                self._append_proc_csv(total, paint_s, qr_s)
+            total_ms = sp.wall_ms
+            if self._proc_span is not None:
+                total_ms = self._proc_span.end()
+                self._proc_span = None
+                self.log(f"[PROC] capture->qr TOTAL: {total_ms / 1000.0:.3f}s")
+
+            if self._progressive_pending:
+                self._progressive_pending = False
+                future = self._boot_pool.submit(self._paint_and_qr, self.paint_src_path, self.paint_size, self.current_token)
+                self._swap_job = (future, self.captured_path, self.current_token, total_ms, time.perf_counter())
+                self.log("[Flow] fast QR shown, AI paint running in background")
 
             self.state = "capture"
 
         elif self.state == "capture":
             self.lbl_state.setText("ถ่ายรูปแผ่นทางด้านซ้าย และนำ QR code มาตรวจสอบกับกล้อง \nหากสแกนไม่ติดลองปรับความสว่าง")
 
-            qrcodes = pyzbar.decode(frame)
-            for qr in qrcodes:
-                (x, y, w, h) = qr.rect
+            with self.instr.span("verify", memory=False):
+                qrcodes = self.qr_decoder(frame)
+            for token_text, (x, y, w, h) in qrcodes:
                 if self.preview_enabled:
                     cv2.rectangle(show_frame, (x, y), (x+w, y+h), (0,0,255), 2)
                     cv2.putText(show_frame, "Wrong QR!", (x, y-10),
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255), 2)
-                token_text = qr.data.decode("utf-8")
                 if token_text == self.current_token:
                     self.log("[Flow] QR matched -> reset")
                     self.cleanup_output()
@@ -538,11 +718,12 @@ class MainWindow(QWidget):
         self.lbl_camera.setPixmap(QPixmap.fromImage(img))
 
     def cleanup_output(self):
-        for folder in ["output/raw", "output/paint", "output/qr"]:
+        for folder in ["output/raw", "output/paint", "output/qr", "output/qr_ai"]:
             for f in glob.glob(os.path.join(folder, "*")):
                 try: os.remove(f)
                 except: pass
         self.captured_path = None
+        self.paint_src_path = None
         self.painted_path = None
         self.qr_path = None
         self.current_token = None
@@ -577,6 +758,8 @@ class MainWindow(QWidget):
                 self.ai_paint_enabled = not self.ai_paint_enabled
                 self._last_key_time = now
                 self.log(f"[Key] Toggle AI Paint -> {'ON' if self.ai_paint_enabled else 'OFF'}")
+                if self.ai_paint_enabled:
+                    self._warm_paint()
 
         elif event.key() == Qt.Key_Q:
             if now - self._last_key_time > 0.15:
@@ -589,6 +772,12 @@ class MainWindow(QWidget):
                 self._last_key_time = now
                 self._reset_to_initial()
 
+        elif event.key() == Qt.Key_P:
+            if now - self._last_key_time > 0.15:
+                self._last_key_time = now
+                self.log(f"[Key] Profiler -> {'STOP' if self.sampler.running else 'START'}")
+                self.sampler.toggle()
+
         elif event.key() == Qt.Key_Escape:
             self.close()
 
@@ -598,6 +787,11 @@ class MainWindow(QWidget):
                 self.cap.release()
         except:
             pass
+        self.instr.flush()
+        if self.sampler.running:
+            self.sampler.stop()
+        self._boot_pool.shutdown(wait=False)
+        self.paint.close()
 
 
 if __name__ == "__main__":
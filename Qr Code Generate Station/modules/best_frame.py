@@ -0,0 +1,119 @@
+# modules/best_frame.py
+# เลือกเฟรมที่ดีที่สุดรอบจังหวะชัตเตอร์ (แทนการบันทึกเฟรมเดียวตอนนับถอยหลังถึง 0)
+# ลดการถ่ายใหม่ (R) เพราะภาพเบลอ/กะพริบตา/แสงวูบ
+#
+#   score = ความคมชัด (Laplacian variance ของ luma ที่ย่อเหลือด้านยาว ~160 px)
+#           x ค่าแสง (ค่าเฉลี่ยใกล้ 128 และมี pixel ขาว/ดำจัดน้อย)
+#
+#   python -m modules.best_frame [ภาพ.jpg ...]    # เวลา score ต่อเฟรม (ไม่ใส่ภาพ = ภาพสังเคราะห์ 640x480)
+import argparse
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+SCORE_SIDE = 160
+
+
+def score_frame(frame_bgr, side=SCORE_SIDE):
+    """(score, sharpness, exposure) ของเฟรม BGR; ย่อก่อนแปลงเป็น gray ให้ใช้เวลาไม่ถึง 1 ms"""
+    h, w = frame_bgr.shape[:2]
+    scale = side / float(max(h, w))
+    small = cv2.resize(frame_bgr, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    luma = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    sharpness = float(cv2.Laplacian(luma, cv2.CV_32F).var())
+    mean = float(luma.mean())
+    clipped = np.count_nonzero((luma < 8) | (luma > 247)) / float(luma.size)
+    exposure = max(0.0, 1.0 - abs(mean - 128.0) / 128.0) * (1.0 - clipped)
+    return sharpness * exposure, sharpness, exposure
+
+
+class FrameRing:
+    """
+    เก็บ N เฟรมล่าสุดพร้อม score (score ตอน push กระจายเวลาไปทีละเฟรม)
+    shutter() เริ่มนับเฟรมหลังชัตเตอร์ after เฟรม แล้ว ready จึงเลือก best()
+    """
+
+    def __init__(self, size=8, after=3, side=SCORE_SIDE):
+        self.frames = deque(maxlen=size)  # (score, sharpness, exposure, t, frame)
+        self.after = after
+        self.side = side
+        self.score_ms = deque(maxlen=256)
+        self._after_left = None
+
+    def push(self, frame_bgr, t=None):
+        t0 = time.perf_counter()
+        score, sharpness, exposure = score_frame(frame_bgr, self.side)
+        self.score_ms.append((time.perf_counter() - t0) * 1000.0)
+        self.frames.append((score, sharpness, exposure, time.time() if t is None else t, frame_bgr))
+        if self._after_left:
+            self._after_left -= 1
+
+    def shutter(self):
+        if self._after_left is None:
+            self._after_left = self.after
+
+    @property
+    def shooting(self):
+        return self._after_left is not None
+
+    @property
+    def ready(self):
+        return self._after_left == 0
+
+    def best(self):
+        """(frame, info) ของเฟรม score สูงสุด; info มี index/จำนวน/score ไว้ log"""
+        if not self.frames:
+            return None, None
+        i = max(range(len(self.frames)), key=lambda k: self.frames[k][0])
+        score, sharpness, exposure, t, frame = self.frames[i]
+        last = self.frames[-1]
+        info = dict(index=i, count=len(self.frames), score=score, sharpness=sharpness, exposure=exposure,
+                    age_ms=(last[3] - t) * 1000.0, last_score=last[0], score_ms=self.mean_score_ms())
+        return frame, info
+
+    def mean_score_ms(self):
+        return sum(self.score_ms) / len(self.score_ms) if self.score_ms else 0.0
+
+    def clear(self):
+        self.frames.clear()
+        self._after_left = None
+
+
+# ---------------- Benchmark CLI ----------------
+def _synthetic(rng, size=(480, 640)):
+    h, w = size
+    img = cv2.resize(rng.integers(0, 256, (h // 16, w // 16, 3), dtype=np.uint8), (w, h), interpolation=cv2.INTER_CUBIC)
+    for _ in range(40):
+        p = tuple(int(v) for v in rng.integers(0, min(h, w), 2))
+        cv2.circle(img, p, int(rng.integers(4, 40)), tuple(int(v) for v in rng.integers(0, 256, 3)), 2)
+    return img
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Best-frame scoring cost and ranking")
+    parser.add_argument("images", nargs="*", help="frames to score (default: synthetic 640x480)")
+    parser.add_argument("--side", type=int, default=SCORE_SIDE)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.images:
+        frames = [(p, cv2.imread(p)) for p in args.images]
+        frames = [(p, f) for p, f in frames if f is not None]
+    else:
+        base = _synthetic(np.random.default_rng(0))
+        frames = [("sharp", base), ("blur 5", cv2.GaussianBlur(base, (5, 5), 0)),
+                  ("blur 11", cv2.GaussianBlur(base, (11, 11), 0)),
+                  ("dark", cv2.convertScaleAbs(base, alpha=0.3)), ("washed", cv2.convertScaleAbs(base, alpha=0.5, beta=150))]
+    print(f"{'frame':<24}{'score':>10}{'sharp':>10}{'expo':>7}{'ms':>8}")
+    for name, frame in frames:
+        t0 = time.perf_counter()
+        for _ in range(args.repeats):
+            score, sharpness, exposure = score_frame(frame, args.side)
+        ms = (time.perf_counter() - t0) * 1000.0 / args.repeats
+        print(f"{name[-24:]:<24}{score:>10.1f}{sharpness:>10.1f}{exposure:>7.2f}{ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
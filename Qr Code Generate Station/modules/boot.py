@@ -0,0 +1,165 @@
+# modules/boot.py
+# เวลา boot ของ kiosk (kiosk ถูกปิด/เปิดไฟบ่อยระหว่างงาน) นับจากตอน process เริ่ม:
+#   ui          หน้าต่างขึ้นและ update_frame รอบแรกทำงาน
+#   camera      เปิดกล้องเสร็จ (thread เบื้องหลัง)
+#   hand        MediaPipe HandTracker พร้อม (thread เบื้องหลัง ขนานกับกล้อง)
+#   first_frame เฟรมแรกจากกล้องขึ้นจอ
+#   ready       กล้อง + HandTracker พร้อม (ยกนิ้วโป้งได้แล้ว)
+# แต่ละ boot ต่อท้าย logs/boot_YYYYMMDD.jsonl
+#
+#   python -m modules.boot                 # สรุปเวลา boot จาก log
+#   python -m modules.boot --runs 5        # เปิด main.py 5 รอบ (offscreen, ปิดเองเมื่อ ready) แล้วสรุป
+#   python -m modules.boot --imports       # เวลา import ของ dependency หนักๆ (process ใหม่ทุกตัว)
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+MARKS = ("ui", "camera", "hand", "first_frame", "ready")
+HEAVY_IMPORTS = ("numpy", "cv2", "PyQt5.QtWidgets", "qrcode", "PIL.Image", "mediapipe", "torch",
+                 "modules.paint_model")
+
+
+def process_age():
+    """วินาทีตั้งแต่ process เริ่ม (Linux: /proc/self/stat) รวมเวลา start interpreter + import; อย่างอื่นคืน None"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class BootTimer:
+    def __init__(self, log_dir="logs"):
+        self.log_dir = log_dir
+        age = process_age()
+        # perf_counter ณ ตอน process เริ่ม (ถ้าไม่รู้ ใช้ตอนสร้าง BootTimer)
+        self.t0 = time.perf_counter() - (age or 0.0)
+        self.marks = {}
+        self.written = False
+
+    def mark(self, name):
+        """บันทึกครั้งแรกเท่านั้น คืนวินาทีตั้งแต่ process เริ่ม (None ถ้าเคย mark แล้ว)"""
+        if name in self.marks:
+            return None
+        self.marks[name] = time.perf_counter() - self.t0
+        return self.marks[name]
+
+    def __contains__(self, name):
+        return name in self.marks
+
+    def summary(self):
+        return "  ".join(f"{name} {self.marks[name]:.2f}s" for name in MARKS if name in self.marks)
+
+    def write(self, **extra):
+        if self.written:
+            return
+        self.written = True
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = os.path.join(self.log_dir, f"boot_{datetime.now().strftime('%Y%m%d')}.jsonl")
+            row = dict(ts=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **{k: round(v, 3) for k, v in self.marks.items()})
+            row.update(extra)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+        except Exception as e:
+            print(f"[boot] write error: {e}", flush=True)
+
+
+# ---------------- Benchmark CLI ----------------
+def load_boots(paths):
+    rows = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return rows
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def format_boots(rows):
+    lines = [f"{len(rows)} boots", f"{'mark':<14}{'count':>7}{'p50 s':>9}{'p95 s':>9}{'max s':>9}"]
+    for name in MARKS:
+        values = [r[name] for r in rows if name in r]
+        if values:
+            lines.append(f"{name:<14}{len(values):>7}{_pct(values, 50):>9.2f}{_pct(values, 95):>9.2f}{max(values):>9.2f}")
+    return "\n".join(lines)
+
+
+def run_boots(runs, log_dir, timeout=120.0):
+    """เปิด main.py runs รอบ ให้ปิดตัวเองเมื่อ ready (KIOS_BOOT_EXIT=1) คืนแถวของรอบเหล่านั้น"""
+    env = dict(os.environ, KIOS_BOOT_EXIT="1")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    rows = []
+    for i in range(runs):
+        before = sum(len(load_boots([p])) for p in glob.glob(os.path.join(log_dir, "boot_*.jsonl")))
+        t0 = time.perf_counter()
+        try:
+            subprocess.run([sys.executable, "main.py"], env=env, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.TimeoutExpired:
+            print(f"run {i + 1}: not ready after {timeout:.0f}s")
+            continue
+        wall = time.perf_counter() - t0
+        all_rows = load_boots(sorted(glob.glob(os.path.join(log_dir, "boot_*.jsonl"))))
+        if len(all_rows) > before:
+            rows.append(all_rows[-1])
+            print(f"run {i + 1}: {wall:.2f}s to exit | " +
+                  "  ".join(f"{k} {all_rows[-1][k]:.2f}s" for k in MARKS if k in all_rows[-1]))
+    return rows
+
+
+def measure_imports(modules=HEAVY_IMPORTS):
+    """[(module, วินาที หรือ None ถ้า import ไม่ได้)] แต่ละตัวใน python process ใหม่ (ไม่มี cache ใน process)"""
+    results = []
+    for name in modules:
+        code = f"import time; t = time.perf_counter(); import {name}; print(time.perf_counter() - t)"
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        results.append((name, float(proc.stdout.strip()) if proc.returncode == 0 else None))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiosk boot timing: time-to-first-frame / time-to-ready")
+    parser.add_argument("day", nargs="?", default=None, help="YYYYMMDD or a boot_*.jsonl file (default: every day)")
+    parser.add_argument("--log-dir", default="./logs")
+    parser.add_argument("--runs", type=int, default=0, help="launch main.py this many times and report those boots")
+    parser.add_argument("--imports", action="store_true", help="time each heavy import in a fresh interpreter")
+    args = parser.parse_args()
+
+    if args.imports:
+        print(f"{'import':<24}{'seconds':>9}")
+        for name, sec in measure_imports():
+            print(f"{name:<24}{sec:>9.2f}" if sec is not None else f"{name:<24}{'n/a':>9}")
+        print("mediapipe / torch / modules.paint_model are no longer imported before the window opens")
+    if args.runs:
+        rows = run_boots(args.runs, args.log_dir)
+    elif not args.imports:
+        day = args.day or "*"
+        paths = [args.day] if args.day and os.path.exists(args.day) else \
+            sorted(glob.glob(os.path.join(args.log_dir, f"boot_{day}.jsonl")))
+        rows = load_boots(paths)
+    else:
+        return
+    if not rows:
+        print(f"no boot log in {args.log_dir}")
+        raise SystemExit(1)
+    print(format_boots(rows))
+
+
+if __name__ == "__main__":
+    main()
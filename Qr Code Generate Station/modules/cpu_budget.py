@@ -0,0 +1,191 @@
+# modules/cpu_budget.py
+# แบ่ง core ให้ Qt/MediaPipe (process kiosk) กับ torch (paint worker) ตาม state ของ MainWindow
+# ไม่ให้แย่ง core กันตอน paint (torch ใช้ทุก core เป็นค่าเริ่มต้น + thread pool ของ MediaPipe + Qt)
+#
+#   profile     state                                      ค่าเริ่มต้นบน Pi 4 core
+#   tracking    take_pic (HandTracker ทำงาน)                kiosk core 0-2, worker core 3 (torch 1 thread)
+#   painting    generate_paint / generate_qr / รอภาพ AI      kiosk core 0 (cv2 1 thread), worker core 1-3 (torch 3)
+#   idle        capture (ตรวจ QR) และอื่นๆ                   ทุก core, torch 2
+#
+#   ค่าเอง: KIOS_CPU_PROFILES=cpu_profiles.json  {"painting": {"ui_cores": [0], "cv_threads": 1,
+#           "paint_cores": [1, 2, 3], "torch_threads": 3}, ...}   (ไม่ระบุ cores = ไม่ตั้ง affinity)
+#   KIOS_CPU_AFFINITY=0 ตั้งแค่จำนวน thread   KIOS_CPU_BUDGET=0 ปิดทั้งหมด
+#
+#   python -m modules.cpu_budget --bench output/raw/capture.jpg   # เวลาเฟรม UI + เวลา paint ต่อ profile
+# เวลาจริงบน kiosk: span frame@<profile> / paint@<profile> ใน python -m modules.timerlog
+import argparse
+import json
+import os
+import threading
+import time
+
+import cv2
+
+PROFILE_KEYS = ("ui_cores", "cv_threads", "paint_cores", "torch_threads")
+
+
+def default_profiles(n=None):
+    n = n or os.cpu_count() or 1
+    cores = list(range(n))
+    if n >= 4:
+        return {
+            "idle": dict(ui_cores=cores, cv_threads=2, paint_cores=cores, torch_threads=n // 2),
+            "tracking": dict(ui_cores=cores[:-1], cv_threads=2, paint_cores=cores[-1:], torch_threads=1),
+            "painting": dict(ui_cores=cores[:1], cv_threads=1, paint_cores=cores[1:], torch_threads=n - 1),
+        }
+    # core น้อย: affinity ไม่ช่วย ตั้งแค่จำนวน thread
+    return {
+        "idle": dict(ui_cores=None, cv_threads=1, paint_cores=None, torch_threads=n),
+        "tracking": dict(ui_cores=None, cv_threads=1, paint_cores=None, torch_threads=1),
+        "painting": dict(ui_cores=None, cv_threads=1, paint_cores=None, torch_threads=max(1, n - 1)),
+    }
+
+
+def off_profile(n=None):
+    """ค่าเริ่มต้นของแต่ละ library (เหมือนไม่มี cpu_budget) ใช้เทียบใน --bench"""
+    n = n or os.cpu_count() or 1
+    return dict(ui_cores=list(range(n)), cv_threads=-1, paint_cores=list(range(n)), torch_threads=n)
+
+
+def load_profiles(path=None):
+    profiles = default_profiles()
+    path = path or os.environ.get("KIOS_CPU_PROFILES")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, row in json.load(f).items():
+                profiles[name] = {k: row.get(k, profiles.get(name, {}).get(k)) for k in PROFILE_KEYS}
+    return profiles
+
+
+def set_thread_affinity(pid, cores):
+    """ตั้ง affinity ให้ทุก thread ของ process (sched_setaffinity ของ Linux มีผลทีละ thread)"""
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return False
+    cores = {c for c in cores if c < (os.cpu_count() or 1)}
+    if not cores:
+        return False
+    try:
+        tids = [int(t) for t in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        tids = [pid]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cores)
+        except OSError:
+            pass  # thread จบไปแล้ว / core ไม่มีในเครื่อง
+    return True
+
+
+class CpuBudget:
+    def __init__(self, profiles=None, paint=None, log=print, affinity=None, enabled=None):
+        self.profiles = profiles or load_profiles()
+        self.paint = paint
+        self.log = log
+        if affinity is None:
+            affinity = os.environ.get("KIOS_CPU_AFFINITY", "1") != "0"
+        self.affinity = affinity and hasattr(os, "sched_setaffinity")
+        self.enabled = os.environ.get("KIOS_CPU_BUDGET", "1") != "0" if enabled is None else enabled
+        self.current = None
+        self.switches = 0
+
+    def apply(self, name, profile=None):
+        """สลับไป profile name (ไม่ทำอะไรถ้าเป็น profile เดิม) คืน True ถ้าสลับ"""
+        if not self.enabled or name == self.current:
+            return False
+        p = profile or self.profiles.get(name)
+        if p is None:
+            return False
+        cv2.setNumThreads(int(p["cv_threads"]))
+        if self.affinity and p.get("ui_cores"):
+            set_thread_affinity(os.getpid(), p["ui_cores"])
+        if self.paint is not None:
+            self.paint.set_budget(p.get("paint_cores") if self.affinity else None, p.get("torch_threads"))
+        self.current = name
+        self.switches += 1
+        self.log(f"[CPU] profile {name}: kiosk cores {p.get('ui_cores') if self.affinity else 'all'} "
+                 f"cv2 {p['cv_threads']} | paint cores {p.get('paint_cores') if self.affinity else 'all'} "
+                 f"torch {p.get('torch_threads')}")
+        return True
+
+
+# ---------------- Benchmark CLI ----------------
+def _ui_work(frame, tracker=None):
+    """งานต่อเฟรมของ UI: HandTracker ถ้ามี mediapipe ไม่งั้นงาน cv2 ขนาดใกล้เคียง (resize/cvt/blur/score)"""
+    if tracker is not None:
+        tracker.process(frame, draw=False)
+        return
+    small = cv2.resize(frame, (640, 480), interpolation=cv2.INTER_LINEAR)
+    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    cv2.GaussianBlur(rgb, (9, 9), 0)
+    cv2.Laplacian(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), cv2.CV_32F).var()
+
+
+def bench(image, names, seconds, style, size, painter, fps=30):
+    from modules import paint_worker
+    frame = cv2.imread(image)
+    if frame is None:
+        raise SystemExit(f"cannot read {image}")
+    tracker = None
+    try:
+        from modules import hand_module
+        tracker = hand_module.HandTracker(max_hands=1)
+    except Exception:
+        pass
+    service = paint_worker.PaintService(idle_timeout=3600, painter=painter, log=lambda msg: None)
+    budget = CpuBudget(paint=service, log=lambda msg: None, enabled=True)
+    profiles = dict(budget.profiles, off=off_profile())
+    print(f"{os.cpu_count()} cores, UI work: {'HandTracker' if tracker else 'cv2 stand-in'}, paint via {painter} "
+          f"{size}px, {seconds:.0f}s per profile")
+    print(f"{'profile':<10}{'frame p50':>10}{'p95':>8}{'max':>8}{'>33ms':>7}{'paint p50':>11}{'paints':>7}")
+    try:
+        service.warm(style=style, size=size)
+        for name in names:
+            budget.current = None
+            budget.apply(name, profiles[name])
+            service.cartoonize_bgr(frame, style=style, size=size)  # ส่ง torch threads ให้ worker ก่อนจับเวลา
+            paint_ms, stop = [], threading.Event()
+
+            def paint_loop():
+                while not stop.is_set():
+                    t0 = time.perf_counter()
+                    service.cartoonize_bgr(frame, style=style, size=size)
+                    paint_ms.append((time.perf_counter() - t0) * 1000.0)
+
+            painter_thread = threading.Thread(target=paint_loop, daemon=True)
+            painter_thread.start()
+            frame_ms, period = [], 1.0 / fps
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                t0 = time.perf_counter()
+                _ui_work(frame, tracker)
+                dt = time.perf_counter() - t0
+                frame_ms.append(dt * 1000.0)
+                time.sleep(max(0.0, period - dt))
+            stop.set()
+            painter_thread.join()
+            frame_ms.sort()
+            paint_ms.sort()
+            pct = lambda v, q: v[min(len(v) - 1, int(q * len(v)))] if v else float("nan")
+            late = sum(ms > 1000.0 / fps for ms in frame_ms) / len(frame_ms) * 100.0
+            print(f"{name:<10}{pct(frame_ms, 0.5):>10.1f}{pct(frame_ms, 0.95):>8.1f}{frame_ms[-1]:>8.1f}"
+                  f"{late:>6.1f}%{pct(paint_ms, 0.5):>11.0f}{len(paint_ms):>7}")
+    finally:
+        service.close()
+        budget.current = None
+        budget.apply("off", profiles["off"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU profiles: UI frame time + paint latency per profile")
+    parser.add_argument("--bench", metavar="IMAGE", required=True)
+    parser.add_argument("--profiles", default="off,idle,tracking,painting")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--style", default="paprika")
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--painter", default="modules.paint_model")
+    args = parser.parse_args()
+    bench(args.bench, args.profiles.split(","), args.seconds, args.style, args.size, args.painter)
+
+
+if __name__ == "__main__":
+    main()
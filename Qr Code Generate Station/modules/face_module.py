@@ -0,0 +1,133 @@
+# modules/face_module.py
+# หาใบหน้าในภาพที่ถ่าย แล้ว crop จัตุรัสรอบหน้าก่อนส่งเข้า paint
+# (โลโก้ใน QR กว้างแค่ ~31% ของ QR ประมาณ 115 px: ส่วนที่เหลือของเฟรมไม่ได้ใช้)
+#
+#   backend: MediaPipe Face Detection (ใช้ mediapipe ที่ HandTracker โหลดไว้แล้ว)
+#            ไม่มี mediapipe -> Haar cascade ของ OpenCV
+#
+#   python -m modules.face_module output/raw/*.jpg           # เวลาหาหน้า + เวลา paint แบบเต็มเฟรม vs crop
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from modules import hand_module
+
+DETECT_SIDE = 320      # ย่อก่อน detect (short-range model รับ 128x128 อยู่แล้ว)
+CROP_SCALE = 2.0       # ด้านของ crop = ขนาดหน้า x CROP_SCALE (ให้มีผม/คาง/ไหล่บ้าง)
+CROP_LIFT = 0.12       # เลื่อนจุดกลาง crop ขึ้น (สัดส่วนความสูงหน้า) ให้ได้ผมมากกว่าคอ
+
+
+class FaceLocator:
+    def __init__(self, min_confidence=0.5, detect_side=DETECT_SIDE):
+        self.detect_side = detect_side
+        self.backend = None
+        self._detector = None
+        if hand_module._load_mediapipe():
+            # model_selection=0: short-range (ในระยะ ~2 m) เหมาะกับ kiosk
+            self._detector = hand_module.mp.solutions.face_detection.FaceDetection(
+                model_selection=0, min_detection_confidence=min_confidence)
+            self.backend = "mediapipe"
+        else:
+            cascade = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml"))
+            if not cascade.empty():
+                self._detector = cascade
+                self.backend = "haar"
+
+    def locate(self, frame_bgr):
+        """(x, y, w, h) ของหน้าที่ใหญ่ที่สุดในพิกัดเฟรมเดิม หรือ None"""
+        if self._detector is None or frame_bgr is None or frame_bgr.size == 0:
+            return None
+        h0, w0 = frame_bgr.shape[:2]
+        scale = min(1.0, self.detect_side / float(max(h0, w0)))
+        small = cv2.resize(frame_bgr, (int(w0 * scale), int(h0 * scale)), interpolation=cv2.INTER_AREA) \
+            if scale < 1.0 else frame_bgr
+        if self.backend == "mediapipe":
+            rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            results = self._detector.process(rgb)
+            if not results.detections:
+                return None
+            sh, sw = small.shape[:2]
+            boxes = []
+            for det in results.detections:
+                rb = det.location_data.relative_bounding_box
+                boxes.append((rb.xmin * sw, rb.ymin * sh, rb.width * sw, rb.height * sh))
+        else:
+            gray = cv2.equalizeHist(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+            found = self._detector.detectMultiScale(gray, scaleFactor=1.15, minNeighbors=5, minSize=(24, 24))
+            if len(found) == 0:
+                return None
+            boxes = [tuple(float(v) for v in b) for b in found]
+        x, y, w, h = max(boxes, key=lambda b: b[2] * b[3])
+        return int(x / scale), int(y / scale), int(w / scale), int(h / scale)
+
+    def close(self):
+        if self.backend == "mediapipe":
+            self._detector.close()
+
+
+def crop_square(frame_bgr, box, scale=CROP_SCALE, lift=CROP_LIFT):
+    """crop จัตุรัสรอบหน้า (ขยับให้อยู่ในภาพ ไม่เกินด้านสั้นของเฟรม)"""
+    H, W = frame_bgr.shape[:2]
+    x, y, w, h = box
+    side = int(min(max(w, h) * scale, H, W))
+    cx = x + w / 2.0
+    cy = y + h / 2.0 - lift * h
+    x0 = int(min(max(0, cx - side / 2.0), W - side))
+    y0 = int(min(max(0, cy - side / 2.0), H - side))
+    return frame_bgr[y0:y0 + side, x0:x0 + side]
+
+
+def center_square(frame_bgr):
+    H, W = frame_bgr.shape[:2]
+    side = min(H, W)
+    return frame_bgr[(H - side) // 2:(H - side) // 2 + side, (W - side) // 2:(W - side) // 2 + side]
+
+
+# ---------------- Benchmark CLI ----------------
+def main():
+    parser = argparse.ArgumentParser(description="Face crop before paint: locate cost + paint time full frame vs crop")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--size", type=int, default=512, help="paint size for the full frame (as before)")
+    parser.add_argument("--crop-size", type=int, default=int(os.environ.get("KIOS_FACE_PAINT_SIZE", "256")),
+                        help="paint size for the face crop")
+    parser.add_argument("--style", default="paprika")
+    parser.add_argument("--ai", action="store_true", help="also time paint_model.cartoonize_bgr (needs torch)")
+    args = parser.parse_args()
+
+    locator = FaceLocator()
+    painter = None
+    if args.ai:
+        from modules import paint_model
+        painter = paint_model
+        painter.cartoonize_bgr(np.zeros((args.size, args.size, 3), np.uint8), style=args.style, size=args.size)
+    print(f"face backend: {locator.backend}")
+    print(f"{'image':<28}{'find ms':>8}{'face':>16}{'full px':>10}{'crop px':>9}"
+          + (f"{'AI full ms':>12}{'AI crop ms':>12}" if painter else ""))
+    for path in args.images:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        t0 = time.perf_counter()
+        box = locator.locate(frame)
+        find_ms = (time.perf_counter() - t0) * 1000.0
+        crop = crop_square(frame, box) if box else center_square(frame)
+        row = f"{os.path.basename(path)[-28:]:<28}{find_ms:>8.1f}{str(box) if box else '-':>16}" \
+              f"{frame.shape[0] * frame.shape[1]:>10}{crop.shape[0] * crop.shape[1]:>9}"
+        if painter:
+            t0 = time.perf_counter()
+            painter.cartoonize_bgr(frame, style=args.style, size=args.size)
+            full_ms = (time.perf_counter() - t0) * 1000.0
+            crop_size = args.crop_size if box else args.size
+            painter.cartoonize_bgr(crop, style=args.style, size=crop_size)  # warm-up face2paint ของ size นี้ ไม่นับ
+            t0 = time.perf_counter()
+            painter.cartoonize_bgr(crop, style=args.style, size=crop_size)
+            row += f"{full_ms:>12.0f}{(time.perf_counter() - t0) * 1000.0:>12.0f}"
+        print(row)
+    locator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,24 @@ from typing import Optional, Tuple, List
 import cv2
 import numpy as np
 
-try:
-    import mediapipe as mp
-    MP_OK = True
-except Exception as e:
-    mp = None
-    MP_OK = False
-    MP_IMPORT_ERROR = e
+# mediapipe import ช้า (หลายวินาทีบน Pi) จึง import ตอนสร้าง HandTracker ครั้งแรก
+# ไม่ใช่ตอน import module นี้ (main.py สร้างใน thread เบื้องหลังระหว่างเปิดกล้อง)
+mp = None
+MP_OK = None          # None = ยังไม่ได้ลอง import
+MP_IMPORT_ERROR = None
+
+
+def _load_mediapipe():
+    global mp, MP_OK, MP_IMPORT_ERROR
+    if MP_OK is None:
+        try:
+            import mediapipe
+            mp = mediapipe
+            MP_OK = True
+        except Exception as e:
+            MP_OK = False
+            MP_IMPORT_ERROR = e
+    return MP_OK
 
 
 @dataclass
@@ -38,7 +49,7 @@ class HandTracker:
         min_tracking_confidence: float = 0.5,
         max_side: int = 640,   # รีไซซ์ภาพเข้ากับ mediapipe เพื่อความเร็ว/เสถียร
     ):
-        if not MP_OK:
+        if not _load_mediapipe():
             raise ImportError(
                 f"mediapipe import failed: {MP_IMPORT_ERROR}\n"
                 "ติดตั้งใน venv: pip install mediapipe==0.10.14"
@@ -59,11 +70,8 @@ class HandTracker:
         )
 
         # เวอร์ชันไว้ดีบัก
-        try:
-            import pkg_resources
-            self.mp_version = pkg_resources.get_distribution("mediapipe").version
-        except Exception:
-            self.mp_version = "unknown"
+        # (pkg_resources ใช้เวลา import นาน อ่านจาก module ตรงๆ แทน)
+        self.mp_version = getattr(mp, "__version__", "unknown")
 
     def process(self, frame_bgr: np.ndarray, draw: bool = True) -> Tuple[np.ndarray, HandInfo]:
         info = HandInfo(gesture="none", debug_text=f"MP v{self.mp_version} | ")
@@ -0,0 +1,57 @@
+# modules/metrics.py
+# Prometheus-text endpoint ของ kiosk: สถิติ span จาก timerlog.Instrument + อุณหภูมิ/throttle ของ Pi
+# เปิดด้วย env KIOS_METRICS_PORT=9109 แล้ว curl localhost:9109/metrics
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# อุณหภูมิ/throttle ใช้ตัวเดียวกับ station (qr-reader/read_qrcode_module/metrics.py)
+from modules.shared import station_metrics
+
+cpu_temperature_c = station_metrics.cpu_temperature_c
+throttled_flags = station_metrics.throttled_flags
+
+
+def render(instr, extra=None) -> str:
+    """instr: timerlog.Instrument; extra: dict ชื่อ -> ค่า (gauge) เพิ่มเติม เช่น state ปัจจุบัน"""
+    out = ["# HELP kios_span_ms Stage time from timerlog spans (ms)", "# TYPE kios_span_ms summary"]
+    spans = sorted(dict(instr.totals).items())  # snapshot: thread UI ยังเพิ่ม span ระหว่าง scrape ได้
+    for name, st in spans:
+        for q in (0.5, 0.95, 0.99):
+            out.append(f'kios_span_ms{{span="{name}",quantile="{q}"}} {st.percentile(q * 100):.3f}')
+        out.append(f'kios_span_ms_sum{{span="{name}"}} {st.wall_ms:.3f}')
+        out.append(f'kios_span_ms_count{{span="{name}"}} {st.count}')
+    out += ["# HELP kios_span_cpu_ms_total CPU time spent inside spans (ms)", "# TYPE kios_span_cpu_ms_total counter"]
+    for name, st in spans:
+        out.append(f'kios_span_cpu_ms_total{{span="{name}"}} {st.cpu_ms:.3f}')
+    out += ["# TYPE kios_process_cpu_seconds_total counter", f"kios_process_cpu_seconds_total {time.process_time():.3f}"]
+    temp = cpu_temperature_c()
+    if temp is not None:
+        out += ["# TYPE kios_cpu_temperature_celsius gauge", f"kios_cpu_temperature_celsius {temp:.1f}"]
+    flags = throttled_flags()
+    if flags is not None:
+        out += ["# TYPE kios_throttled_flags gauge", f"kios_throttled_flags {flags}"]
+    for key, value in (extra() if callable(extra) else extra or {}).items():
+        out += [f"# TYPE kios_{key} gauge", f"kios_{key} {value}"]
+    return "\n".join(out) + "\n"
+
+def serve(instr, port: int, host: str = "0.0.0.0", extra=None) -> ThreadingHTTPServer:
+    """เริ่ม HTTP server บน daemon thread; หน้าจอ/เฟรมไม่ต้องทำอะไรเพิ่ม ค่าอ่านตอน scrape เท่านั้น"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render(instr, extra).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="kios-metrics", daemon=True).start()
+    return httpd
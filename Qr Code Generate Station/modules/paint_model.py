@@ -3,6 +3,7 @@
 # รองรับการเปลี่ยน style ได้ง่าย เช่น "celeba_distill", "paprika"
 
 import os
+import time
 import cv2
 import torch
 import numpy as np
@@ -21,32 +22,25 @@ def _get_models(style: str = "face_paint_512_v2", size: int = 512):
     """
     global _CACHED
 
-    reload_needed = (
-        _CACHED["gen"] is None
-        or _CACHED["style"] != style
-        or _CACHED["size"] != size
-    )
-    if reload_needed:
-        print(f"⬇ Loading AnimeGAN2 ({style}, size={size}) on {_DEVICE} ...")
+    # generator ขึ้นกับ style อย่างเดียว (fully convolutional รับได้ทุกขนาด) ส่วน face2paint ขึ้นกับ size
+    # แยกกันเพื่อให้ crop หน้า (size เล็ก) สลับกับเฟรมเต็มได้โดยไม่ต้องโหลด weights ใหม่
+    if _CACHED["gen"] is None or _CACHED["style"] != style:
+        print(f"⬇ Loading AnimeGAN2 ({style}) on {_DEVICE} ...")
         gen = torch.hub.load(
             "bryandlee/animegan2-pytorch:main",
             "generator",
             pretrained=style
         ).to(_DEVICE).eval()
+        _CACHED.update({"style": style, "gen": gen})
+        print("✅ Model ready (cached).")
 
+    if _CACHED["face2paint"] is None or _CACHED["size"] != size:
         face2paint = torch.hub.load(
             "bryandlee/animegan2-pytorch:main",
             "face2paint",
             size=size
         )
-
-        _CACHED.update({
-            "style": style,
-            "size": size,
-            "gen": gen,
-            "face2paint": face2paint,
-        })
-        print("✅ Model ready (cached).")
+        _CACHED.update({"size": size, "face2paint": face2paint})
 
     return _CACHED["gen"], _CACHED["face2paint"]
 
@@ -71,6 +65,58 @@ def cartoonize_bgr(bgr_frame: np.ndarray,
     return out_bgr
 
 
+def _to_input(bgr_frame: np.ndarray, size: int) -> torch.Tensor:
+    """
+    preprocess แบบเดียวกับ face2paint: crop กลางเป็นจัตุรัส -> resize (LANCZOS) -> tensor [-1, 1] (3, size, size)
+    """
+    pil = Image.fromarray(cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB))
+    w, h = pil.size
+    s = min(w, h)
+    pil = pil.crop(((w - s) // 2, (h - s) // 2, (w + s) // 2, (h + s) // 2)).resize((size, size), Image.LANCZOS)
+    return torch.from_numpy(np.array(pil)).permute(2, 0, 1).float() / 127.5 - 1.0
+
+
+def cartoonize_batch(bgr_frames,
+                     style: str = "face_paint_512_v2",
+                     size: int = 512) -> list:
+    """
+    หลายเฟรม BGR ใน forward pass เดียว (batch) -> list ภาพ BGR ตามลำดับเดิม
+    ผลเท่ากับ cartoonize_bgr ทีละภาพ (generator normalize ต่อภาพ ไม่ข้ามภาพใน batch)
+    """
+    gen, _ = _get_models(style=style, size=size)
+    batch = torch.stack([_to_input(f, size) for f in bgr_frames]).to(_DEVICE)
+    with torch.no_grad():
+        out = gen(batch).cpu()
+    # เหมือน to_pil_image ใน face2paint: (x * 0.5 + 0.5).clip(0, 1) * 255 -> uint8 (ปัดลง)
+    out = (out * 0.5 + 0.5).clip(0, 1).mul(255).byte().permute(0, 2, 3, 1).numpy()
+    return [cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR) for rgb in out]
+
+
+def bench_batches(batch_sizes=(1, 2, 4, 8), size: int = 512, repeats: int = 3, style: str = None):
+    """
+    เวลา forward pass ของ generator ต่อ batch size บน _DEVICE -> [(batch, ms ต่อ batch, ms ต่อภาพ, ภาพ/วินาที)]
+    style=None ใช้ animegan_model.Generator (weights สุ่ม, ไม่ต้องโหลดจาก torch.hub) แทน
+    """
+    if style is None:
+        from modules import animegan_model
+        gen = animegan_model.Generator().to(_DEVICE).eval()
+    else:
+        gen, _ = _get_models(style=style, size=size)
+    rows = []
+    for n in batch_sizes:
+        x = torch.rand(n, 3, size, size, device=_DEVICE) * 2 - 1
+        with torch.no_grad():
+            gen(x)  # warm-up (oneDNN เลือก kernel ตาม shape)
+            times = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                gen(x)
+                times.append((time.perf_counter() - t0) * 1000.0)
+        ms = sorted(times)[len(times) // 2]
+        rows.append((n, ms, ms / n, n * 1000.0 / ms))
+    return rows
+
+
 def generate_paint(input_path: str,
                    output_dir: str = "output/paint",
                    style: str = "face_paint_512_v2",
@@ -98,3 +144,21 @@ def generate_paint(input_path: str,
 
     print(f"🎨 Saved painted image: {output_path}")
     return output_path
+
+
+if __name__ == "__main__":
+    # python -m modules.paint_model --batches 1,2,4,8 --size 512 [--style paprika]
+    import argparse
+    parser = argparse.ArgumentParser(description="AnimeGAN generator throughput vs latency per batch size")
+    parser.add_argument("--batches", default="1,2,4,8")
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--style", default=None, help="torch.hub weights (default: animegan_model.Generator, random weights)")
+    parser.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 = torch default)")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"{_DEVICE}, {torch.get_num_threads()} threads, {args.size}x{args.size}, model {args.style or 'animegan_model.Generator'}")
+    print(f"{'batch':>6}{'ms/batch':>10}{'ms/img':>9}{'img/s':>8}")
+    for n, ms, per_img, ips in bench_batches([int(b) for b in args.batches.split(",")], args.size, args.repeats, args.style):
+        print(f"{n:>6}{ms:>10.0f}{per_img:>9.0f}{ips:>8.2f}")
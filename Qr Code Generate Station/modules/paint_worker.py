@@ -0,0 +1,447 @@
+# modules/paint_worker.py
+# AI Paint (torch + AnimeGAN2 ใน paint_model) ใน process แยก เพื่อไม่ให้ torch + weights ค้างอยู่ใน
+# process เดียวกับ Qt/MediaPipe ตลอด session (Pi 2-4 GB ลง swap)
+#
+#   - worker เริ่มเมื่อมีงาน (กด E = warm, หรือขั้น generate_paint ครั้งแรก)
+#   - ภาพ BGR ไป-กลับผ่าน shared memory (ส่งแค่ชื่อ block + shape ทาง pipe)
+#   - ว่างเกิน idle_timeout (env KIOS_PAINT_IDLE วินาที, default 120) -> ปิด worker คืน RSS ให้ระบบ
+#   - worker ตาย (เช่น OOM) -> งานนั้น error (main.py fallback โหมดเร็ว) ครั้งถัดไปเริ่มใหม่
+#   - micro-batching: งานที่รอพร้อมกัน (หลายผู้ใช้ต่อคิว) รวมได้ถึง KIOS_PAINT_BATCH ภาพภายใน
+#     KIOS_PAINT_WINDOW_MS แล้วส่งเป็น forward pass เดียว (paint_model.cartoonize_batch)
+#
+# worker เป็น python process ใหม่ (python -m modules.paint_worker --serve) ไม่ใช่ fork/spawn
+# ของ multiprocessing เพราะ spawn จะ import main.py (PyQt5) ซ้ำใน worker
+#
+#   python -m modules.paint_worker --bench IMAGE                  # RSS + latency: cold / warm / idle-reaped
+#   python -m modules.paint_worker --bench IMAGE --batch 1,2,4    # throughput vs latency ต่อ batch size
+import argparse
+import importlib
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+from modules.cpu_budget import set_thread_affinity
+
+IDLE_TIMEOUT = float(os.environ.get("KIOS_PAINT_IDLE", "120"))
+PAINTER = "modules.paint_model"
+CALL_TIMEOUT = 300.0  # โหลดโมเดลครั้งแรก (torch.hub) บน Pi ใช้เวลานาน
+MAX_BATCH = int(os.environ.get("KIOS_PAINT_BATCH", "4"))
+BATCH_WINDOW = float(os.environ.get("KIOS_PAINT_WINDOW_MS", "40")) / 1000.0
+
+
+def rss_mb(pid=None):
+    """VmRSS (MB) ของ process จาก /proc; None ถ้าอ่านไม่ได้ (ไม่ใช่ Linux / process ไม่อยู่แล้ว)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+# ---------------- worker (child process) ----------------
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # python < 3.13: resource tracker ของ worker จะ unlink block ของ parent ตอน worker ปิด
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def serve(painter=PAINTER):
+    """loop ของ worker: อ่านคำสั่ง (pickle) จาก stdin ตอบทาง stdout เดิม; print ของ paint_model ไป stderr"""
+    reply_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    requests = sys.stdin.buffer
+    model = None
+    shm = None
+
+    def reply(*msg):
+        pickle.dump(msg, reply_out, protocol=pickle.HIGHEST_PROTOCOL)
+        reply_out.flush()
+
+    while True:
+        try:
+            msg = pickle.load(requests)
+        except EOFError:
+            break
+        if msg is None:
+            break
+        try:
+            t0 = time.perf_counter()
+            if model is None:
+                model = importlib.import_module(painter)
+            op = msg[0]
+            if op == "warm":
+                _, style, size = msg
+                model._get_models(style=style, size=size)
+                reply("ok", None, (time.perf_counter() - t0) * 1000.0, rss_mb())
+            elif op == "threads":
+                # จำนวน thread ของ torch/cv2 ใน worker ตาม profile ของ cpu_budget
+                _, threads = msg
+                torch = sys.modules.get("torch")
+                if torch is not None:
+                    torch.set_num_threads(threads)
+                cv2.setNumThreads(threads)
+                reply("ok", None, (time.perf_counter() - t0) * 1000.0, rss_mb())
+            elif op == "paint":
+                # slots = [(offset, slot_bytes, shape), ...] ผลของภาพ i เขียนทับ slot i
+                _, name, slots, style, size = msg
+                if shm is None or shm.name != name:
+                    if shm is not None:
+                        shm.close()
+                    shm = _attach(name)
+                frames = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset) for offset, _, shape in slots]
+                if len(frames) > 1 and hasattr(model, "cartoonize_batch"):
+                    outs = model.cartoonize_batch(frames, style=style, size=size)
+                else:
+                    outs = [model.cartoonize_bgr(f, style=style, size=size) for f in frames]
+                shapes = []
+                for (offset, nbytes, _), out in zip(slots, outs):
+                    out = np.ascontiguousarray(out, dtype=np.uint8)
+                    if out.nbytes > nbytes:
+                        raise ValueError(f"painted image {out.shape} does not fit its shared memory slot ({nbytes} bytes)")
+                    np.ndarray(out.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)[...] = out
+                    shapes.append(out.shape)
+                del frames
+                reply("ok", shapes, (time.perf_counter() - t0) * 1000.0, rss_mb())
+            else:
+                reply("error", f"unknown op {op!r}")
+        except Exception as e:
+            reply("error", f"{type(e).__name__}: {e}")
+    if shm is not None:
+        shm.close()
+
+
+# ---------------- service (kiosk process) ----------------
+class PaintWorkerError(RuntimeError):
+    pass
+
+
+class _Job:
+    __slots__ = ("frame", "style", "size", "done", "result", "error")
+
+    def __init__(self, frame, style, size):
+        self.frame = frame
+        self.style = style
+        self.size = size
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PaintService:
+    """
+    ใช้แทน paint_model ใน main.py: generate_paint(input_path, style=, size=) / cartoonize_bgr(bgr, ...)
+    เหมือนกันแต่ inference อยู่ใน worker process; เรียกพร้อมกันจากหลาย thread ได้ (รวมเป็น batch)
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, painter=PAINTER, log=print, cwd=None,
+                 max_batch=MAX_BATCH, batch_window=BATCH_WINDOW):
+        self.idle_timeout = idle_timeout
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self.painter = painter
+        self.log = log
+        self.cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.proc = None
+        self.shm = None
+        self.last_used = 0.0
+        self.last = None          # (op, ms ใน worker, worker RSS MB, จำนวนภาพ) ของงานล่าสุด
+        self.starts = 0
+        self.reaps = 0
+        self.batches = {}         # batch size -> จำนวนครั้ง
+        self.cores = None         # affinity + จำนวน thread ของ worker (cpu_budget.CpuBudget)
+        self.torch_threads = None
+        self._threads_sent = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._jobs = queue.Queue()
+        self._batcher = threading.Thread(target=self._batch_loop, name="paint-batcher", daemon=True)
+        self._batcher.start()
+        self._reaper = threading.Thread(target=self._reap_loop, name="paint-reaper", daemon=True)
+        self._reaper.start()
+
+    @property
+    def running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def worker_rss_mb(self):
+        return rss_mb(self.proc.pid) if self.running else None
+
+    # ----- public -----
+    def warm(self, style="face_paint_512_v2", size=512):
+        """เริ่ม worker + โหลดโมเดลรอไว้ (เรียกจาก thread เบื้องหลังตอนกด E)"""
+        with self._lock:
+            self._call(("warm", style, size))
+
+    def cartoonize_bgr(self, bgr_frame, style="face_paint_512_v2", size=512):
+        job = _Job(np.ascontiguousarray(bgr_frame, dtype=np.uint8), style, size)
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def generate_paint(self, input_path, output_dir="output/paint", style="face_paint_512_v2", size=512):
+        """เหมือน paint_model.generate_paint"""
+        os.makedirs(output_dir, exist_ok=True)
+        bgr = cv2.imread(input_path)
+        if bgr is None:
+            raise FileNotFoundError(f"ไม่พบภาพ: {input_path}")
+        out_bgr = self.cartoonize_bgr(bgr, style=style, size=size)
+        output_path = os.path.join(output_dir, f"painted_{style}.jpg")
+        if not cv2.imwrite(output_path, out_bgr):
+            raise RuntimeError(f"❌ ไม่สามารถบันทึกไฟล์ได้: {output_path}")
+        return output_path
+
+    def set_budget(self, cores, torch_threads):
+        """affinity มีผลทันทีกับ worker ที่รันอยู่ (แม้กำลัง paint); จำนวน thread ส่งไปก่อนงานถัดไป"""
+        self.cores, self.torch_threads = cores, torch_threads
+        proc = self.proc
+        if cores and proc is not None and proc.poll() is None:
+            set_thread_affinity(proc.pid, cores)
+
+    def stop(self):
+        with self._lock:
+            self._stop_worker()
+
+    def close(self):
+        self._closed.set()
+        self._jobs.put(None)
+        with self._lock:
+            self._stop_worker()
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = None
+
+    # ----- micro-batching -----
+    def _batch_loop(self):
+        """รับงานแรก รออีกไม่เกิน batch_window เพื่อรวมงานที่ตามมาให้ได้ถึง max_batch แล้วส่งทีเดียว"""
+        while not self._closed.is_set():
+            job = self._jobs.get()
+            if job is None:
+                break
+            jobs = [job]
+            deadline = time.monotonic() + self.batch_window
+            while len(jobs) < self.max_batch:
+                try:
+                    nxt = self._jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._jobs.put(None)
+                    break
+                jobs.append(nxt)
+            groups = {}
+            for job in jobs:
+                groups.setdefault((job.style, job.size), []).append(job)
+            for group in groups.values():
+                self._run_batch(group)
+
+    def _run_batch(self, jobs):
+        style, size = jobs[0].style, jobs[0].size
+        try:
+            with self._lock:
+                # slot ละภาพ ใหญ่พอทั้งภาพเข้าและภาพผล (size x size BGR)
+                slots, offset = [], 0
+                for job in jobs:
+                    nbytes = max(job.frame.nbytes, size * size * 3)
+                    slots.append((offset, nbytes, job.frame.shape))
+                    offset += nbytes
+                self._ensure_shm(offset)
+                for (off, _, shape), job in zip(slots, jobs):
+                    np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=off)[...] = job.frame
+                shapes = self._call(("paint", self.shm.name, slots, style, size))
+                for (off, _, _), shape, job in zip(slots, shapes, jobs):
+                    job.result = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=off).copy()
+                self.batches[len(jobs)] = self.batches.get(len(jobs), 0) + 1
+        except Exception as e:
+            for job in jobs:
+                job.error = e
+        for job in jobs:
+            job.done.set()
+
+    # ----- internals (เรียกขณะถือ _lock) -----
+    def _start_worker(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "modules.paint_worker", "--serve", "--painter", self.painter],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=self.cwd,
+        )
+        self.starts += 1
+        self._threads_sent = None
+        if self.cores:
+            set_thread_affinity(self.proc.pid, self.cores)
+        self.log(f"[AI] paint worker started (pid {self.proc.pid})")
+
+    def _stop_worker(self):
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        try:
+            pickle.dump(None, proc.stdin)
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+    def _ensure_shm(self, nbytes):
+        if self.shm is not None and self.shm.size >= nbytes:
+            return
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+        # ขั้นต่ำ 2 ภาพ 512px เพื่อไม่ต้องสร้าง block ใหม่บ่อยตอน batch โตขึ้น
+        self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 512 * 512 * 3 * 2))
+
+    def _call(self, msg):
+        if not self.running:
+            self._start_worker()
+        if self.torch_threads and self._threads_sent != self.torch_threads:
+            threads = self.torch_threads
+            self._exchange(("threads", threads))
+            self._threads_sent = threads
+        return self._exchange(msg)
+
+    def _exchange(self, msg):
+        try:
+            pickle.dump(msg, self.proc.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+            self.proc.stdin.flush()
+            reply = self._recv(self.proc.stdout)
+        except Exception as e:
+            self._stop_worker()
+            raise PaintWorkerError(f"paint worker died: {e}") from e
+        self.last_used = time.monotonic()
+        if reply[0] != "ok":
+            raise PaintWorkerError(reply[1])
+        _, shapes, worker_ms, worker_rss = reply
+        self.last = (msg[0], worker_ms, worker_rss, len(shapes) if shapes else 0)
+        return shapes
+
+    @staticmethod
+    def _recv(stream):
+        # รอคำตอบใน thread แยกเพื่อมี timeout (pickle.load บล็อกจนกว่า worker จะตอบ/ปิด)
+        box = []
+        reader = threading.Thread(target=lambda: box.append(pickle.load(stream)), daemon=True)
+        reader.start()
+        reader.join(CALL_TIMEOUT)
+        if not box:
+            raise TimeoutError(f"no reply in {CALL_TIMEOUT:.0f}s")
+        return box[0]
+
+    def _reap_loop(self):
+        while not self._closed.wait(min(5.0, max(0.1, self.idle_timeout / 4))):
+            with self._lock:
+                if self.running and time.monotonic() - self.last_used > self.idle_timeout:
+                    self._stop_worker()
+                    self.reaps += 1
+                    self.log(f"[AI] paint worker idle {self.idle_timeout:.0f}s -> stopped")
+
+
+# ---------------- Benchmark CLI ----------------
+def bench(image, style, size, idle, painter=PAINTER):
+    bgr = cv2.imread(image)
+    if bgr is None:
+        raise SystemExit(f"cannot read {image}")
+    service = PaintService(idle_timeout=idle, painter=painter, log=lambda msg: None)
+    rows = [("baseline", None, None, rss_mb(), None)]
+
+    def measure(label):
+        t0 = time.perf_counter()
+        service.cartoonize_bgr(bgr, style=style, size=size)
+        rows.append((label, (time.perf_counter() - t0) * 1000.0, service.last[1], rss_mb(), service.worker_rss_mb()))
+
+    try:
+        measure("cold")
+        for i in range(3):
+            measure(f"warm {i + 1}")
+        time.sleep(idle + max(0.5, idle / 2))
+        rows.append(("idle-reaped", None, None, rss_mb(), service.worker_rss_mb()))
+        measure("after reap")
+    finally:
+        service.close()
+
+    print(f"{image} -> {size}px '{style}' via {painter} (idle timeout {idle:.0f}s)")
+    print(f"{'state':<14}{'e2e ms':>10}{'worker ms':>11}{'kiosk MB':>10}{'worker MB':>11}")
+    cell = lambda v, w, f: f"{v:>{w}{f}}" if v is not None else f"{'-':>{w}}"
+    for label, e2e, worker_ms, parent, child in rows:
+        print(f"{label:<14}{cell(e2e, 10, '.0f')}{cell(worker_ms, 11, '.0f')}{cell(parent, 10, '.0f')}{cell(child, 11, '.0f')}")
+    print(f"worker starts {service.starts}, reaps {service.reaps}")
+
+
+def bench_batching(image, style, size, batch_sizes, jobs, rounds=3, window=BATCH_WINDOW, painter=PAINTER):
+    """jobs งานพร้อมกัน (ผู้ใช้ต่อคิว) x rounds รอบ ต่อ max_batch แต่ละค่า: throughput + latency ต่องาน"""
+    bgr = cv2.imread(image)
+    if bgr is None:
+        raise SystemExit(f"cannot read {image}")
+    print(f"{image} -> {size}px '{style}' via {painter}, {jobs} concurrent jobs x {rounds} rounds, window {window * 1000:.0f} ms")
+    print(f"{'batch':>6}{'img/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}  batches")
+    for n in batch_sizes:
+        service = PaintService(idle_timeout=3600, painter=painter, log=lambda msg: None, max_batch=n, batch_window=window)
+        try:
+            service.warm(style=style, size=size)
+            service.cartoonize_bgr(bgr, style=style, size=size)  # warm-up forward pass
+            service.batches.clear()
+            latencies = []
+
+            def one():
+                t0 = time.perf_counter()
+                service.cartoonize_bgr(bgr, style=style, size=size)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                threads = [threading.Thread(target=one) for _ in range(jobs)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            wall = time.perf_counter() - t0
+        finally:
+            service.close()
+        latencies.sort()
+        p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        print(f"{n:>6}{len(latencies) / wall:>8.2f}{p(0.5):>9.0f}{p(0.95):>9.0f}{latencies[-1]:>9.0f}  {dict(sorted(service.batches.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-process AI paint worker")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--painter", default=PAINTER, help="module with _get_models / cartoonize_bgr")
+    parser.add_argument("--bench", metavar="IMAGE", help="report RSS + latency cold / warm / idle-reaped")
+    parser.add_argument("--style", default="paprika")
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--idle", type=float, default=5.0, help="idle timeout for --bench (seconds)")
+    parser.add_argument("--batch", help="comma separated max batch sizes: throughput vs latency instead of cold/warm")
+    parser.add_argument("--jobs", type=int, default=4, help="concurrent jobs per round for --batch")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.painter)
+    elif args.bench and args.batch:
+        bench_batching(args.bench, args.style, args.size, [int(b) for b in args.batch.split(",")],
+                       args.jobs, args.rounds, painter=args.painter)
+    elif args.bench:
+        bench(args.bench, args.style, args.size, args.idle, args.painter)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,135 @@
 # modules/qr_scanner.py
+# QR decoder backends สำหรับขั้น "capture" (ตรวจ QR ที่เพิ่งพิมพ์)
+#   zbar   = pyzbar (เร็ว แต่พลาดบ่อยกับ QR ที่มีโลโก้วงกลมตรงกลาง)
+#   opencv = cv2.QRCodeDetector
+#   aruco  = cv2.QRCodeDetectorAruco (OpenCV >= 4.8)
+#   wechat = cv2.wechat_qrcode (ต้องใช้ opencv-contrib; โมเดล CNN ใส่ใน wechat_qrcode/ ถ้ามี)
+# "zbar,wechat" = cascade: ลองตามลำดับ หยุดที่ตัวแรกที่อ่านได้
+# เลือกด้วย env KIOS_QR_DECODER (ค่าเริ่มต้น zbar,opencv)
+import os
 import cv2
-from pyzbar.pyzbar import decode
+import numpy as np
 
-def scan_qr(frame, target_token):
-    qrs = decode(frame)
-    for qr in qrs:
-        data = qr.data.decode("utf-8")
+try:
+    from pyzbar import pyzbar
+    ZBAR_OK = True
+except Exception:
+    pyzbar = None
+    ZBAR_OK = False
+
+WECHAT_MODEL_DIR = os.environ.get("WECHAT_QR_MODEL_DIR", "wechat_qrcode")
+DEFAULT_DECODER = "zbar,opencv"
+
+
+def _rect(points):
+    """มุม 4 จุด -> (x, y, w, h) เหมือน qr.rect ของ pyzbar"""
+    return tuple(int(v) for v in cv2.boundingRect(np.asarray(points, dtype=np.float32).reshape(-1, 2)))
+
+
+def _gray(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+class ZbarBackend:
+    name = "zbar"
+
+    def __call__(self, frame):
+        return [(qr.data.decode("utf-8", errors="ignore"), tuple(qr.rect))
+                for qr in pyzbar.decode(frame, symbols=[pyzbar.ZBarSymbol.QRCODE])]
+
+
+class OpenCVBackend:
+    name = "opencv"
+
+    def __init__(self):
+        self.detector = cv2.QRCodeDetector()
+
+    def __call__(self, frame):
+        data, points, _ = self.detector.detectAndDecode(_gray(frame))
+        return [(data, _rect(points))] if data and points is not None else []
+
+
+class ArucoBackend(OpenCVBackend):
+    name = "aruco"
+
+    def __init__(self):
+        self.detector = cv2.QRCodeDetectorAruco()
+
+
+class WeChatBackend:
+    name = "wechat"
+
+    def __init__(self, model_dir=WECHAT_MODEL_DIR):
+        files = [os.path.join(model_dir, f) for f in ("detect.prototxt", "detect.caffemodel",
+                                                      "sr.prototxt", "sr.caffemodel")]
+        if all(os.path.exists(f) for f in files):
+            self.detector = cv2.wechat_qrcode_WeChatQRCode(*files)
+        else:
+            self.detector = cv2.wechat_qrcode_WeChatQRCode()
+
+    def __call__(self, frame):
+        texts, points = self.detector.detectAndDecode(frame)
+        return [(t, _rect(p)) for t, p in zip(texts, points) if t]
+
+
+BACKENDS = {
+    "zbar": (ZbarBackend, lambda: ZBAR_OK),
+    "opencv": (OpenCVBackend, lambda: True),
+    "aruco": (ArucoBackend, lambda: hasattr(cv2, "QRCodeDetectorAruco")),
+    "wechat": (WeChatBackend, lambda: hasattr(cv2, "wechat_qrcode_WeChatQRCode")),
+}
+
+
+class Cascade:
+    """ลอง backend ตามลำดับ คืนผลแรกที่อ่านได้ (hits นับว่าตัวไหนอ่านได้)"""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.name = ",".join(b.name for b in backends)
+        self.hits = {b.name: 0 for b in backends}
+
+    def __call__(self, frame):
+        for backend in self.backends:
+            try:
+                found = backend(frame)
+            except Exception:
+                found = []
+            if found:
+                self.hits[backend.name] += 1
+                return found
+        return []
+
+
+def make_decoder(spec=None):
+    """ "zbar,opencv" -> Cascade ของ backend ที่ใช้ได้ในเครื่องนี้
+    ชื่อที่ไม่รู้จัก/ใช้ไม่ได้จะถูกข้ามพร้อม log (ชื่อเดียวกับ read_qrcode_module/decoders.py) ไม่ให้พิมพ์ผิดแล้วเงียบ"""
+    spec = spec or os.environ.get("KIOS_QR_DECODER", DEFAULT_DECODER)
+    backends = []
+    for name in spec.lower().split(","):
+        name = name.strip()
+        if not name or name in (b.name for b in backends):
+            continue
+        if name not in BACKENDS:
+            print(f"[DECODER] unknown QR decoder '{name}' (choose from {', '.join(BACKENDS)}), skipped")
+        elif not BACKENDS[name][1]():
+            print(f"[DECODER] {name} is not available here, skipped")
+        else:
+            backends.append(BACKENDS[name][0]())
+    if not backends:
+        print(f"[DECODER] no usable decoder in '{spec}', falling back to opencv")
+    return Cascade(backends or [OpenCVBackend()])
+
+
+_default = None
+
+
+def scan_qr(frame, target_token, decoder=None):
+    global _default
+    if decoder is None:
+        _default = _default or make_decoder()
+        decoder = _default
+    for data, (x, y, w, h) in decoder(frame):
         if data == target_token:
-            (x, y, w, h) = qr.rect
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0,255,0), 3)
             return True, frame
     return False, frame
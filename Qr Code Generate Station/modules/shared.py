@@ -0,0 +1,16 @@
+# modules/shared.py
+# โค้ดที่ kiosk ใช้ร่วมกับ qr-reader (sampling profiler, อุณหภูมิ/throttle ของ Pi) มีที่เดียวคือ qr-reader/read_qrcode_module
+# module นี้เพิ่มโฟลเดอร์ qr-reader เข้า sys.path แล้ว re-export: แก้ที่ qr-reader ที่เดียวได้ทั้งสองฝั่ง ไม่ต้อง copy
+# ตำแหน่ง qr-reader: ../qr-reader (โฟลเดอร์ข้างกันใน repo นี้) หรือกำหนดเองด้วย env KIOS_QR_READER_DIR
+# import เฉพาะ module ที่ใช้ stdlib ล้วน (sampler, metrics) ไม่ดึง pytz/pyzbar ของฝั่ง station มาด้วย
+import os
+import sys
+
+QR_READER_DIR = os.environ.get("KIOS_QR_READER_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "qr-reader")
+
+if QR_READER_DIR not in sys.path:
+    sys.path.append(QR_READER_DIR)
+
+from read_qrcode_module import sampler  # noqa: E402
+from read_qrcode_module import metrics as station_metrics  # noqa: E402
@@ -1,7 +1,13 @@
 # modules/timerlog.py
-import time, os, csv, logging
+import time, os, csv, json, math, logging, threading, argparse, glob
 from contextlib import contextmanager
-from typing import List, Tuple
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 def _mk_logger(log_path: str):
     os.makedirs(os.path.dirname(log_path), exist_ok=True)
@@ -37,11 +43,12 @@ class TimeTracker:
         self.logger = _mk_logger(self.log_path)
         self.logger.info(f"[{self.run_id}] RUN START")
 
-        # สร้างหัว CSV ถ้ายังไม่มี
-        if not os.path.exists(self.csv_path):
-            with open(self.csv_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["run_id","stage","elapsed_ms","since_start_ms","wall_time"])
+        # เปิด CSV ครั้งเดียว (สร้างหัวถ้ายังไม่มี) แทนการเปิดใหม่ทุก mark
+        new_file = not os.path.exists(self.csv_path)
+        self._csv_file = open(self.csv_path, "a", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._csv_file)
+        if new_file:
+            self._csv.writerow(["run_id","stage","elapsed_ms","since_start_ms","wall_time"])
 
     def mark(self, stage: str):
         t = time.perf_counter()
@@ -51,19 +58,20 @@ class TimeTracker:
         # พิมพ์หน้าจอ + เขียนไฟล์ .log
         self.logger.info(f"[{self.run_id}] {stage} +{dt:.1f} ms (since {since0:.1f} ms)")
         # เขียนแถวลง CSV
-        with open(self.csv_path, "a", newline="", encoding="utf-8") as f:
-            csv.writer(f).writerow([
-                self.run_id,
-                stage,
-                f"{dt:.3f}",
-                f"{since0:.3f}",
-                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-            ])
+        self._csv.writerow([
+            self.run_id,
+            stage,
+            f"{dt:.3f}",
+            f"{since0:.3f}",
+            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+        ])
+        self._csv_file.flush()
 
     def finish(self):
         self.mark("END")
         total_ms = (self.marks[-1][1] - self.t0) * 1000.0
         self.logger.info(f"[{self.run_id}] TOTAL {total_ms:.1f} ms")
+        self._csv_file.close()
 
 @contextmanager
 def stage(tt: TimeTracker, name: str):
@@ -80,3 +88,241 @@ def cpu_ms(fn, *args, **kwargs) -> float:
     t0 = time.process_time()
     fn(*args, **kwargs)
     return (time.process_time() - t0) * 1000.0
+
+
+# ---------------- Spans + in-memory aggregation ----------------
+# bucket ของ histogram แบบ log-scale: 10 ช่องต่อหนึ่ง decade ตั้งแต่ 0.01 ms ถึง 100 s
+_BUCKETS_PER_DECADE = 10
+_MIN_MS = 0.01
+_NUM_BUCKETS = 7 * _BUCKETS_PER_DECADE + 1
+
+def _bucket(ms: float) -> int:
+    if ms <= _MIN_MS:
+        return 0
+    return min(_NUM_BUCKETS - 1, int(math.log10(ms / _MIN_MS) * _BUCKETS_PER_DECADE) + 1)
+
+def _bucket_upper_ms(i: int) -> float:
+    return _MIN_MS * 10 ** (i / _BUCKETS_PER_DECADE)
+
+def _rss_kb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024.0
+    except Exception:
+        return 0.0
+
+def _maxrss_kb() -> float:
+    return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource else 0.0
+
+
+class SpanStats:
+    """สถิติสะสมของ span หนึ่งชื่อ: count, ผลรวม wall/cpu, histogram ของ wall ms, memory delta สูงสุด"""
+    __slots__ = ("count", "wall_ms", "cpu_ms", "max_ms", "rss_kb", "peak_kb", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.max_ms = 0.0
+        self.rss_kb = 0.0     # RSS ที่เพิ่มขึ้นมากสุดในหนึ่งครั้ง
+        self.peak_kb = 0.0    # peak RSS (ru_maxrss) ของ process ที่ขยับขึ้นระหว่าง span รวมกัน
+        self.hist: Dict[int, int] = {}
+
+    def add(self, wall_ms: float, cpu: float, rss_kb: float = 0.0, peak_kb: float = 0.0):
+        self.count += 1
+        self.wall_ms += wall_ms
+        self.cpu_ms += cpu
+        self.max_ms = max(self.max_ms, wall_ms)
+        self.rss_kb = max(self.rss_kb, rss_kb)
+        self.peak_kb += peak_kb
+        b = _bucket(wall_ms)
+        self.hist[b] = self.hist.get(b, 0) + 1
+
+    def merge(self, row: dict):
+        self.count += row["count"]
+        self.wall_ms += row["wall_ms"]
+        self.cpu_ms += row["cpu_ms"]
+        self.max_ms = max(self.max_ms, row["max_ms"])
+        self.rss_kb = max(self.rss_kb, row.get("rss_kb", 0.0))
+        self.peak_kb += row.get("peak_kb", 0.0)
+        for b, n in row["hist"].items():
+            self.hist[int(b)] = self.hist.get(int(b), 0) + n
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        need = q / 100.0 * self.count
+        seen = 0
+        for b in sorted(self.hist):
+            seen += self.hist[b]
+            if seen >= need:
+                return min(_bucket_upper_ms(b), self.max_ms)
+        return self.max_ms
+
+    def to_row(self) -> dict:
+        return {"count": self.count, "wall_ms": round(self.wall_ms, 3), "cpu_ms": round(self.cpu_ms, 3),
+                "max_ms": round(self.max_ms, 3), "rss_kb": round(self.rss_kb, 1),
+                "peak_kb": round(self.peak_kb, 1), "hist": self.hist}
+
+
+class Span:
+    """ช่วงเวลาหนึ่งช่วง ใช้เป็น context manager หรือเรียก end() เอง (เช่น span ที่คร่อมหลายเฟรม)"""
+    __slots__ = ("inst", "name", "t0", "c0", "rss0", "peak0", "wall_ms", "cpu_ms", "nested", "memory")
+
+    def __init__(self, inst: "Instrument", name: str, nested: bool, memory: bool):
+        self.inst = inst
+        self.name = name
+        self.nested = nested
+        self.memory = memory
+        self.wall_ms = None
+        self.cpu_ms = None
+        if memory:
+            self.rss0 = _rss_kb()
+            self.peak0 = _maxrss_kb()
+        self.c0 = time.process_time()
+        self.t0 = time.perf_counter()
+
+    def end(self) -> float:
+        if self.wall_ms is not None:
+            return self.wall_ms
+        self.wall_ms = (time.perf_counter() - self.t0) * 1000.0
+        self.cpu_ms = (time.process_time() - self.c0) * 1000.0
+        rss = peak = 0.0
+        if self.memory:
+            rss = _rss_kb() - self.rss0
+            peak = _maxrss_kb() - self.peak0
+        self.inst._finish(self, rss, peak)
+        return self.wall_ms
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.end()
+        return False
+
+
+class Instrument:
+    """
+    จุดวัดเวลาเดียวของทั้ง process:
+      with inst.span("paint"): ...          # ซ้อนกันได้ -> ชื่อเป็น "frame/paint"
+      sp = inst.begin("proc"); ...; sp.end()  # span ที่คร่อมหลายเฟรม (ไม่ซ้อนกับ stack)
+    ทุก span ถูกรวมในหน่วยความจำ (count, wall/cpu, histogram -> p50/p95/p99, memory delta)
+    และ flush เป็น JSON หนึ่งบรรทัดต่อชื่อ span ลง logs/spans_YYYYMMDD.jsonl ทุก flush_interval วินาที
+    """
+
+    def __init__(self, log_dir: str = "./logs", flush_interval: float = 60.0, memory: bool = True,
+                 clock=time.time):
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self.memory = memory and os.path.exists("/proc/self/statm")
+        self.clock = clock
+        self.stats: Dict[str, SpanStats] = {}
+        self.totals: Dict[str, SpanStats] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name: str, memory: Optional[bool] = None) -> Span:
+        """memory=False ข้ามการอ่าน RSS (~30 us) สำหรับ span ที่เกิดทุกเฟรม"""
+        stack = self._stack()
+        full = f"{stack[-1]}/{name}" if stack else name
+        stack.append(full)
+        return Span(self, full, True, self.memory if memory is None else memory and self.memory)
+
+    def begin(self, name: str, memory: Optional[bool] = None) -> Span:
+        return Span(self, name, False, self.memory if memory is None else memory and self.memory)
+
+    def record(self, name: str, wall_ms: float, cpu: float = 0.0):
+        self._add(name, wall_ms, cpu, 0.0, 0.0)
+
+    def _finish(self, span: Span, rss: float, peak: float):
+        if span.nested:
+            stack = self._stack()
+            if stack and stack[-1] == span.name:
+                stack.pop()
+        self._add(span.name, span.wall_ms, span.cpu_ms, rss, peak)
+
+    def _add(self, name, wall_ms, cpu, rss, peak):
+        with self._lock:
+            for table in (self.stats, self.totals):
+                st = table.get(name)
+                if st is None:
+                    st = table[name] = SpanStats()
+                st.add(wall_ms, cpu, rss, peak)
+        if self.flush_interval and self.clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def summary(self, name: str) -> Optional[dict]:
+        st = self.totals.get(name)
+        if st is None:
+            return None
+        return {"count": st.count, "p50_ms": st.percentile(50), "p95_ms": st.percentile(95),
+                "p99_ms": st.percentile(99), "mean_cpu_ms": st.cpu_ms / st.count}
+
+    def log_path(self, day: Optional[str] = None) -> str:
+        return os.path.join(self.log_dir, f"spans_{day or datetime.now().strftime('%Y%m%d')}.jsonl")
+
+    def flush(self):
+        """เขียนสถิติตั้งแต่ flush ล่าสุดต่อท้ายไฟล์ของวันนี้ แล้วเริ่มหน้าต่างใหม่"""
+        with self._lock:
+            stats, self.stats = self.stats, {}
+            self._last_flush = self.clock()
+        if not stats:
+            return
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with open(self.log_path(), "a", encoding="utf-8") as f:
+                for name, st in stats.items():
+                    f.write(json.dumps(dict(ts=ts, span=name, **st.to_row())) + "\n")
+        except Exception as e:
+            print(f"[timerlog] flush error: {e}", flush=True)
+
+
+# ---------------- Report CLI ----------------
+def load_report(paths: List[str]) -> Dict[str, SpanStats]:
+    merged: Dict[str, SpanStats] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                merged.setdefault(row["span"], SpanStats()).merge(row)
+    return merged
+
+def format_report(merged: Dict[str, SpanStats]) -> str:
+    lines = [f"{'span':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+             f"{'cpu ms':>9}{'rss KiB':>9}"]
+    for name in sorted(merged):
+        st = merged[name]
+        lines.append(f"{name:<28}{st.count:>8}{st.percentile(50):>10.2f}{st.percentile(95):>10.2f}"
+                     f"{st.percentile(99):>10.2f}{st.max_ms:>10.2f}{st.cpu_ms / st.count:>9.2f}{st.rss_kb:>9.0f}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize span logs written by timerlog.Instrument")
+    parser.add_argument("day", nargs="?", default=datetime.now().strftime("%Y%m%d"),
+                        help="YYYYMMDD (default: today) or a path to a spans_*.jsonl file")
+    parser.add_argument("--log-dir", default="./logs")
+    args = parser.parse_args()
+
+    paths = [args.day] if os.path.exists(args.day) else glob.glob(os.path.join(args.log_dir, f"spans_{args.day}.jsonl"))
+    if not paths:
+        print(f"no span log for {args.day} in {args.log_dir}")
+        raise SystemExit(1)
+    print(format_report(load_report(paths)))
+
+if __name__ == "__main__":
+    main()
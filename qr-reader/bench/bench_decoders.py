@@ -0,0 +1,197 @@
+# QR decoder backends head to head on the kiosk's logo QR codes
+# Run from the qr-reader folder:
+#   python -m bench.bench_decoders                               # every available backend + zbar,opencv cascade
+#   python -m bench.bench_decoders --backends zbar,opencv,zbar+wechat --count 40 --json decoders.json
+#
+# Fixtures follow Qr Code Generate Station/modules/qr_module.generate_qr_with_logo
+# (ERROR_CORRECT_H, round logo at logo_scale=0.31 with a 0.032 white ring, as
+# main.py calls it) with a synthetic painted portrait as the logo. Each one is
+# placed in a camera-sized frame and degraded the way the kiosk camera sees a
+# printed card (blur, tilt, dim light, glare, sensor noise, JPEG). Every
+# backend decodes the same grayscale frames; a hit means the expected token
+# came back. "a+b" in --backends is a Cascade (a first, b only on a miss).
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+import qrcode
+from PIL import Image, ImageDraw
+from read_qrcode_module.decoders import available_backends, get_decoder
+from read_qrcode_module.replay import gen_token
+
+FRAME_SIZE = (640, 480)
+
+
+# -------------------- FIXTURES --------------------
+def painted_logo(rng, size=256):
+    """ภาพสีเรียบๆ แบบภาพวาด (gradient + วงรีสี) แทนรูปที่ผ่าน paint_model"""
+    low = rng.integers(40, 230, (4, 4, 3)).astype(np.uint8)
+    img = cv2.resize(low, (size, size), interpolation=cv2.INTER_CUBIC)
+    for _ in range(6):
+        center = tuple(int(v) for v in rng.integers(0, size, 2))
+        axes = tuple(int(v) for v in rng.integers(size // 10, size // 3, 2))
+        color = tuple(int(v) for v in rng.integers(0, 256, 3))
+        cv2.ellipse(img, center, axes, float(rng.integers(0, 180)), 0, 360, color, -1)
+    return Image.fromarray(cv2.GaussianBlur(img, (9, 9), 0))
+
+
+def logo_qr(token, logo, logo_scale=0.31, border_ratio=0.032, box_size=10):
+    """เหมือน generate_qr_with_logo แต่คืนภาพ grayscale (numpy) แทนการบันทึกไฟล์"""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, box_size=box_size)
+    qr.add_data(token)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
+    w, h = img.size
+    size = min(logo.size)
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    logo = logo.convert("RGBA").resize((size, size), Image.LANCZOS)
+    logo.putalpha(mask)
+    logo_size = int(w * logo_scale)
+    logo = logo.resize((logo_size, logo_size), Image.LANCZOS)
+    border_size = int(logo_size * border_ratio)
+    bordered_size = logo_size + border_size * 2
+    bordered = Image.new("RGBA", (bordered_size, bordered_size), (255, 255, 255, 0))
+    mask = Image.new("L", (bordered_size, bordered_size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, bordered_size, bordered_size), fill=255)
+    bordered.paste(Image.new("RGBA", (bordered_size, bordered_size), (255, 255, 255, 255)), (0, 0), mask)
+    bordered.paste(logo, (border_size, border_size), logo)
+    img.paste(bordered, ((w - bordered_size) // 2, (h - bordered_size) // 2), bordered)
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2GRAY)
+
+
+def place(code, rng, fraction=0.5, frame_size=FRAME_SIZE):
+    """วาง QR (ขนาด fraction ของด้านสั้น) บนพื้นหลังโทนห้อง มี noise เล็กน้อย"""
+    width, height = frame_size
+    size = int(min(width, height) * fraction)
+    code = cv2.resize(code, (size, size), interpolation=cv2.INTER_AREA)
+    frame = np.clip(rng.normal(120, 6, (height, width)), 0, 255).astype(np.uint8)
+    y = (height - size) // 2 + int(rng.integers(-20, 21))
+    x = (width - size) // 2 + int(rng.integers(-40, 41))
+    frame[y:y + size, x:x + size] = code
+    return frame
+
+
+# -------------------- DEGRADATIONS --------------------
+def tilt(frame, rng, amount=0.18):
+    h, w = frame.shape[:2]
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    d = amount * min(w, h)
+    dst = src + np.float32([[d, d * 0.5], [-d * 0.3, 0], [-d, -d * 0.4], [d * 0.2, 0]])
+    return cv2.warpPerspective(frame, cv2.getPerspectiveTransform(src, dst), (w, h), borderValue=120)
+
+
+def rotate(frame, rng, angle=30):
+    h, w = frame.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(frame, m, (w, h), borderValue=120)
+
+
+def motion_blur(frame, rng, length=9):
+    kernel = np.zeros((length, length), np.float32)
+    kernel[length // 2, :] = 1.0 / length
+    return cv2.filter2D(frame, -1, kernel)
+
+
+def glare(frame, rng):
+    h, w = frame.shape[:2]
+    yy, xx = np.mgrid[0:h, 0:w]
+    cy, cx = h * 0.45, w * 0.55
+    spot = 170 * np.exp(-(((yy - cy) / (h * 0.12)) ** 2 + ((xx - cx) / (w * 0.1)) ** 2))
+    return np.clip(frame + spot, 0, 255).astype(np.uint8)
+
+
+def jpeg(frame, rng, quality=20):
+    return cv2.imdecode(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_GRAYSCALE)
+
+
+DEGRADATIONS = {
+    "clean": lambda f, rng: f,
+    "small": None,  # QR ไกลกล้อง: สร้างด้วย fraction เล็กลงแทน
+    "blur": lambda f, rng: cv2.GaussianBlur(f, (7, 7), 0),
+    "motion": motion_blur,
+    "tilt": tilt,
+    "rotate30": rotate,
+    "dim": lambda f, rng: cv2.convertScaleAbs(f, alpha=0.35, beta=20),
+    "glare": glare,
+    "noise": lambda f, rng: np.clip(f + rng.normal(0, 22, f.shape), 0, 255).astype(np.uint8),
+    "jpeg20": jpeg,
+}
+
+
+def make_fixtures(count, seed=0):
+    """{degradation: [(token, frame), ...]} ใช้ QR ชุดเดียวกันทุก degradation"""
+    rng = np.random.default_rng(seed)
+    codes = [(token, logo_qr(token, painted_logo(rng))) for token in (gen_token() for _ in range(count))]
+    fixtures = {}
+    for name, degrade in DEGRADATIONS.items():
+        drng = np.random.default_rng(seed + 1)
+        if degrade is None:
+            fixtures[name] = [(token, place(code, drng, fraction=0.22)) for token, code in codes]
+        else:
+            fixtures[name] = [(token, degrade(place(code, drng), drng)) for token, code in codes]
+    return fixtures
+
+
+# -------------------- RUN --------------------
+def run_backend(decode, frames):
+    """(hit rate, median ms, p95 ms) ของการ decode ทั้งเฟรม"""
+    times, hits = [], 0
+    for token, frame in frames:
+        t0 = time.perf_counter()
+        try:
+            res = decode(frame)
+        except Exception:
+            res = []
+        times.append((time.perf_counter() - t0) * 1000.0)
+        hits += token.encode() in res
+    times.sort()
+    return hits / len(frames), times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+
+
+def run(backends, fixtures):
+    results = {}
+    for spec in backends:
+        decode = get_decoder(spec.replace("+", ","))
+        results[spec] = {name: run_backend(decode, frames) for name, frames in fixtures.items()}
+        cascade_hits = getattr(decode, "hits", None)
+        if cascade_hits is not None:
+            results[spec]["_cascade_hits"] = dict(cascade_hits)
+    return results
+
+
+def print_results(results, fixtures):
+    names = list(fixtures)
+    print(f"{'backend':<16}" + "".join(f"{n:>10}" for n in names) + f"{'overall':>10}")
+    for spec, rows in results.items():
+        hits = [rows[n][0] for n in names]
+        print(f"{spec:<16}" + "".join(f"{h * 100:>9.0f}%" for h in hits) + f"{np.mean(hits) * 100:>9.0f}%")
+        ms = [rows[n][1] for n in names]
+        print(f"{'  median ms':<16}" + "".join(f"{m:>10.1f}" for m in ms) + f"{np.mean(ms):>10.1f}")
+        p95 = [rows[n][2] for n in names]
+        print(f"{'  p95 ms':<16}" + "".join(f"{m:>10.1f}" for m in p95) + f"{np.mean(p95):>10.1f}")
+        if "_cascade_hits" in rows:
+            print(f"  cascade hits by backend: {rows['_cascade_hits']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QR decoder backends on degraded logo QR fixtures")
+    parser.add_argument("--backends", help="comma separated; a+b = cascade (default: every available backend)")
+    parser.add_argument("--count", type=int, default=20, help="QR codes per degradation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",") if args.backends else available_backends() + ["+".join(available_backends()[:2])]
+    fixtures = make_fixtures(args.count, args.seed)
+    print(f"{args.count} logo QR codes x {len(fixtures)} degradations, {FRAME_SIZE[0]}x{FRAME_SIZE[1]} gray frames")
+    results = run(backends, fixtures)
+    print_results(results, fixtures)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Station -> ESP32 display messages: text lines vs binary frames (bytes, wire time, host encode/decode cost)
+# Run from the qr-reader folder: python -m bench.bench_display_protocol
+import argparse
+import time
+from read_qrcode_module.display_protocol import TextProtocol, BinaryProtocol, FrameDecoder
+from read_qrcode_module.replay import gen_token
+
+LINES = [
+    lambda: f"{gen_token()},1,10:15:00 AM\n",
+    lambda: f"{gen_token()},0,10:25:00 AM\n",
+    lambda: "TIME,-1,Checkout at 10:35:00 AM\n",
+]
+
+
+def text_decode(data):
+    return [line.split(",", 2) for line in data.decode("utf-8").splitlines()]
+
+
+def measure(protocol, decode, lines):
+    t0 = time.perf_counter()
+    encoded = [protocol.encode(line) for line in lines]
+    encode_us = (time.perf_counter() - t0) * 1e6 / len(lines)
+    t0 = time.perf_counter()
+    for data in encoded:
+        decode(data)
+    decode_us = (time.perf_counter() - t0) * 1e6 / len(lines)
+    size = sum(len(d) for d in encoded) / len(encoded)
+    return size, encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Display protocol benchmark")
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--baud", type=int, default=115200)
+    args = parser.parse_args()
+
+    lines = [LINES[i % len(LINES)]() for i in range(args.messages)]
+    decoder = FrameDecoder()
+    print(f"{args.messages} messages at {args.baud} baud (8N1)")
+    print(f"{'protocol':<10}{'bytes/msg':>11}{'wire ms/msg':>13}{'encode us':>11}{'decode us':>11}")
+    for name, protocol, decode in (("text", TextProtocol(), text_decode),
+                                   ("binary", BinaryProtocol(), decoder.feed)):
+        size, enc, dec = measure(protocol, decode, lines)
+        print(f"{name:<10}{size:>11.1f}{size * 10 / args.baud * 1000:>13.3f}{enc:>11.2f}{dec:>11.2f}")
+    print("display round trip: BinaryProtocol.rtt_ms on a station connected to the ESP32")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# MJPG decode cost per frame: OpenCV's BGR path vs luma-only (and half-size luma) decode, plus QR hit rate
+# Run from the qr-reader folder:
+#   python -m bench.bench_mjpeg_decode                          # synthetic 1280x720 camera-like JPEGs
+#   python -m bench.bench_mjpeg_decode --video recordings/booth1.avi   # recorded MJPG stream
+#   python -m bench.bench_mjpeg_decode --frames recordings/booth1/     # folder of .jpg frames
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from read_qrcode_module.autotune import paste_qr, qr_matrix
+from read_qrcode_module.camera import decode_mjpeg
+from read_qrcode_module.preprocess import RoiPreprocessor
+from read_qrcode_module.replay import gen_token
+from read_qrcode_module.scan_logic import ZBAR_OK, roi_box, decode_candidates, zbar_decode, opencv_decode
+
+
+def synthetic_jpegs(count, width, height, quality=80, seed=0):
+    """เฟรมแบบกล้อง (noise + gradient + QR) encode เป็น JPEG 4:2:2 เหมือน MJPG ของ UVC"""
+    rng = np.random.default_rng(seed)
+    grad = np.linspace(90, 200, width, dtype=np.float32)[None, :, None]
+    jpegs = []
+    for _ in range(count):
+        frame = np.clip(grad + rng.normal(0, 10, (height, width, 3)), 0, 255).astype(np.uint8)
+        frame = paste_qr(frame, qr_matrix(gen_token()), rng=rng)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality,
+                                               cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422])
+        jpegs.append(buf)
+    return jpegs
+
+
+def video_jpegs(path, limit):
+    """แพ็กเก็ต JPEG ดิบจากไฟล์ MJPG (ไม่ decode) ถ้า backend ให้ไม่ได้ จะ encode เฟรมที่ decode แล้วใหม่"""
+    cap = cv2.VideoCapture(path)
+    raw = cap.set(cv2.CAP_PROP_FORMAT, -1)
+    jpegs = []
+    while len(jpegs) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if raw and frame.ndim == 2 and frame.shape[0] == 1:
+            jpegs.append(frame.reshape(-1).copy())
+        else:
+            jpegs.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1])
+    cap.release()
+    return jpegs
+
+
+def folder_jpegs(path, limit):
+    files = sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.jpeg")))[:limit]
+    return [np.fromfile(f, dtype=np.uint8) for f in files]
+
+
+def measure(jpegs, mode, decode, repeat=3):
+    """(cpu ms ต่อเฟรมสำหรับ decode จนได้ภาพขาวดำ, hit rate ผ่าน ROI + preprocess + decoder)"""
+    best = float("inf")
+    for _ in range(repeat):
+        c0 = time.process_time()
+        for buf in jpegs:
+            img = decode_mjpeg(buf, mode)
+            if mode == "bgr":
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # station ทำขั้นนี้ใน RoiPreprocessor อยู่แล้ว
+        best = min(best, time.process_time() - c0)
+    pre = RoiPreprocessor()
+    hits = 0
+    for buf in jpegs:
+        img = decode_mjpeg(buf, mode)
+        roi_x, roi_y, _, roi_x2, roi_y2 = roi_box(img)
+        hits += decode_candidates(pre.process(img[roi_y:roi_y2, roi_x:roi_x2]), decode) is not None
+    return best * 1000.0 / len(jpegs), hits / len(jpegs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MJPG decode benchmark (BGR vs luma-only)")
+    parser.add_argument("--video", help="recorded MJPG video (.avi)")
+    parser.add_argument("--frames", help="folder of .jpg frames")
+    parser.add_argument("--count", type=int, default=60)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--decoder", choices=("zbar", "opencv"), default="zbar" if ZBAR_OK else "opencv")
+    args = parser.parse_args()
+
+    if args.video:
+        jpegs, source = video_jpegs(args.video, args.count), args.video
+    elif args.frames:
+        jpegs, source = folder_jpegs(args.frames, args.count), args.frames
+    else:
+        jpegs, source = synthetic_jpegs(args.count, args.width, args.height), f"synthetic {args.width}x{args.height}"
+    if not jpegs:
+        raise SystemExit("no frames")
+    decode = zbar_decode if args.decoder == "zbar" else opencv_decode
+    size = decode_mjpeg(jpegs[0], "bgr").shape
+    print(f"{len(jpegs)} frames ({source}, {size[1]}x{size[0]}, {sum(map(len, jpegs)) / len(jpegs) / 1024:.0f} KiB avg), "
+          f"decoder {args.decoder}")
+    print(f"{'mode':<8}{'ms/frame':>10}{'fps/core':>10}{'hit rate':>10}")
+    base = None
+    for mode in ("bgr", "gray", "gray2"):
+        ms, hit = measure(jpegs, mode, decode)
+        base = base or ms
+        print(f"{mode:<8}{ms:>10.2f}{1000.0 / ms:>10.0f}{hit * 100:>9.0f}%  ({ms / base * 100:.0f}% of bgr)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Micro-benchmark: ROI preprocessing (legacy per-frame allocation vs RoiPreprocessor)
+# Run from the qr-reader folder: python -m bench.bench_preprocess
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from read_qrcode_module.preprocess import RoiPreprocessor
+
+
+def legacy_preprocess(roi):
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    gray = clahe.apply(gray)
+    th1 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                cv2.THRESH_BINARY, 31, 5)
+    th2 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    candidates = [gray, th1, th2]
+    for base in [gray, th1, th2]:
+        candidates.append(cv2.resize(base, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR))
+    return [np.ascontiguousarray(img, dtype=np.uint8) for img in candidates]
+
+
+def make_frame(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(frame, (5, 5), 0)
+
+
+def roi_of(frame, ratio=0.7):
+    h, w = frame.shape[:2]
+    size = int(min(h, w) * ratio)
+    x = (w - size) // 2
+    y = (h - size) // 2
+    return frame[y:y + size, x:x + size]
+
+
+def measure(fn, roi, frames):
+    fn(roi)  # warm up
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn(roi)
+    per_frame_ms = (time.perf_counter() - t0) * 1000.0 / frames
+
+    tracemalloc.start()
+    peaks = []
+    blocks = []
+    for _ in range(min(frames, 50)):
+        if hasattr(tracemalloc, "reset_peak"):
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        else:
+            # Python 3.8 ไม่มี reset_peak: start ใหม่ล้าง peak และ trace เดิม snapshot หลัง fn จึงมีแต่ block ของ fn
+            tracemalloc.stop()
+            tracemalloc.start()
+            before = None
+        out = fn(roi)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        after = tracemalloc.take_snapshot()
+        if before is None:
+            blocks.append(sum(s.count for s in after.statistics("lineno")))
+        else:
+            blocks.append(sum(max(0, d.count_diff) for d in after.compare_to(before, "lineno")))
+        del out
+    tracemalloc.stop()
+    return per_frame_ms, float(np.mean(peaks)) / 1024.0, float(np.mean(blocks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ROI preprocessing micro-benchmark")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    roi = roi_of(make_frame(args.width, args.height))
+    pre = RoiPreprocessor()
+
+    print(f"ROI {roi.shape[1]}x{roi.shape[0]}, {args.frames} frames")
+    print(f"{'variant':<10}{'ms/frame':>10}{'peak KiB/frame':>16}{'live blocks/frame':>19}")
+    for name, fn in (("legacy", legacy_preprocess), ("buffered", pre.process)):
+        ms, kib, blocks = measure(fn, roi, args.frames)
+        print(f"{name:<10}{ms:>10.3f}{kib:>16.1f}{blocks:>19.1f}")
+    print(f"buffer reallocations (buffered): {pre.allocations}")
+
+
+if __name__ == "__main__":
+    main()
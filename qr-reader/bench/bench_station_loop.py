@@ -0,0 +1,119 @@
+# Barcode station loop: threaded 10 ms polling (StationRuntime.run + BarcodeSource) vs asyncio core
+# (AsyncBarcodeStation + SerialStream). A pty stands in for the ESP32 and a FakeInputDevice types the scans.
+# Run from the qr-reader folder: python -m bench.bench_station_loop
+import argparse
+import asyncio
+import os
+import select
+import threading
+import time
+import numpy as np
+import serial
+from read_qrcode_module.aio_station import AsyncBarcodeStation, AsyncSerialSink, SerialStream
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.replay import FakeInputDevice, ScanEvent, KEY_ENTER, gen_token
+from read_qrcode_module.scan_logic import ScanGate
+from read_qrcode_module.station import StationRuntime, BarcodeSource, SerialDisplaySink
+
+LOCATION = "Bench"
+
+
+class FakeEsp32:
+    """อ่านฝั่ง master ของ pty แล้วจดเวลาที่ได้รับแต่ละบรรทัด"""
+
+    def __init__(self):
+        self.master, slave = os.openpty()
+        self.port = os.ttyname(slave)
+        self.slave = slave
+        self.received = []
+        self._stop = False
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        buf = b""
+        while not self._stop:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            now = time.perf_counter()
+            buf += data
+            while b"\n" in buf:
+                _, _, buf = buf.partition(b"\n")
+                self.received.append(now)
+
+    def close(self):
+        self._stop = True
+        self._thread.join(1)
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def make_device(args):
+    scans = [ScanEvent(gen_token(), args.idle + 0.5 + i * args.interval) for i in range(args.scans)]
+    return FakeInputDevice(scans, realtime=True)
+
+
+def make_reader():
+    reader = ReaderLogic(LOCATION, 5, 600)
+    reader.scan_history = {}
+    return reader
+
+
+def start_threaded(dev, port):
+    ser = serial.Serial(port, 115200, timeout=1)
+    station = StationRuntime(LOCATION, BarcodeSource(dev), sinks=[SerialDisplaySink(ser)],
+                             reader=make_reader(), gate=ScanGate(0))
+    station.start()
+    return station.stop
+
+
+def start_async(dev, port):
+    stream = SerialStream(serial.Serial(port, 115200, timeout=1))
+    station = StationRuntime(LOCATION, sinks=[AsyncSerialSink(stream)], reader=make_reader(), gate=ScanGate(0))
+    thread = threading.Thread(target=asyncio.run, args=(AsyncBarcodeStation(station, dev, stream).run(),),
+                              daemon=True)
+    thread.start()
+    return lambda: thread.join(2)
+
+
+def measure(start, args):
+    esp = FakeEsp32()
+    dev = make_device(args)
+    stop = start(dev, esp.port)
+    time.sleep(0.5)  # warm up
+    c0, w0 = time.process_time(), time.perf_counter()
+    time.sleep(args.idle - 0.5)
+    idle_cpu = (time.process_time() - c0) / (time.perf_counter() - w0) * 100.0
+    end = dev.t0 + dev.events[-1].t + 0.5
+    time.sleep(max(0.0, end - time.perf_counter()))
+    stop()
+    esp.close()
+
+    # นับจากเวลาที่ device ส่ง ENTER ออกมาจริง (asyncio.sleep ของ fake device ตื่นช้ากว่า time.sleep)
+    enters = [t for e, t in zip(dev.events, dev.delivered) if e.code == KEY_ENTER and e.value == 1]
+    lat = np.array([(r - t) * 1000.0 for t, r in zip(enters, esp.received)])
+    return idle_cpu, lat, len(esp.received)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barcode station event-loop benchmark")
+    parser.add_argument("--idle", type=float, default=3.0, help="seconds without scans for the CPU figure")
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between scans")
+    args = parser.parse_args()
+
+    print(f"{args.scans} scans every {args.interval}s after {args.idle}s idle, no lockout")
+    print(f"{'variant':<10}{'idle CPU %':>12}{'sent':>6}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for name, start in (("threaded", start_threaded), ("asyncio", start_async)):
+        cpu, lat, sent = measure(start, args)
+        p50, p95, worst = (np.percentile(lat, 50), np.percentile(lat, 95), lat.max()) if len(lat) else (0, 0, 0)
+        print(f"{name:<10}{cpu:>12.2f}{sent:>6}{p50:>9.2f}{p95:>9.2f}{worst:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# Benchmark suite for the scan log, ReaderLogic and the decode pipeline, with JSON results and regression check
+# Run from the qr-reader folder:
+#   python -m bench.bench_suite --save bench_results.json
+#   python -m bench.bench_suite --compare bench_results.json --threshold 0.25
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from read_qrcode_module.preprocess import RoiPreprocessor
+from read_qrcode_module.qr_reader import QRData
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.scan_store import ScanStore
+from read_qrcode_module.visitor_cache import VisitorCache
+from read_qrcode_module.scan_logic import (ZBAR_OK, roi_box, decode_candidates, zbar_decode, opencv_decode,
+                                           token_format)
+from test.gen_qrcode import QRGen
+
+LOCATION = "Bench"
+
+
+def timed(fn, repeat=3):
+    """เวลาที่ดีที่สุด (วินาที) จาก repeat รอบ"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def write_records(path, count, gen=None):
+    gen = gen or QRGen()
+    now = int(time.time())
+    logs = [QRData(gen.generate_token(), LOCATION, i % 2, now - count + i).compress_data() for i in range(count)]
+    with open(path, "w", encoding="UTF-8") as log_file:
+        json.dump(logs, log_file, indent=4, ensure_ascii=False)
+
+
+# -------------------- BENCHMARKS --------------------
+def bench_log_write(tmp, records=300):
+    """QRData.write_data ทีละ record (อ่าน+เขียนทั้งไฟล์ทุกครั้ง)"""
+    path = os.path.join(tmp, "write_qr_log.json")
+    gen = QRGen()
+    tokens = [gen.generate_token() for _ in range(records)]
+
+    def run():
+        if os.path.exists(path):
+            os.remove(path)
+        for token in tokens:
+            qr_data = QRData(token, LOCATION, 1, int(time.time()))
+            qr_data.qr_log = path
+            qr_data.write_data()
+
+    return {"log_write_records_per_s": (records / timed(run, 1), "records/s", True)}
+
+
+def bench_load_data(tmp, sizes=(1000, 10000, 100000)):
+    results = {}
+    for size in sizes:
+        path = os.path.join(tmp, f"load_qr_log_{size}.json")
+        write_records(path, size)
+        sec = timed(lambda: ReaderLogic(LOCATION, 5, 600, log_file=path))
+        results[f"load_data_{size // 1000}k_ms"] = (sec * 1000.0, "ms", False)
+    return results
+
+
+def bench_read_qr(tmp, decisions=50000, unique=500, seed=0):
+    """สุ่มลำดับ scan จาก token unique ตัว บนนาฬิกาเสมือน (มีทั้ง check in/out, wait, too soon)"""
+    rng = np.random.default_rng(seed)
+    gen = QRGen()
+    pool = [gen.generate_token() for _ in range(unique)]
+    picks = rng.integers(0, unique, size=decisions)
+    steps = rng.exponential(2.0, size=decisions)
+    clock_t = [0.0]
+    reader = ReaderLogic(LOCATION, 5, 600, clock=lambda: clock_t[0], log_file=os.path.join(tmp, "none.json"))
+
+    def run():
+        reader.scan_history = {}
+        clock_t[0] = 1.7e9
+        for i, step in zip(picks, steps):
+            clock_t[0] += step
+            reader.read_qr(pool[i])
+
+    return {"read_qr_decisions_per_s": (decisions / timed(run), "decisions/s", True)}
+
+
+def bench_scan_store(tmp, rows=1000000, lookups=20000, tokens=50000, seed=0):
+    """ScanStore (SQLite WAL): insert เป็นชุดละ 500 แถว, หา scan ล่าสุดของ token, ช่วงเวลา 1 ชม., สร้าง scan_history"""
+    rng = np.random.default_rng(seed)
+    gen = QRGen()
+    pool = [gen.generate_token() for _ in range(tokens)]
+    locations = [f"Place{i}" for i in range(4)]
+    t_start = 1.7e9
+    picks = rng.integers(0, tokens, size=rows)
+    store = ScanStore(os.path.join(tmp, f"scan_store_{rows}.db"), flush_interval=0, batch_size=500)
+    data = [(pool[p], locations[i % 4], i % 2, int(t_start + i)) for i, p in enumerate(picks)]
+
+    t0 = time.perf_counter()
+    for i in range(0, rows, 500):
+        store.add_many(data[i:i + 500])
+    insert_s = time.perf_counter() - t0
+
+    probe = [pool[i] for i in rng.integers(0, tokens, size=lookups)]
+    lookup_s = timed(lambda: [store.last_scan(token, "Place1") for token in probe], 1)
+    mid = t_start + rows // 2
+    range_s = timed(lambda: store.scans_between("Place1", mid, mid + 3600))
+    history_s = timed(lambda: store.checked_in("Place1"))
+    store.close()
+    return {
+        "store_insert_rows_per_s": (rows / insert_s, "rows/s", True),
+        "store_lookup_per_s": (lookups / lookup_s, "lookups/s", True),
+        "store_range_1h_ms": (range_s * 1000.0, "ms", False),
+        "store_checked_in_ms": (history_s * 1000.0, "ms", False),
+    }
+
+
+def bench_visitor_cache(tmp, visitors=20000, scans=200000, booths=8, seed=0):
+    """VisitorCache: กิน JSON จาก topic, lookup progress ของ token, หน่วยความจำต่อ visitor"""
+    rng = np.random.default_rng(seed)
+    gen = QRGen()
+    pool = [gen.generate_token() for _ in range(visitors)]
+    places = [f"Place{i}" for i in range(booths)]
+    payloads = [json.dumps({"token": pool[t], "location": places[b], "check": int(c), "epoch": 1700000000 + i})
+                for i, (t, b, c) in enumerate(zip(rng.integers(0, visitors, size=scans),
+                                                   rng.integers(0, booths, size=scans),
+                                                   rng.integers(0, 2, size=scans)))]
+    tracemalloc.start()
+    cache = VisitorCache(places)
+    t0 = time.perf_counter()
+    for payload in payloads:
+        cache.on_message(payload)
+    ingest_s = time.perf_counter() - t0
+    per_visitor = tracemalloc.get_traced_memory()[0] / len(cache)
+    tracemalloc.stop()
+    probe = [pool[i] for i in rng.integers(0, visitors, size=50000)]
+    lookup_s = timed(lambda: [cache.progress(token) for token in probe])
+    return {
+        "visitor_ingest_msgs_per_s": (scans / ingest_s, "msgs/s", True),
+        "visitor_lookup_us": (lookup_s * 1e6 / len(probe), "us", False),
+        "visitor_bytes_per_token": (per_visitor, "bytes", False),
+    }
+
+
+def make_fixture_frames(tmp, count=20, width=1280, height=720, seed=0):
+    """ภาพ QR จาก QRGen วางบนเฟรมขนาดกล้อง พร้อม noise เล็กน้อย"""
+    rng = np.random.default_rng(seed)
+    gen = QRGen()
+    frames = []
+    for i in range(count):
+        token = gen.generate_token()
+        path = os.path.join(tmp, f"qr_{i}.png")
+        gen.generate_qrcode(token, path)
+        qr = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        size = int(rng.integers(220, 380))
+        qr = cv2.resize(qr, (size, size), interpolation=cv2.INTER_NEAREST)
+        frame = np.full((height, width), 170, dtype=np.uint8)
+        y = (height - size) // 2 + int(rng.integers(-40, 40))
+        x = (width - size) // 2 + int(rng.integers(-80, 80))
+        frame[y:y + size, x:x + size] = qr
+        noise = rng.normal(0, 6, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        frames.append((token, cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)))
+    return frames
+
+
+def bench_decode(tmp, count=20, decode=None):
+    decode = decode or (zbar_decode if ZBAR_OK else opencv_decode)
+    frames = make_fixture_frames(tmp, count)
+    pre = RoiPreprocessor()
+    hits = 0
+    t0 = time.perf_counter()
+    for token, frame in frames:
+        roi_x, roi_y, _, roi_x2, roi_y2 = roi_box(frame)
+        found = decode_candidates(pre.process(frame[roi_y:roi_y2, roi_x:roi_x2]), decode)
+        hits += found == token and bool(token_format.match(found))
+    ms = (time.perf_counter() - t0) * 1000.0 / len(frames)
+    return {
+        "decode_ms_per_frame": (ms, "ms", False),
+        "decode_hit_rate": (hits / len(frames), "ratio", True),
+    }
+
+
+BENCHMARKS = {
+    "log_write": bench_log_write,
+    "load_data": bench_load_data,
+    "read_qr": bench_read_qr,
+    "scan_store": bench_scan_store,
+    "visitor_cache": bench_visitor_cache,
+    "decode": bench_decode,
+}
+
+
+# -------------------- RESULTS --------------------
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def run_suite(names=None, quick=False):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names or BENCHMARKS:
+            fn = BENCHMARKS[name]
+            if quick:
+                kwargs = {"log_write": {"records": 30}, "load_data": {"sizes": (1000,)},
+                          "read_qr": {"decisions": 2000},
+                          "scan_store": {"rows": 20000, "lookups": 2000, "tokens": 2000},
+                          "visitor_cache": {"visitors": 1000, "scans": 5000}, "decode": {"count": 3}}[name]
+                measured = fn(tmp, **kwargs)
+            else:
+                measured = fn(tmp)
+            for key, (value, unit, higher_is_better) in measured.items():
+                results[key] = {"value": round(float(value), 4), "unit": unit, "higher_is_better": higher_is_better}
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "decoder": "zbar" if ZBAR_OK else "opencv",
+        "time": int(time.time()),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.25):
+    """คืนรายการ (ชื่อ, ค่าเดิม, ค่าใหม่, เปลี่ยนไปกี่ส่วน) ที่แย่ลงเกิน threshold"""
+    regressions = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if cur["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append((key, base["value"], cur["value"], worse))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan log / ReaderLogic / decode benchmark suite")
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small sizes (smoke run)")
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    report = run_suite(args.only, args.quick)
+    print(f"commit {report['commit']}, python {report['python']}, decoder {report['decoder']}")
+    for key, r in report["results"].items():
+        print(f"{key:<28}{r['value']:>14.3f} {r['unit']}")
+    if args.save:
+        with open(args.save, "w", encoding="UTF-8") as f:
+            json.dump(report, f, indent=4)
+    if args.compare:
+        with open(args.compare, "r", encoding="UTF-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for key, old, new, worse in regressions:
+            print(f"REGRESSION {key}: {old} -> {new} ({worse * 100:.0f}% worse)")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regression beyond {args.threshold * 100:.0f}% against {baseline.get('commit')}")
+
+
+if __name__ == "__main__":
+    main()
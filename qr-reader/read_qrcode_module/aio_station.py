@@ -0,0 +1,203 @@
+# asyncio core for the barcode station: scanner events, ESP32 MODE: lines and
+# outgoing serial writes are all awaited, so the process sleeps until input arrives.
+import asyncio
+import serial
+
+try:
+    from .barcode_input import KeyDecoder
+    from .display_protocol import FrameDecoder, TextProtocol
+    from .reader_logic import parse_mode_line
+    from .station import open_serial_once
+except ImportError:
+    from barcode_input import KeyDecoder
+    from display_protocol import FrameDecoder, TextProtocol
+    from reader_logic import parse_mode_line
+    from station import open_serial_once
+
+
+class SerialStream:
+    """
+    Serial link to the ESP32 driven by the event loop. Incoming bytes are read
+    when the fd becomes readable (loop.add_reader) and complete lines are passed
+    to on_line; outgoing lines go through a bounded queue drained by a writer
+    task (the oldest pending line is dropped when it is full). If the port
+    fails it is closed and reopened every reconnect_delay seconds in the
+    background while scanning continues. protocol encodes each line at write
+    time and receives the ACK frames coming back (see display_protocol).
+    """
+
+    def __init__(self, ser=None, port=None, baudrate=115200, max_pending=32, reconnect_delay=2.0, on_line=None,
+                 protocol=None):
+        self.protocol = protocol or TextProtocol()
+        self.ser = ser
+        self.port = port
+        self.baudrate = baudrate
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self.on_line = on_line
+        self.reconnects = 0
+        self.dropped = 0
+        self._decoder = FrameDecoder()
+        self._queue = None
+        self._ready = None
+        self._lost = None
+
+    def write_nowait(self, line):
+        if self._queue is None:
+            self.dropped += 1
+            return False
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+        self._queue.put_nowait(line)
+        return True
+
+    async def drain(self, timeout=1.0):
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.max_pending)
+        self._ready = asyncio.Event()
+        writer = asyncio.ensure_future(self._writer())
+        first = self.ser is not None
+        try:
+            while True:
+                if self.ser is None:
+                    self.ser = await loop.run_in_executor(None, open_serial_once, self.baudrate, 1, self.port)
+                    if self.ser is None:
+                        await asyncio.sleep(self.reconnect_delay)
+                        continue
+                    if first:
+                        self.reconnects += 1
+                    first = True
+                fd = self.ser.fileno()
+                self._lost = loop.create_future()
+                loop.add_reader(fd, self._on_readable)
+                self._ready.set()
+                try:
+                    await self._lost
+                finally:
+                    self._ready.clear()
+                    loop.remove_reader(fd)
+                print("Serial port disconnected. Attempting to reconnect...")
+                self._close()
+                await asyncio.sleep(self.reconnect_delay)
+        finally:
+            writer.cancel()
+            self._close()
+
+    def _close(self):
+        try:
+            if self.ser is not None:
+                self.ser.close()
+        except Exception:
+            pass
+        self.ser = None
+
+    def _mark_lost(self, e):
+        if self._lost is not None and not self._lost.done():
+            self._lost.set_result(e)
+
+    def _on_readable(self):
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except (OSError, serial.SerialException) as e:
+            self._mark_lost(e)
+            return
+        for item in self._decoder.feed(data):
+            if not isinstance(item, str):
+                self.protocol.on_frame(item)
+            elif self.on_line is not None:
+                self.on_line(item)
+
+    async def _writer(self):
+        while True:
+            line = await self._queue.get()
+            try:
+                await self._ready.wait()
+                self.ser.write(self.protocol.encode(line))
+            except (OSError, serial.SerialException) as e:
+                self._mark_lost(e)
+            finally:
+                self._queue.task_done()
+
+
+def mode_listener(station):
+    """on_line callback for SerialStream: applies ESP32 MODE: lines to station.check_mode"""
+    def on_line(line):
+        mode = parse_mode_line(line)
+        if mode is not None:
+            station.check_mode = mode
+            print(f"[MODE] Received mode from ESP32 => {mode}")
+    return on_line
+
+
+class AsyncSerialSink:
+    """StationRuntime sink that queues serial lines on a SerialStream instead of writing inline."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def emit(self, outcome):
+        if outcome.serial_line:
+            self.stream.write_nowait(outcome.serial_line)
+
+
+class AsyncBarcodeStation:
+    """
+    Runs a StationRuntime from one evdev scanner on the event loop. The
+    scanner's async_read_loop, the SerialStream reader and the serial writer
+    are separate awaitables; nothing polls.
+    """
+
+    def __init__(self, station, device, serial_stream=None):
+        self.station = station
+        self.device = device
+        self.serial_stream = serial_stream
+        if serial_stream is not None:
+            serial_stream.on_line = mode_listener(station)
+
+    async def read_scanner(self):
+        dev = self.device
+        if isinstance(dev, str):
+            from evdev import InputDevice
+            dev = InputDevice(dev)
+        keys = KeyDecoder()
+        station = self.station
+        try:
+            async for event in dev.async_read_loop():
+                token = keys.feed(event)
+                if not token:
+                    continue
+                wait = station.gate.next_ready() - station.clock()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # token รอจนกว่า lockout จะหมด
+                station.poll_mode()  # sink แบบ sync (SerialDisplaySink) ยังอ่าน MODE: เองได้
+                try:
+                    station.step_token(token)
+                except Exception as e:
+                    print(f"[{station.name}] Error: {e}")
+        finally:
+            try: dev.close()
+            except Exception: pass
+
+    async def run(self):
+        self.station.open()
+        serial_task = None
+        if self.serial_stream is not None:
+            serial_task = asyncio.ensure_future(self.serial_stream.run())
+        try:
+            await self.read_scanner()
+            if self.serial_stream is not None:
+                await self.serial_stream.drain()
+        finally:
+            if serial_task is not None:
+                serial_task.cancel()
+                await asyncio.gather(serial_task, return_exceptions=True)
+            self.station.stop()
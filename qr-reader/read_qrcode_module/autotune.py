@@ -0,0 +1,243 @@
+# Capture auto-tuning: pick the cheapest camera mode + ROI that still decodes reliably
+#
+#   python -m read_qrcode_module.autotune                 # synthetic QR pasted into live frames
+#   python -m read_qrcode_module.autotune --live          # hold a real QR code in front of the camera
+#   python read_qrcode_module/read_qrcode_webcam.py --autotune
+#
+# Every (resolution, FOURCC) the camera accepts is opened and timed (delivered
+# FPS, CPU ms per captured frame) through the same FOURCC/decode path as
+# Camera(decode=CameraDecode), so gray decode is measured as raw MJPG +
+# imdecode to luma, not as OpenCV's BGR conversion. Its frames are then run through the
+# station's ROI crop + RoiPreprocessor + decoder for every (ROI ratio, upscale)
+# pair. A QR code is pasted in at the same fraction of the field of view at
+# every resolution, so lower resolutions see fewer pixels per module, just
+# like a real code held at the same distance. The cheapest combination
+# (capture + decode CPU per frame) reaching target_hit_rate is saved to
+# capture_profile.json, which the webcam station loads at start-up.
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+import cv2
+import numpy as np
+
+try:
+    from .camera import DecodedCapture, configure_capture
+    from .preprocess import RoiPreprocessor
+    from .scan_logic import ZBAR_OK, roi_box, decode_candidates, zbar_decode, opencv_decode, token_format
+    from .station import load_config, CONFIG_FILE
+except ImportError:
+    from camera import DecodedCapture, configure_capture
+    from preprocess import RoiPreprocessor
+    from scan_logic import ZBAR_OK, roi_box, decode_candidates, zbar_decode, opencv_decode, token_format
+    from station import load_config, CONFIG_FILE
+
+PROFILE_FILE = "capture_profile.json"
+MODES = ((640, 480), (800, 600), (1280, 720))
+FOURCCS = ("MJPG", "YUYV")
+ROI_RATIOS = (0.5, 0.6, 0.7)
+UPSCALES = (1.0, 1.5)
+QR_FRACTION = 0.22   # ขนาด QR เทียบกับด้านสั้นของภาพ (ถือห่างกล้องประมาณระยะใช้งานจริง)
+
+CaptureProfile = namedtuple("CaptureProfile",
+                            "width height fourcc roi_ratio upscale fps capture_ms decode_ms hit_rate camera_decode",
+                            defaults=("bgr",))  # profile เก่าที่ไม่มี camera_decode = วัดแบบ BGR
+
+
+def fourcc_str(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip("\x00")
+
+
+def open_cv2_capture(index, width, height, fourcc, decode="bgr"):
+    """เปิดกล้องแบบเดียวกับ Camera (FOURCC, raw MJPG, decode) แต่ไม่มี thread อ่านเฟรมเบื้องหลัง"""
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        return None
+    configure_capture(cap, width, height, fourcc, decode)
+    return DecodedCapture(cap, decode)
+
+
+def measure_capture(cap, frames=30, warmup=5, keep=10):
+    """อ่าน frames เฟรม -> (fps, cpu ms ต่อเฟรม, เฟรมตัวอย่าง keep เฟรม) หรือ None ถ้าอ่านไม่ได้"""
+    for _ in range(warmup):
+        cap.read()
+    samples = []
+    got = 0
+    t0, c0 = time.perf_counter(), time.process_time()
+    for i in range(frames):
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            continue
+        got += 1
+        if len(samples) < keep and i % max(1, frames // keep) == 0:
+            samples.append(frame.copy())
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    if not got:
+        return None
+    return got / wall, cpu * 1000.0 / got, samples
+
+
+# -------------------- PROBE --------------------
+def qr_matrix(token):
+    import qrcode
+    qr = qrcode.QRCode(border=4)
+    qr.add_data(token)
+    qr.make(fit=True)
+    return np.where(np.array(qr.get_matrix(), dtype=bool), 0, 255).astype(np.uint8)
+
+
+def paste_qr(frame, matrix, fraction=QR_FRACTION, rng=None):
+    """วาง QR ขนาด fraction ของด้านสั้น กลางภาพ (เลื่อนสุ่มเล็กน้อย) ผสม texture ของเฟรมจริง"""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    h, w = frame.shape[:2]
+    size = max(matrix.shape[0], int(min(h, w) * fraction))
+    code = cv2.resize(matrix, (size, size), interpolation=cv2.INTER_AREA)
+    jitter = int(min(h, w) * 0.08)
+    y = int(np.clip((h - size) // 2 + rng.integers(-jitter, jitter + 1), 0, h - size))
+    x = int(np.clip((w - size) // 2 + rng.integers(-jitter, jitter + 1), 0, w - size))
+    out = frame.copy()
+    region = out[y:y + size, x:x + size]
+    code = cv2.cvtColor(code, cv2.COLOR_GRAY2BGR) if out.ndim == 3 else code
+    out[y:y + size, x:x + size] = cv2.addWeighted(code, 0.85, region, 0.15, 0)
+    return out
+
+
+def probe_frames(frames, live=False, seed=0):
+    """[(frame, token ที่คาดไว้ หรือ None = ยอมรับ token รูปแบบถูกต้องใดๆ)]"""
+    if live:
+        return [(frame, None) for frame in frames]
+    try:
+        from .replay import gen_token
+    except ImportError:
+        from replay import gen_token
+    rng = np.random.default_rng(seed)
+    probes = []
+    for frame in frames:
+        token = gen_token()
+        probes.append((paste_qr(frame, qr_matrix(token), rng=rng), token))
+    return probes
+
+
+def score_decode(probes, roi_ratio, upscale, decode):
+    """(hit rate, cpu ms ต่อเฟรม) ของ ROI crop + preprocess + decode แบบเดียวกับ StationRuntime.step_frame"""
+    pre = RoiPreprocessor(upscale=upscale)
+    hits = 0
+    c0 = time.process_time()
+    for frame, expected in probes:
+        roi_x, roi_y, _, roi_x2, roi_y2 = roi_box(frame, roi_ratio)
+        token = decode_candidates(pre.process(frame[roi_y:roi_y2, roi_x:roi_x2]), decode)
+        if token and (token == expected if expected else token_format.match(token)):
+            hits += 1
+    return hits / len(probes), (time.process_time() - c0) * 1000.0 / len(probes)
+
+
+# -------------------- SEARCH --------------------
+def autotune(open_capture, modes=MODES, fourccs=FOURCCS, roi_ratios=ROI_RATIOS, upscales=UPSCALES,
+             target_hit_rate=0.9, frames=30, live=False, decode=None, camera_decode="bgr", log=print):
+    """
+    open_capture(width, height, fourcc) -> object with read()/release()/get() (DecodedCapture) or None,
+    opened with camera_decode (บันทึกลง profile ด้วย ให้ station ใช้ decode เดียวกับตอนวัด)
+    คืน (profile ที่เลือก, ผลทั้งหมด) โดยเลือก capture_ms + decode_ms ต่ำสุดที่ hit_rate >= target
+    (ถ้าไม่มีเลย เลือก hit_rate สูงสุด)
+    """
+    decode = decode or (zbar_decode if ZBAR_OK else opencv_decode)
+    results = []
+    seen_modes = set()
+    for width, height in modes:
+        for fourcc in fourccs:
+            cap = open_capture(width, height, fourcc)
+            if cap is None:
+                continue
+            try:
+                actual = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or width,
+                          int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or height,
+                          fourcc_str(cap.get(cv2.CAP_PROP_FOURCC)) or fourcc)
+                if actual in seen_modes:
+                    continue  # กล้องไม่รองรับโหมดที่ขอ และให้โหมดที่วัดไปแล้วมาแทน
+                seen_modes.add(actual)
+                measured = measure_capture(cap, frames)
+            finally:
+                cap.release()
+            if measured is None:
+                continue
+            fps, capture_ms, samples = measured
+            probes = probe_frames(samples, live)
+            for roi_ratio in roi_ratios:
+                for upscale in upscales:
+                    hit_rate, decode_ms = score_decode(probes, roi_ratio, upscale, decode)
+                    profile = CaptureProfile(actual[0], actual[1], actual[2], roi_ratio, upscale,
+                                             round(fps, 1), round(capture_ms, 2), round(decode_ms, 2),
+                                             round(hit_rate, 3), camera_decode)
+                    results.append(profile)
+                    log(f"[AUTOTUNE] {describe(profile)}")
+    if not results:
+        return None, results
+    passing = [p for p in results if p.hit_rate >= target_hit_rate]
+    if passing:
+        best = min(passing, key=lambda p: (p.capture_ms + p.decode_ms, -p.hit_rate))
+    else:
+        best = max(results, key=lambda p: (p.hit_rate, -(p.capture_ms + p.decode_ms)))
+    return best, results
+
+
+def describe(p):
+    return (f"{p.width}x{p.height} {p.fourcc}/{p.camera_decode} roi {p.roi_ratio:.2f} x{p.upscale:g}: {p.fps:.1f} fps, "
+            f"capture {p.capture_ms:.1f} ms + decode {p.decode_ms:.1f} ms CPU/frame, hit {p.hit_rate * 100:.0f}%")
+
+
+# -------------------- PROFILE FILE --------------------
+def save_profile(profile, path=PROFILE_FILE, results=()):
+    data = dict(profile._asdict(), tuned_at=int(time.time()), candidates=[r._asdict() for r in results])
+    with open(path, "w", encoding="UTF-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def load_profile(path=PROFILE_FILE):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="UTF-8") as f:
+            data = json.load(f)
+        return CaptureProfile(**{field: data[field] for field in CaptureProfile._fields
+                                 if field in data or field not in CaptureProfile._field_defaults})
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Capture profile error: {e}")
+        return None
+
+
+def apply_profile(cfg, profile):
+    """ใส่ค่าจาก profile ลงใน dict ของ load_config()"""
+    if profile is not None:
+        cfg.update(camera_width=profile.width, camera_height=profile.height, camera_fourcc=profile.fourcc,
+                   camera_decode=profile.camera_decode, roi_ratio=profile.roi_ratio, roi_upscale=profile.upscale)
+    return cfg
+
+
+def tune_camera(cfg, camera_index=0, live=False, target_hit_rate=0.9, path=PROFILE_FILE):
+    camera_decode = cfg.get("camera_decode") or "bgr"
+    best, results = autotune(lambda w, h, f: open_cv2_capture(camera_index, w, h, f, camera_decode),
+                             target_hit_rate=target_hit_rate, live=live, camera_decode=camera_decode)
+    if best is None:
+        print("[AUTOTUNE] no camera mode could be read, keeping config.ini values")
+        return None
+    save_profile(best, path, results)
+    print(f"[AUTOTUNE] chose {describe(best)} -> {path}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the cheapest camera mode / ROI that decodes reliably")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--camera", type=int, default=0, help="camera index")
+    parser.add_argument("--live", action="store_true", help="probe with a real QR code held in front of the camera")
+    parser.add_argument("--target", type=float, default=0.9, help="required decode hit rate")
+    parser.add_argument("--out", help="profile file (default: CaptureProfile in config.ini or capture_profile.json)")
+    args = parser.parse_args()
+    cfg = load_config(args.config)
+    tune_camera(cfg, args.camera, args.live, args.target, args.out or cfg["capture_profile"] or PROFILE_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# --- evdev-based input for USB barcode scanner on Pi + xrdp ---
+from evdev import InputDevice, ecodes
+
+SHIFT_KEYS = {ecodes.KEY_LEFTSHIFT, ecodes.KEY_RIGHTSHIFT}
+ENTER_KEYS = {ecodes.KEY_ENTER, ecodes.KEY_KPENTER}
+
+# แผนที่คีย์สำหรับ base64url-ish token: [A-Za-z0-9_-]
+KEYMAP = {
+    # digits row
+    ecodes.KEY_0:'0', ecodes.KEY_1:'1', ecodes.KEY_2:'2', ecodes.KEY_3:'3', ecodes.KEY_4:'4',
+    ecodes.KEY_5:'5', ecodes.KEY_6:'6', ecodes.KEY_7:'7', ecodes.KEY_8:'8', ecodes.KEY_9:'9',
+    # letters
+    ecodes.KEY_A:'a', ecodes.KEY_B:'b', ecodes.KEY_C:'c', ecodes.KEY_D:'d', ecodes.KEY_E:'e',
+    ecodes.KEY_F:'f', ecodes.KEY_G:'g', ecodes.KEY_H:'h', ecodes.KEY_I:'i', ecodes.KEY_J:'j',
+    ecodes.KEY_K:'k', ecodes.KEY_L:'l', ecodes.KEY_M:'m', ecodes.KEY_N:'n', ecodes.KEY_O:'o',
+    ecodes.KEY_P:'p', ecodes.KEY_Q:'q', ecodes.KEY_R:'r', ecodes.KEY_S:'s', ecodes.KEY_T:'t',
+    ecodes.KEY_U:'u', ecodes.KEY_V:'v', ecodes.KEY_W:'w', ecodes.KEY_X:'x', ecodes.KEY_Y:'y',
+    ecodes.KEY_Z:'z',
+    # symbols we accept
+    ecodes.KEY_MINUS:'-',  # '_' จะมาจาก Shift + MINUS
+    # keypad (รองรับ NumLock ทั้งคู่)
+    ecodes.KEY_KP0:'0', ecodes.KEY_KP1:'1', ecodes.KEY_KP2:'2', ecodes.KEY_KP3:'3', ecodes.KEY_KP4:'4',
+    ecodes.KEY_KP5:'5', ecodes.KEY_KP6:'6', ecodes.KEY_KP7:'7', ecodes.KEY_KP8:'8', ecodes.KEY_KP9:'9',
+}
+
+
+class KeyDecoder:
+    """Turns EV_KEY events (type, code, value) into tokens, one per ENTER."""
+
+    def __init__(self):
+        self.buf = []
+        self.shift = False
+
+    def feed(self, event):
+        if event.type != ecodes.EV_KEY:
+            return None
+
+        # track shift
+        if event.code in SHIFT_KEYS:
+            self.shift = event.value != 0  # 1=down, 2=hold, 0=up
+            return None
+
+        if event.value != 1:  # key down only
+            return None
+
+        # ENTER or KEYPAD ENTER → ส่งหนึ่งบรรทัด
+        if event.code in ENTER_KEYS:
+            token = ''.join(self.buf).strip()
+            self.buf.clear()
+            return token or None
+
+        ch = KEYMAP.get(event.code)
+        if not ch:
+            return None
+
+        # uppercase when shift
+        if 'a' <= ch <= 'z' and self.shift:
+            ch = ch.upper()
+        # underscore when Shift + minus
+        if ch == '-' and self.shift:
+            ch = '_'
+
+        self.buf.append(ch)
+        return None
+
+
+def evdev_reader(dev, q):
+    """อ่าน event จาก scanner (path หรือ device object ที่มี read_loop()) แล้วส่ง token เข้า queue"""
+    if isinstance(dev, str):
+        dev = InputDevice(dev)
+    decoder = KeyDecoder()
+    for event in dev.read_loop():
+        token = decoder.feed(event)
+        if token:
+            q.put(token)
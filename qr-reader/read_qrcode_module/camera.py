@@ -14,17 +14,87 @@ except Exception as e:
     CAMERA_WIDTH = 1280
     CAMERA_HEIGHT = 720
 
+# decode="bgr": OpenCV แปลง MJPG -> BGR เอง (ค่าเดิม)
+# decode="gray"/"gray2": ขอ buffer MJPG ดิบจาก V4L2 แล้ว decode เฉพาะ luma ด้วย libjpeg-turbo
+# ("gray2" = ลดขนาดครึ่งหนึ่งระหว่าง decode ด้วย DCT scaling) ตัว reader ใช้แค่ภาพขาวดำอยู่แล้ว
+DECODE_FLAGS = {
+    "gray": cv2.IMREAD_GRAYSCALE,
+    "gray2": cv2.IMREAD_REDUCED_GRAYSCALE_2,
+}
+
+
+def decode_mjpeg(buf, mode):
+    """decode JPEG หนึ่งเฟรม (bytes/array) ตาม mode; คืน None ถ้าข้อมูลเสีย"""
+    if mode == "bgr":
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    return cv2.imdecode(buf, DECODE_FLAGS[mode])
+
+
+def configure_capture(cap, width, height, fourcc=None, decode="bgr"):
+    """ตั้ง FOURCC/ขนาดภาพของ cv2.VideoCapture ตาม decode mode -> True ถ้าได้ buffer MJPG ดิบ"""
+    raw_mjpeg = False
+    if decode != "bgr":
+        # luma-only decode ต้องการ MJPG: ใช้ MJPG เฉพาะเมื่อไม่ได้กำหนด FOURCC ไว้ (config/autotune ชนะเสมอ)
+        if not fourcc:
+            fourcc = "MJPG"
+        if fourcc.upper() == "MJPG":
+            raw_mjpeg = True
+        else:
+            print(f"[CAMERA] CameraDecode={decode} needs MJPG but FOURCC is {fourcc}; "
+                  f"keeping {fourcc} and converting BGR frames to gray")
+    if fourcc:  # เช่น "MJPG" (ต้องตั้งก่อนขนาดภาพ) ค่าจาก autotune.py
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if raw_mjpeg:
+        # ได้ Mat 1xN ของ JPEG ดิบ (ไม่มี BGR conversion) ถ้า backend ไม่รองรับจะได้ BGR มาแล้วแปลงทีหลัง
+        return bool(cap.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+    return False
+
+
+def decode_frame(frame, mode):
+    """เฟรมจาก cap.read() -> ภาพตาม decode mode (JPEG ดิบ หรือ BGR ที่ backend decode มาแล้ว)"""
+    if frame is None or mode == "bgr":
+        return frame
+    if frame.ndim == 3:  # backend decode เป็น BGR ให้แล้ว
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if mode == "gray2":
+            gray = cv2.resize(gray, (gray.shape[1] // 2, gray.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        return gray
+    return decode_mjpeg(frame.reshape(-1), mode)
+
+
+class DecodedCapture:
+    """cv2.VideoCapture ที่ read() ผ่าน decode เดียวกับ Camera.get_frame (ใช้วัดเวลาใน autotune.py)"""
+
+    def __init__(self, cap, decode="bgr"):
+        self.cap = cap
+        self.decode = decode
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret or self.decode == "bgr":
+            return ret, frame
+        frame = decode_frame(frame, self.decode)
+        return frame is not None, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
 
 class Camera:
-    def __init__(self, camera_index=0, width=CAMERA_WIDTH, height=CAMERA_HEIGHT):
+    def __init__(self, camera_index=0, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fourcc=None, decode="bgr"):
         self.camera_index = camera_index
+        self.decode = decode
         self.cap = cv2.VideoCapture(self.camera_index)
         if not self.cap.isOpened():
             print("Camera failed")
         print("Camera opened")
 
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.raw = configure_capture(self.cap, width, height, fourcc, decode)
         self.ret = False
         self.frame = None
         self.is_running = True
@@ -46,10 +116,17 @@ class Camera:
             else:
                 time.sleep(0.01)
 
+    def _decode(self, frame):
+        return decode_frame(frame, self.decode)
+
     def get_frame(self):
         ret, frame = self.cap.read()
         if not ret:
             print("No QR Code")
+            return ret, None
+        if self.decode != "bgr":
+            frame = self._decode(frame)
+            return frame is not None, frame
         return ret, frame.copy()
 
     def release(self):
@@ -0,0 +1,138 @@
+# Pluggable QR decoder backends
+#
+# Every backend is a callable img -> [bytes, ...] (the same contract as
+# scan_logic.zbar_decode), so it drops into decode_candidates and
+# StationRuntime(decode=...) unchanged:
+#
+#   zbar    pyzbar / libzbar (cheap, weak on the kiosk's circular logo QR)
+#   opencv  cv2.QRCodeDetector
+#   aruco   cv2.QRCodeDetectorAruco (OpenCV >= 4.8, finder patterns via the ArUco detector)
+#   wechat  cv2.wechat_qrcode_WeChatQRCode (opencv-contrib-python; CNN models are optional)
+#
+# A comma separated spec ("zbar,wechat") builds a Cascade that tries the
+# backends in order and stops at the first one that reads something, so the
+# cheap decoder handles the easy frames and the expensive one only runs on
+# the frames it missed. get_decoder(spec, multi=True) returns backends that
+# report every code in the image (group check-in) instead of the first one.
+import os
+import cv2
+import numpy as np
+
+try:
+    from .scan_logic import ZBAR_OK, zbar_decode, opencv_decode, opencv_decode_multi
+except ImportError:
+    from scan_logic import ZBAR_OK, zbar_decode, opencv_decode, opencv_decode_multi
+
+WECHAT_OK = hasattr(cv2, "wechat_qrcode_WeChatQRCode")
+ARUCO_OK = hasattr(cv2, "QRCodeDetectorAruco")
+WECHAT_MODEL_DIR = os.environ.get("WECHAT_QR_MODEL_DIR", "wechat_qrcode")
+WECHAT_MODEL_FILES = ("detect.prototxt", "detect.caffemodel", "sr.prototxt", "sr.caffemodel")
+
+_aruco_detector = None
+_wechat_detector = None
+
+
+def _aruco():
+    global _aruco_detector
+    if not ARUCO_OK:
+        raise ImportError("cv2.QRCodeDetectorAruco needs OpenCV >= 4.8")
+    if _aruco_detector is None:
+        _aruco_detector = cv2.QRCodeDetectorAruco()
+    return _aruco_detector
+
+
+def aruco_decode(img):
+    data, _, _ = _aruco().detectAndDecode(np.ascontiguousarray(img))
+    return [data.encode("utf-8")] if data else []
+
+
+def aruco_decode_multi(img):
+    ok, decoded, _, _ = _aruco().detectAndDecodeMulti(np.ascontiguousarray(img))
+    return [data.encode("utf-8") for data in decoded if data] if ok else []
+
+
+def wechat_detector(model_dir=WECHAT_MODEL_DIR):
+    """WeChatQRCode พร้อมโมเดล CNN ถ้ามีไฟล์ครบใน model_dir (ไม่มีก็ใช้ detector แบบดั้งเดิมของมัน)"""
+    paths = [os.path.join(model_dir, f) for f in WECHAT_MODEL_FILES] if model_dir else []
+    if paths and all(os.path.exists(p) for p in paths):
+        return cv2.wechat_qrcode_WeChatQRCode(*paths)
+    return cv2.wechat_qrcode_WeChatQRCode()
+
+
+def wechat_decode(img):
+    global _wechat_detector
+    if not WECHAT_OK:
+        raise ImportError("cv2.wechat_qrcode needs opencv-contrib-python")
+    if _wechat_detector is None:
+        _wechat_detector = wechat_detector()
+    texts, _ = _wechat_detector.detectAndDecode(np.ascontiguousarray(img))
+    return [t.encode("utf-8") for t in texts if t]
+
+
+# name -> (decode, decode ทุก QR ในภาพ, ใช้ได้ในเครื่องนี้)
+BACKENDS = {
+    "zbar": (zbar_decode, zbar_decode, ZBAR_OK),
+    "opencv": (opencv_decode, opencv_decode_multi, True),
+    "aruco": (aruco_decode, aruco_decode_multi, ARUCO_OK),
+    "wechat": (wechat_decode, wechat_decode, WECHAT_OK),
+}
+
+
+def available(name):
+    return name in BACKENDS and BACKENDS[name][2]
+
+
+def available_backends():
+    return [name for name, (_, _, ok) in BACKENDS.items() if ok]
+
+
+class Cascade:
+    """ลอง backend ตามลำดับ คืนผลแรกที่อ่านได้; hits นับว่า backend ไหนอ่านได้กี่ครั้ง"""
+
+    def __init__(self, names, multi=False):
+        self.names = list(names)
+        self.backends = [BACKENDS[name][1 if multi else 0] for name in self.names]
+        self.hits = dict.fromkeys(self.names, 0)
+        self.calls = 0
+        self.last = None
+
+    def __call__(self, img):
+        self.calls += 1
+        for name, decode in zip(self.names, self.backends):
+            try:
+                res = decode(img)
+            except Exception:
+                res = []
+            if res:
+                self.hits[name] += 1
+                self.last = name
+                return res
+        self.last = None
+        return []
+
+    def __repr__(self):
+        return f"Cascade({','.join(self.names)})"
+
+
+def parse_spec(spec):
+    """ "zbar, wechat" -> ["zbar", "wechat"] ตัด backend ที่ไม่รู้จัก/ใช้ไม่ได้ในเครื่องนี้ออก (เหลือ opencv อย่างน้อยหนึ่งตัว)"""
+    names = []
+    for name in (spec or "").lower().split(","):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in BACKENDS:
+            raise ValueError(f"unknown QR decoder '{name}' (choose from {', '.join(BACKENDS)})")
+        if available(name):
+            names.append(name)
+        else:
+            print(f"[DECODER] {name} is not available here, skipped")
+    return names or ["zbar" if ZBAR_OK else "opencv"]
+
+
+def get_decoder(spec="zbar", multi=False):
+    """ชื่อ backend เดียว -> ฟังก์ชัน decode, หลายชื่อคั่นด้วย comma -> Cascade"""
+    names = parse_spec(spec)
+    if len(names) == 1:
+        return BACKENDS[names[0]][1 if multi else 0]
+    return Cascade(names, multi)
@@ -0,0 +1,188 @@
+# Threaded serial channel to the ESP32 TFT display: non-blocking send, background reconnect, MODE: events
+import threading
+import time
+from collections import deque
+import serial
+
+try:
+    from .display_protocol import FrameDecoder, TextProtocol
+    from .reader_logic import parse_mode_line
+    from .station import open_serial_once
+except ImportError:
+    from display_protocol import FrameDecoder, TextProtocol
+    from reader_logic import parse_mode_line
+    from station import open_serial_once
+
+
+class DisplayChannel:
+    """
+    Owns the ESP32 serial port on a background thread. send() only queues the
+    line and returns; with coalesce=True a newer status replaces any line
+    still waiting (the TFT only shows the newest), otherwise up to
+    max_pending lines are kept and the oldest is dropped. A reader thread
+    turns incoming MODE: lines into self.mode and the on_mode callback.
+    When the port fails it is reopened in the background with exponential
+    backoff (min_backoff..max_backoff seconds) while the station keeps
+    scanning. protocol (display_protocol.TextProtocol or BinaryProtocol)
+    encodes each line at write time and receives the ACK frames coming
+    back. Can be used directly as a StationRuntime sink.
+    """
+
+    def __init__(self, ser=None, port=None, baudrate=115200, max_pending=8, coalesce=True,
+                 min_backoff=0.5, max_backoff=8.0, on_mode=None, open_serial=open_serial_once,
+                 protocol=None):
+        self.protocol = protocol or TextProtocol()
+        self.ser = ser
+        self.port = port
+        self.baudrate = baudrate
+        self.coalesce = coalesce
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.on_mode = on_mode
+        self.open_serial = open_serial
+        self.mode = None
+        self.mode_event = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._lost = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._reader = None
+        self._inflight = False
+
+    # ---------- station side ----------
+    def send(self, line):
+        with self._cond:
+            if self.coalesce:
+                self.dropped += len(self.pending)
+                self.pending.clear()
+            elif len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(line)
+            self._cond.notify()
+
+    def emit(self, outcome):
+        if outcome.serial_line:
+            self.send(outcome.serial_line)
+
+    def emit_batch(self, outcomes, summary_line):
+        if summary_line:
+            self.send(summary_line)
+
+    def poll_mode(self, current_mode):
+        return current_mode if self.mode is None else self.mode
+
+    @property
+    def connected(self):
+        return self.ser is not None and not self._lost.is_set()
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="display-channel", daemon=True)
+            self._thread.start()
+        return self
+
+    def flush(self, timeout=1.0):
+        """รอจนคิวว่าง (หรือหมดเวลา) คืน True ถ้าส่งครบ"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.pending or self._inflight:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            return not (self.pending or self._inflight)
+
+    def stop(self, timeout=1.0):
+        if self.connected:
+            self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close()
+
+    # ---------- background ----------
+    def _run(self):
+        delay = self.min_backoff
+        first = self.ser is not None
+        while not self._stopping:
+            if self.ser is None:
+                self.ser = self.open_serial(self.baudrate, 0.2, self.port)
+                if self.ser is None:
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopping, delay)
+                    delay = min(delay * 2, self.max_backoff)
+                    continue
+                if first:
+                    self.reconnects += 1
+            first = True
+            delay = self.min_backoff
+            self._lost.clear()
+            self._reader = threading.Thread(target=self._read, args=(self.ser,), name="display-reader", daemon=True)
+            self._reader.start()
+            self._write_until_lost()
+            if not self._stopping:
+                print("Serial port disconnected. Reconnecting in the background...")
+            self._close()
+
+    def _write_until_lost(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.pending or self._stopping or self._lost.is_set())
+                if self._stopping or self._lost.is_set():
+                    return
+                line = self.pending.popleft()
+                self._inflight = True
+            try:
+                self.ser.write(self.protocol.encode(line))
+                self.sent += 1
+            except (OSError, serial.SerialException):
+                self._set_lost()  # บรรทัดนี้หายไป สถานะถัดไปจะทับอยู่แล้ว
+            with self._cond:
+                self._inflight = False
+                self._cond.notify_all()  # ปลุก flush()
+
+    def _read(self, ser):
+        decoder = FrameDecoder()
+        while not self._stopping and not self._lost.is_set():
+            try:
+                items = decoder.feed(ser.read(ser.in_waiting or 1))
+            except (OSError, serial.SerialException, TypeError):
+                self._set_lost()
+                return
+            for item in items:
+                if not isinstance(item, str):
+                    self.protocol.on_frame(item)
+                    continue
+                mode = parse_mode_line(item)
+                if mode is not None:
+                    self.mode = mode
+                    self.mode_event.set()
+                    print(f"[MODE] Received mode from ESP32 => {mode}")
+                    if self.on_mode is not None:
+                        self.on_mode(mode)
+
+    def _set_lost(self):
+        self._lost.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _close(self):
+        self._lost.set()
+        ser, self.ser = self.ser, None
+        try:
+            if ser is not None:
+                ser.close()
+        except Exception:
+            pass
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join(1.0)
+        self._reader = None
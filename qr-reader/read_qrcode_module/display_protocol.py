@@ -0,0 +1,149 @@
+# Station <-> ESP32 display protocol: legacy text lines or compact binary frames (see receive_serial.ino)
+#
+# Binary frame, version 1:
+#   A5 5A | ver | type | seq | len | payload[len] | crc16 (big-endian)
+# crc16 = CRC-16/CCITT-FALSE over ver..payload.
+#   STATUS (host -> ESP32): payload = status (int8) + text (utf-8), e.g. the scan time or "Checkout at ..."
+#   ACK    (ESP32 -> host): seq of the STATUS frame, sent after the screen has been drawn
+# The ESP32 still reports the mode button as a "MODE:<0|1>" text line.
+import binascii
+import struct
+import time
+from collections import namedtuple
+
+MAGIC = b"\xA5\x5A"
+VERSION = 1
+FRAME_STATUS = 0x01
+FRAME_ACK = 0x03
+HEADER_LEN = 6
+MAX_PAYLOAD = 255
+
+Frame = namedtuple("Frame", "type seq payload")
+
+
+def crc16_ccitt(data, crc=0xFFFF):
+    return binascii.crc_hqx(data, crc)  # CRC-CCITT (poly 0x1021) ใน C
+
+
+def encode_frame(ftype, seq, payload=b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"payload too long: {len(payload)} bytes")
+    body = bytes((VERSION, ftype, seq & 0xFF, len(payload))) + payload
+    return MAGIC + body + struct.pack(">H", crc16_ccitt(body))
+
+
+def encode_status(seq, status, text=""):
+    return encode_frame(FRAME_STATUS, seq, struct.pack("b", status) + text.encode("utf-8")[:MAX_PAYLOAD - 1])
+
+
+def decode_status(payload):
+    return struct.unpack("b", payload[:1])[0], payload[1:].decode("utf-8", errors="ignore")
+
+
+def split_line(line):
+    """แยกบรรทัดแบบเดิม "token,status,text" เป็น (status, text)"""
+    parts = line.strip().split(",", 2)
+    try:
+        status = int(parts[1])
+    except (IndexError, ValueError):
+        status = -1
+    return status, parts[2] if len(parts) > 2 else ""
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for bytes read from the serial port. feed() returns
+    the complete items seen so far: a Frame for each valid binary frame and
+    a str for each text line outside a frame. Bytes that fail the version or
+    CRC check are counted in errors and skipped until the next magic.
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        self.buf += data
+        items = []
+        while self.buf:
+            magic = self.buf.find(MAGIC)
+            newline = self.buf.find(b"\n")
+            if newline != -1 and (magic == -1 or newline < magic):
+                line = bytes(self.buf[:newline])
+                del self.buf[:newline + 1]
+                items.append(line.decode("utf-8", errors="ignore"))
+                continue
+            if magic == -1:
+                break
+            if len(self.buf) < magic + HEADER_LEN:
+                break
+            length = self.buf[magic + 5]
+            end = magic + HEADER_LEN + length + 2
+            if len(self.buf) < end:
+                break
+            body = bytes(self.buf[magic + 2:end - 2])
+            crc = struct.unpack(">H", self.buf[end - 2:end])[0]
+            if body[0] != VERSION or crc16_ccitt(body) != crc:
+                self.errors += 1
+                del self.buf[:magic + 1]  # หา magic ถัดไป
+                continue
+            del self.buf[:end]
+            items.append(Frame(body[1], body[2], body[4:]))
+        return items
+
+
+class TextProtocol:
+    """Original protocol: the "token,status,text\\n" line as-is."""
+
+    name = "text"
+
+    def encode(self, line):
+        return line.encode("utf-8") if isinstance(line, str) else line
+
+    def on_frame(self, frame):
+        pass
+
+
+class BinaryProtocol:
+    """
+    Encodes each line as a STATUS frame with its own sequence number and
+    matches ACK frames back to it, so rtt_ms holds the display round trip
+    (send -> screen drawn -> ACK received) of every acknowledged frame.
+    """
+
+    name = "binary"
+
+    def __init__(self, clock=time.perf_counter, max_rtts=1000):
+        self.clock = clock
+        self.max_rtts = max_rtts
+        self.seq = 0
+        self.sent_at = {}
+        self.rtt_ms = []
+        self.acked = 0
+
+    def encode(self, line):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="ignore")
+        status, text = split_line(line)
+        self.seq = (self.seq + 1) & 0xFF
+        self.sent_at[self.seq] = self.clock()
+        return encode_status(self.seq, status, text)
+
+    def on_frame(self, frame):
+        if frame.type != FRAME_ACK:
+            return
+        sent = self.sent_at.pop(frame.seq, None)
+        if sent is None:
+            return
+        self.acked += 1
+        self.rtt_ms.append((self.clock() - sent) * 1000.0)
+        if len(self.rtt_ms) > self.max_rtts:
+            del self.rtt_ms[0]
+
+
+def make_protocol(name="text"):
+    if name == "binary":
+        return BinaryProtocol()
+    if name == "text":
+        return TextProtocol()
+    raise ValueError(f"unknown display protocol: {name}")
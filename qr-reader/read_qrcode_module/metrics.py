@@ -0,0 +1,209 @@
+# Prometheus-text metrics for station processes, served from a background HTTP thread
+#
+#   python read_qrcode_module/read_qrcode_webcam.py --metrics-port 9108
+#   curl localhost:9108/metrics
+#
+# Stations only bump plain counters / histogram buckets on their own thread;
+# everything is read and formatted when the endpoint is scraped.
+import bisect
+import glob
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DECODE_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+WRITE_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 500)
+STATUS_NAMES = {1: "checkin", 0: "checkout", -1: "rejected", None: "invalid"}
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style); observe() is a bisect and two adds."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        acc = 0
+        for edge, n in zip(self.buckets + ("+Inf",), self.counts):
+            acc += n
+            yield edge, acc
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Registry:
+    """
+    Metric families backed by collector functions. Each collector returns
+    a list of (labels, value) pairs, or (labels, Histogram) for histograms,
+    and is only called when the endpoint is scraped.
+    """
+
+    def __init__(self):
+        self.families = []
+
+    def add(self, name, kind, help_text, collect):
+        self.families.append((name, kind, help_text, collect))
+
+    def render(self):
+        out = []
+        for name, kind, help_text, collect in self.families:
+            try:
+                samples = list(collect())
+            except Exception:
+                continue
+            if not samples:
+                continue
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "histogram":
+                    for edge, acc in value.samples():
+                        out.append(f"{name}_bucket{_labels(dict(labels, le=edge))} {acc}")
+                    out.append(f"{name}_sum{_labels(labels)} {value.sum:.6g}")
+                    out.append(f"{name}_count{_labels(labels)} {value.count}")
+                else:
+                    out.append(f"{name}{_labels(labels)} {value:.6g}" if isinstance(value, float)
+                               else f"{name}{_labels(labels)} {value}")
+        return "\n".join(out) + "\n"
+
+
+class MetricsServer:
+    """GET /metrics on a daemon thread (ThreadingHTTPServer)."""
+
+    def __init__(self, registry, port=9108, host="0.0.0.0"):
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        print(f"Metrics on http://localhost:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# -------------------- SYSTEM --------------------
+_throttle_cache = [0.0, None]
+
+
+def cpu_temperature_c():
+    temps = []
+    for path in glob.glob("/sys/class/thermal/thermal_zone*/temp"):
+        try:
+            with open(path) as f:
+                temps.append(int(f.read().strip()) / 1000.0)
+        except (OSError, ValueError):
+            continue
+    return max(temps) if temps else None
+
+
+def throttled_flags(max_age=10.0):
+    """ค่า get_throttled ของ Raspberry Pi (bitmask) จาก vcgencmd, cache ไว้ max_age วินาที"""
+    now = time.monotonic()
+    if now - _throttle_cache[0] < max_age:
+        return _throttle_cache[1]
+    _throttle_cache[0] = now
+    try:
+        out = subprocess.run(["vcgencmd", "get_throttled"], capture_output=True, text=True, timeout=1).stdout
+        _throttle_cache[1] = int(out.strip().split("=")[1], 16)
+    except Exception:
+        _throttle_cache[1] = None
+    return _throttle_cache[1]
+
+
+def add_system_metrics(registry):
+    registry.add("station_cpu_temperature_celsius", "gauge", "Hottest thermal zone",
+                 lambda: [] if cpu_temperature_c() is None else [({}, cpu_temperature_c())])
+    registry.add("station_throttled_flags", "gauge", "Raspberry Pi get_throttled bitmask",
+                 lambda: [] if throttled_flags() is None else [({}, throttled_flags())])
+    registry.add("station_process_cpu_seconds_total", "counter", "CPU time used by this process",
+                 lambda: [({}, time.process_time())])
+    return registry
+
+
+# -------------------- STATIONS --------------------
+def _serial_reconnects(station):
+    total = None
+    for sink in station.sinks:
+        channel = getattr(sink, "stream", sink)
+        if hasattr(channel, "reconnects"):
+            total = (total or 0) + channel.reconnects
+    return total
+
+
+def add_station_metrics(registry, stations):
+    """stations: StationRuntime หรือ list/dict ของ StationRuntime (หลาย scanner) -> label station=name"""
+    if hasattr(stations, "values"):
+        stations = stations.values()
+    elif not isinstance(stations, (list, tuple)):
+        stations = [stations]
+
+    def each(fn):
+        def collect():
+            return [({"station": s.name}, v) for s in list(stations) for v in [fn(s)] if v is not None]
+        return collect
+
+    def scans():
+        return [({"station": s.name, "status": STATUS_NAMES[k]}, n)
+                for s in list(stations) for k, n in sorted(s.scan_counts.copy().items(), key=lambda kv: str(kv[0]))]
+
+    def log_latency():
+        out = []
+        for s in list(stations):
+            for sink in s.sinks:
+                if hasattr(sink, "write_ms"):
+                    out.append(({"station": s.name}, sink.write_ms))
+        return out
+
+    registry.add("station_frames_captured_total", "counter", "Frames read from the camera",
+                 each(lambda s: s.frames_captured))
+    registry.add("station_frames_decoded_total", "counter", "Frames run through the QR decoder",
+                 each(lambda s: s.decode_ms.count))
+    registry.add("station_frames_dropped_total", "counter", "Frames skipped during lockout or display hold",
+                 each(lambda s: s.frames_dropped))
+    registry.add("station_decode_latency_ms", "histogram", "QR decode time per frame (ms)",
+                 each(lambda s: s.decode_ms if s.decode_ms.count else None))
+    registry.add("station_scans_total", "counter", "Scans by ReaderLogic outcome", scans)
+    registry.add("station_serial_reconnects_total", "counter", "Display serial port reconnects",
+                 each(_serial_reconnects))
+    registry.add("station_log_write_latency_ms", "histogram", "qr_log.json write time (ms)", log_latency)
+    return registry
+
+
+def serve_station_metrics(stations, port, host="0.0.0.0"):
+    registry = add_system_metrics(add_station_metrics(Registry(), stations))
+    return MetricsServer(registry, port, host).start()
@@ -0,0 +1,219 @@
+# Multi-scanner host: one process serving several HID barcode scanners / stations
+#
+# config.ini:
+#   [Scanner:Booth1]
+#   Device = /dev/input/by-id/usb-SM_SM-2D_PRODUCT_HID_KBW_APP-000000000-event-kbd
+#   Location = Place1
+#   Serial = /dev/ttyUSB0
+#   DisplayProtocol = binary      (optional, defaults to [Device] DisplayProtocol)
+#
+# Device defaults to station.DEV_PATH (the SM-2D scanner), like read_qrcode_bcode.py; without
+# any [Scanner:*] section that one scanner is served at [Device] Location. Device may be a glob,
+# but a glob that matches more than one unclaimed device is not claimed (a plain USB keyboard
+# is also *-event-kbd): a warning is logged and the section needs an explicit Device.
+#
+#   python read_qrcode_module/multi_scanner.py
+import argparse
+import asyncio
+import configparser
+import glob
+import os
+from collections import namedtuple
+
+try:
+    from .aio_station import AsyncBarcodeStation, AsyncSerialSink, SerialStream, mode_listener
+    from .display_protocol import make_protocol
+    from .metrics import serve_station_metrics
+    from .reader_logic import ReaderLogic
+    from .sampler import StackSampler, install as install_sampler
+    from .scan_logic import TokenDebounce, LOG_FILE
+    from .scan_store import open_store
+    from .station import (StationRuntime, LogSink, ConsoleSink,
+                          CONFIG_FILE, DEV_PATH, BCODE_SEND_INTERVAL_SEC)
+except ImportError:
+    from aio_station import AsyncBarcodeStation, AsyncSerialSink, SerialStream, mode_listener
+    from display_protocol import make_protocol
+    from metrics import serve_station_metrics
+    from reader_logic import ReaderLogic
+    from sampler import StackSampler, install as install_sampler
+    from scan_logic import TokenDebounce, LOG_FILE
+    from scan_store import open_store
+    from station import (StationRuntime, LogSink, ConsoleSink,
+                         CONFIG_FILE, DEV_PATH, BCODE_SEND_INTERVAL_SEC)
+
+RESCAN_INTERVAL_SEC = 2.0
+
+ScannerConfig = namedtuple("ScannerConfig", "name device location serial_port display_protocol",
+                           defaults=("text",))
+
+
+def load_scanner_configs(path=CONFIG_FILE):
+    config = configparser.ConfigParser()
+    config.read(path)
+    default_location = config.get("Device", "Location")
+    default_protocol = config.get("Device", "DisplayProtocol", fallback="text")
+    scanners = []
+    for section in config.sections():
+        if not section.startswith("Scanner:"):
+            continue
+        sec = config[section]
+        scanners.append(ScannerConfig(
+            section.split(":", 1)[1].strip(),
+            sec.get("Device", DEV_PATH),
+            sec.get("Location", default_location),
+            sec.get("Serial", None),
+            sec.get("DisplayProtocol", default_protocol),
+        ))
+    if not scanners:
+        scanners.append(ScannerConfig("default", DEV_PATH, default_location, None, default_protocol))
+    return scanners, config.getint("Device", "ScanCooldown"), config.getint("Device", "StayDuration")
+
+
+def discover(pattern=DEV_PATH):
+    return sorted(glob.glob(pattern))
+
+
+def _open_evdev(path):
+    from evdev import InputDevice
+    return InputDevice(path)
+
+
+class MultiScannerHost:
+    """
+    Serves every configured scanner from one asyncio loop. Each scanner gets
+    its own StationRuntime (own ReaderLogic, per-token cooldown and display sink), an
+    async task reading its evdev device and, with a serial port, its own
+    SerialStream; a lockout on one scanner never delays another. Devices are re-discovered every rescan_interval seconds,
+    so scanners can be unplugged and plugged back in.
+    """
+
+    def __init__(self, scanners, cooldown=5, stay=600, rescan_interval=RESCAN_INTERVAL_SEC,
+                 discover=discover, open_device=_open_evdev, make_sinks=None, verbose=True, store=None):
+        self.scanners = list(scanners)
+        self.store = store      # ScanStore ร่วมกันทุก scanner (แยกด้วย location)
+        self.cooldown = cooldown
+        self.stay = stay
+        self.rescan_interval = rescan_interval
+        self.discover = discover
+        self.open_device = open_device
+        self.make_sinks = make_sinks or self._default_sinks
+        self.verbose = verbose
+        self.stations = {}      # name -> StationRuntime
+        self.devices = {}       # name -> real device path
+        self.tasks = {}         # name -> asyncio.Task
+        self.streams = {}       # name -> SerialStream
+        self.stream_tasks = {}  # name -> asyncio.Task
+        self.ambiguous = set()  # scanner ที่ glob ตรงหลาย device (เตือนครั้งเดียว)
+        self._stopping = False
+
+    def _default_sinks(self, cfg, reader):
+        sinks = [LogSink(cfg.location, store=self.store)]
+        if cfg.serial_port or len(self.scanners) == 1:
+            stream = SerialStream(port=cfg.serial_port, protocol=make_protocol(cfg.display_protocol))
+            self.streams[cfg.name] = stream
+            sinks.insert(0, AsyncSerialSink(stream))
+        if self.verbose:
+            sinks.append(ConsoleSink(prefix=f"[{cfg.name}] "))
+        return sinks
+
+    def station_for(self, cfg):
+        if cfg.name not in self.stations:
+            reader = ReaderLogic(cfg.location, self.cooldown, self.stay, store=self.store)
+            station = StationRuntime(cfg.location, sinks=self.make_sinks(cfg, reader), reader=reader,
+                                     gate=TokenDebounce(BCODE_SEND_INTERVAL_SEC), name=cfg.name)
+            station.open()
+            self.stations[cfg.name] = station
+            stream = self.streams.get(cfg.name)
+            if stream is not None:
+                stream.on_line = mode_listener(station)
+                self.stream_tasks[cfg.name] = asyncio.ensure_future(stream.run())
+        return self.stations[cfg.name]
+
+    def rescan(self):
+        claimed = set(self.devices.values())
+        for cfg in self.scanners:
+            if cfg.name in self.tasks:
+                continue
+            paths = [path for path in self.discover(cfg.device) if os.path.realpath(path) not in claimed]
+            if len(paths) > 1 and glob.has_magic(cfg.device):
+                # keyboard ธรรมดาก็เป็น *-event-kbd: ไม่เดาว่าตัวไหนคือ scanner
+                if cfg.name not in self.ambiguous:
+                    self.ambiguous.add(cfg.name)
+                    print(f"[{cfg.name}] WARNING: Device {cfg.device} matches {len(paths)} devices "
+                          f"({', '.join(paths)}); set an explicit Device in [Scanner:{cfg.name}]")
+                continue
+            self.ambiguous.discard(cfg.name)
+            for path in paths:
+                real = os.path.realpath(path)
+                try:
+                    dev = self.open_device(path)
+                except OSError as e:
+                    print(f"[{cfg.name}] cannot open {path}: {e}")
+                    continue
+                claimed.add(real)
+                self.devices[cfg.name] = real
+                station = self.station_for(cfg)
+                self.tasks[cfg.name] = asyncio.ensure_future(self._read_scanner(cfg, dev, station))
+                print(f"[{cfg.name}] scanner {path} -> {cfg.location}")
+                break
+
+    async def _read_scanner(self, cfg, dev, station):
+        try:
+            await AsyncBarcodeStation(station, dev).read_scanner()  # lockout ของ scanner นี้เท่านั้น
+        except OSError as e:
+            print(f"[{cfg.name}] scanner disconnected: {e}")
+        finally:
+            self.tasks.pop(cfg.name, None)
+            self.devices.pop(cfg.name, None)
+
+    async def run(self, until_idle=False):
+        """วนหา scanner ใหม่ทุก rescan_interval; until_idle=True หยุดเมื่อทุก device อ่านจนหมด (ใช้กับ fake device)"""
+        self._stopping = False
+        try:
+            while not self._stopping:
+                self.rescan()
+                if until_idle:
+                    if self.tasks:
+                        await asyncio.gather(*list(self.tasks.values()), return_exceptions=True)
+                    break
+                await asyncio.sleep(self.rescan_interval)
+        finally:
+            for stream in self.streams.values():
+                await stream.drain()
+            pending = list(self.tasks.values()) + list(self.stream_tasks.values())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for station in self.stations.values():
+                station.stop()
+
+    def stop(self):
+        self._stopping = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve several barcode scanners from one host")
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--profile", type=float, metavar="SECONDS", help="sample stacks for SECONDS at start-up")
+    args = parser.parse_args()
+
+    try:
+        scanners, cooldown, stay = load_scanner_configs(args.config)
+        store_config = configparser.ConfigParser()
+        store_config.read(args.config)
+        store_path = store_config.get("Device", "ScanStore", fallback=None)
+    except Exception as e:
+        print(f"Configure file error: {e}")
+        raise SystemExit(1)
+
+    host = MultiScannerHost(scanners, cooldown, stay, store=open_store(store_path, LOG_FILE) if store_path else None)
+    if args.metrics_port:
+        serve_station_metrics(host.stations, args.metrics_port)
+    sampler = install_sampler(StackSampler(name="multi_scanner"))  # kill -USR1 <pid> = เริ่ม/หยุด sample
+    if args.profile:
+        sampler.start(args.profile)
+    try:
+        asyncio.run(host.run())
+    except KeyboardInterrupt:
+        print("QR Code Reader is shutting down...")
@@ -0,0 +1,59 @@
+# เตรียมภาพ ROI ก่อนส่งเข้า decoder (gray + CLAHE + threshold + upscale)
+import cv2
+import numpy as np
+
+
+class RoiPreprocessor:
+    """
+    Builds the decode candidates for one ROI: gray, adaptive threshold, Otsu
+    threshold and a 1.5x upscale of each. The CLAHE object and all destination
+    buffers are created once and reused; buffers are only reallocated when the
+    ROI shape changes.
+
+    The returned images are views of internal buffers and are overwritten by
+    the next call to process().
+    """
+
+    def __init__(self, clip_limit=2.0, tile_grid=(8, 8), block_size=31, c=5, upscale=1.5):
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid)
+        self.block_size = block_size
+        self.c = c
+        self.upscale = upscale
+        self.allocations = 0
+        self._shape = None
+        self._candidates = []
+
+    def _ensure_buffers(self, h, w):
+        if self._shape == (h, w):
+            return
+        up_w = int(round(w * self.upscale))
+        up_h = int(round(h * self.upscale))
+        self._raw = np.empty((h, w), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._th1 = np.empty((h, w), dtype=np.uint8)
+        self._th2 = np.empty((h, w), dtype=np.uint8)
+        self._up = [np.empty((up_h, up_w), dtype=np.uint8) for _ in range(3)]
+        self._up_size = (up_w, up_h)
+        self._candidates = [self._gray, self._th1, self._th2] + self._up
+        self._shape = (h, w)
+        self.allocations += 1
+
+    def process(self, roi):
+        if roi is None or roi.size == 0:
+            return []
+        h, w = roi.shape[:2]
+        self._ensure_buffers(h, w)
+
+        if roi.ndim == 2:
+            np.copyto(self._raw, roi)
+        else:
+            cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=self._raw)
+        self.clahe.apply(self._raw, dst=self._gray)
+
+        cv2.adaptiveThreshold(self._gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, self.block_size, self.c, dst=self._th1)
+        cv2.threshold(self._gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=self._th2)
+
+        for base, big in zip((self._gray, self._th1, self._th2), self._up):
+            cv2.resize(base, self._up_size, dst=big, interpolation=cv2.INTER_LINEAR)
+        return self._candidates
@@ -28,21 +28,26 @@ class QRData:
         self.status = status
 
     def write_data(self):
-        qr_obj = self.compress_data()
+        QRData.write_many([self], self.qr_log)
+
+    @staticmethod
+    def write_many(records, qr_log="qr_log.json"):
+        """เพิ่มหลายรายการด้วยการอ่าน/เขียนไฟล์ครั้งเดียว (เช่น group check-in)"""
+        qr_objs = [record.compress_data() for record in records]
         all_logs = []
         try:
-            if os.path.exists(self.qr_log) and os.path.getsize(self.qr_log) > 0:
-                with open(self.qr_log, "r", encoding="UTF-8") as log_file:
+            if os.path.exists(qr_log) and os.path.getsize(qr_log) > 0:
+                with open(qr_log, "r", encoding="UTF-8") as log_file:
                     all_logs = json.load(log_file)
-            all_logs.append(qr_obj)
+            all_logs.extend(qr_objs)
 
             if len(all_logs) > 800:
                 all_logs = all_logs[-800:]
-            with open(self.qr_log, "w", encoding="UTF-8") as log_file:
+            with open(qr_log, "w", encoding="UTF-8") as log_file:
                 json.dump(all_logs, log_file, indent=4, ensure_ascii=False)
         except json.JSONDecodeError:
-            with open(self.qr_log, "w", encoding="UTF-8") as log_file:
-                json.dump([qr_obj], log_file, indent=4, ensure_ascii=False)
+            with open(qr_log, "w", encoding="UTF-8") as log_file:
+                json.dump(qr_objs, log_file, indent=4, ensure_ascii=False)
 
         except Exception as e:
             print(f"Log file error: {e}")
@@ -8,23 +8,34 @@ timezone = pytz.timezone("Asia/Bangkok")
 time_format = "%H:%M"
 
 class ReaderLogic:
-    def __init__(self, location, cooldown, checkin_checkout_duration):
+    def __init__(self, location, cooldown, checkin_checkout_duration, clock=time.time, log_file="qr_log.json",
+                 store=None):
         self.location = location
         self.cooldown = cooldown
         self.checkin_checkout_duration = checkin_checkout_duration
-        self.qr_log = "qr_log.json"
+        self.qr_log = log_file
+        self.store = store  # ScanStore (SQLite) ถ้ามี ใช้แทนการอ่าน qr_log.json ทั้งไฟล์
+        self.clock = clock
         self.scan_history = self.load_data()
 
     def load_data(self):
-        if not os.path.exists("qr_log.json") or os.path.getsize("qr_log.json") == 0:
+        if self.store is not None:
+            try:
+                return self.store.checked_in(self.location)
+            except Exception as e:
+                print(f"Scan store error: {e}")
+                return {}
+        if not os.path.exists(self.qr_log) or os.path.getsize(self.qr_log) == 0:
             print("QR Log created")
             return {}
         try:
-            with open("qr_log.json", "r", encoding="UTF-8") as log_file:
+            with open(self.qr_log, "r", encoding="UTF-8") as log_file:
                 history = {}
                 all_logs = json.load(log_file)
                 all_logs = all_logs[-800:]
                 for log in reversed(all_logs):
+                    if log.get("location", self.location) != self.location:
+                        continue  # log ใช้ร่วมกันหลายสถานี (multi-scanner)
                     token = log.get("token")
                     timestamp = log.get("epoch")
                     if token and timestamp and token not in history:
@@ -36,7 +47,7 @@ class ReaderLogic:
         return history
 
     def read_qr(self, token):
-        timestamp = int(time.time())
+        timestamp = int(self.clock())
         existed_before = token in self.scan_history
         if not existed_before: # check in
             status = 1
@@ -101,22 +112,34 @@ class ReaderLogic:
             "existed": existed_before,
         }
     
+    def last_scan(self, token):
+        """scan ล่าสุดของ token ที่สถานีนี้ -> (location, check, epoch) หรือ None (ต้องมี store)"""
+        if self.store is None:
+            return None
+        return self.store.last_scan(token, self.location)
+
+    @staticmethod
+    def parse_mode_line(line):
+        """แปลงบรรทัด "MODE:0" / "MODE:1" จาก ESP32 เป็น int (None ถ้าไม่ใช่)"""
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="ignore")
+        line = line.strip()
+        if line.startswith("MODE:"):
+            val = line[5:].strip()
+            if val in ("0", "1"):
+                return int(val)
+        return None
+
     @staticmethod
     def poll_mode_from_serial(ser, current_mode):
         try:
             updated_mode = current_mode
             # อ่านทุกอย่างที่รออยู่ในบัฟเฟอร์ตอนนี้
             while getattr(ser, "in_waiting", 0):
-                raw = ser.readline()
-                try:
-                    line = raw.decode("utf-8", errors="ignore").strip()
-                except Exception:
-                    continue
-                if line.startswith("MODE:"):
-                    val = line[5:].strip()
-                    if val in ("0", "1"):
-                        updated_mode = int(val)
-                        print(f"[MODE] Received mode from ESP32 => {updated_mode}")
+                mode = ReaderLogic.parse_mode_line(ser.readline())
+                if mode is not None:
+                    updated_mode = mode
+                    print(f"[MODE] Received mode from ESP32 => {updated_mode}")
             return updated_mode
         except Exception:
             return current_mode
@@ -126,7 +149,7 @@ class ReaderLogic:
         try:
             status = result.get("status", -1)
             message = result.get("message", "No message")
-            now_ts = int(time.time())
+            now_ts = int(getattr(qr_reader, "clock", time.time)())
             existed_before = bool(result.get("existed"))
             if forced_mode == 0:
                 qr_reader.scan_history.pop(token, None)
@@ -149,3 +172,6 @@ def poll_mode_from_serial(ser, current_mode):
 
 def apply_forced_mode(qr_reader, token, result, forced_mode):
     return ReaderLogic.apply_forced_mode(qr_reader, token, result, forced_mode)
+
+def parse_mode_line(line):
+    return ReaderLogic.parse_mode_line(line)
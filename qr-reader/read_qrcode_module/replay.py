@@ -0,0 +1,445 @@
+# Replay/simulation harness for the check-in stations
+# Drives the station scan logic from recorded frames or a synthetic scan stream,
+# with fake serial + fake evdev devices, and reports throughput and latency.
+#
+#   python -m read_qrcode_module.replay webcam --frames recordings/booth1/
+#   python -m read_qrcode_module.replay webcam --video recordings/booth1.mp4
+#   python -m read_qrcode_module.replay bcode --scans 200 --rate 1.5
+import argparse
+import glob
+import json
+import os
+import secrets
+import base64
+import tempfile
+import time
+from collections import namedtuple
+import cv2
+import numpy as np
+
+try:
+    from .reader_logic import ReaderLogic
+    from .decoders import get_decoder
+    from .scan_logic import make_gate, zbar_decode
+    from .station import (StationRuntime, SerialDisplaySink, LogSink,
+                          WEBCAM_SEND_INTERVAL_SEC, WEBCAM_DISPLAY_HOLD_SEC, BCODE_SEND_INTERVAL_SEC)
+except ImportError:
+    from reader_logic import ReaderLogic
+    from decoders import get_decoder
+    from scan_logic import make_gate, zbar_decode
+    from station import (StationRuntime, SerialDisplaySink, LogSink,
+                         WEBCAM_SEND_INTERVAL_SEC, WEBCAM_DISPLAY_HOLD_SEC, BCODE_SEND_INTERVAL_SEC)
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# evdev key codes (linux/input-event-codes.h) for the fake scanner's keystrokes
+EV_KEY = 0x01
+KEY_LEFTSHIFT = 42
+KEY_ENTER = 28
+_KEY_CODES = dict(zip("1234567890", [2, 3, 4, 5, 6, 7, 8, 9, 10, 11]))
+_KEY_CODES.update(zip("qwertyuiop", range(16, 26)))
+_KEY_CODES.update(zip("asdfghjkl", range(30, 39)))
+_KEY_CODES.update(zip("zxcvbnm", range(44, 51)))
+_KEY_CODES["-"] = 12
+
+KeyEvent = namedtuple("KeyEvent", "type code value t")
+Frame = namedtuple("Frame", "image t token group", defaults=(None, ()))  # group = ทุก token ในเฟรม
+ScanEvent = namedtuple("ScanEvent", "token t")
+
+
+# -------------------- CLOCK --------------------
+class ReplayClock:
+    """
+    Virtual clock: real processing time accumulates, idle time between events
+    is skipped. Lets a 10 minute recording replay in a few seconds while the
+    station still sees realistic timestamps.
+    """
+
+    def __init__(self, start=0.0):
+        self._virtual = start
+        self._anchor = time.perf_counter()
+
+    def now(self):
+        return self._virtual + (time.perf_counter() - self._anchor)
+
+    def advance_to(self, t):
+        if t > self.now():
+            self._virtual = t
+            self._anchor = time.perf_counter()
+
+
+# -------------------- FAKE DEVICES --------------------
+class FakeSerial:
+    """Stands in for serial.Serial: records writes, replays MODE: lines from the ESP32."""
+
+    def __init__(self, clock=None, incoming=None):
+        self.clock = clock or ReplayClock(time.time())
+        self.writes = []          # [(t, bytes)]
+        self._incoming = list(incoming or [])   # [(t, "MODE:0")]
+        self._rx = []
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        now = self.clock.now()
+        while self._incoming and self._incoming[0][0] <= now:
+            self._rx.append((self._incoming.pop(0)[1] + "\n").encode("utf-8"))
+        return sum(len(line) for line in self._rx)
+
+    def readline(self):
+        return self._rx.pop(0) if self._rx else b""
+
+    def write(self, data):
+        self.writes.append((self.clock.now(), bytes(data)))
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeInputDevice:
+    """
+    evdev.InputDevice stand-in that types scan events as HID keystrokes.
+    With realtime=True the read loops deliver each event at its t (seconds
+    after the loop starts) instead of all at once.
+    """
+
+    def __init__(self, scans, key_interval=0.002, realtime=False):
+        self.realtime = realtime
+        self.t0 = None  # perf_counter() ตอนเริ่ม read loop
+        self.delivered = []  # perf_counter() ตอนส่งแต่ละ event ออกไป
+        self.events = []
+        for scan in scans:
+            t = scan.t
+            for ch in scan.token:
+                shift = ch.isupper() or ch == "_"
+                code = _KEY_CODES[ch.lower() if ch != "_" else "-"]
+                if shift:
+                    self.events.append(KeyEvent(EV_KEY, KEY_LEFTSHIFT, 1, t))
+                self.events.append(KeyEvent(EV_KEY, code, 1, t))
+                self.events.append(KeyEvent(EV_KEY, code, 0, t))
+                if shift:
+                    self.events.append(KeyEvent(EV_KEY, KEY_LEFTSHIFT, 0, t))
+                t += key_interval
+            self.events.append(KeyEvent(EV_KEY, KEY_ENTER, 1, t))
+            self.events.append(KeyEvent(EV_KEY, KEY_ENTER, 0, t))
+
+    def read_loop(self):
+        t0 = self.t0 = time.perf_counter()
+        for event in self.events:
+            if self.realtime:
+                time.sleep(max(0.0, t0 + event.t - time.perf_counter()))
+            self.delivered.append(time.perf_counter())
+            yield event
+
+    async def async_read_loop(self):
+        import asyncio
+        t0 = self.t0 = time.perf_counter()
+        for event in self.events:
+            if self.realtime:
+                await asyncio.sleep(max(0.0, t0 + event.t - time.perf_counter()))
+            self.delivered.append(time.perf_counter())
+            yield event
+
+    def close(self):
+        pass
+
+
+# -------------------- SOURCES --------------------
+def gen_token(length=22):
+    return base64.urlsafe_b64encode(secrets.token_bytes(length)).decode("utf-8")[:length]
+
+
+def synthetic_scans(count, rate=1.0, unique=None, seed=0):
+    """สร้าง scan event ปลอม: count ครั้ง, rate ครั้ง/วินาที, จาก token ไม่ซ้ำ unique ตัว"""
+    rng = np.random.default_rng(seed)
+    pool = [gen_token() for _ in range(unique or count)]
+    t = 0.0
+    scans = []
+    for i in range(count):
+        t += rng.exponential(1.0 / rate)
+        scans.append(ScanEvent(pool[i % len(pool)], t))
+    return scans
+
+
+def render_qr(token, size=300):
+    import qrcode
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, border=4)
+    qr.add_data(token)
+    qr.make(fit=True)
+    img = np.array(qr.make_image(fill_color="black", back_color="white").convert("L"))
+    return cv2.resize(img, (size, size), interpolation=cv2.INTER_NEAREST)
+
+
+def synthetic_frames(scans, fps=15, hold=1.0, width=1280, height=720, qr_size=300, group=1):
+    """
+    เฟรมจำลอง: ถือ QR ของแต่ละ scan ไว้กลางจอ hold วินาที คั่นด้วยเฟรมว่าง
+    group > 1: ทุก group scan ติดกันถือ QR ขึ้นมาพร้อมกัน (เวลาของคนแรก) เรียงเป็นตารางใน ROI
+    """
+    blank = np.full((height, width, 3), 180, dtype=np.uint8)
+    batches = [scans[i:i + group] for i in range(0, len(scans), group)]
+    cols = int(np.ceil(np.sqrt(group)))
+    rows = int(np.ceil(group / cols))
+    span = int(min(width, height) * 0.68)  # ให้ทั้งกลุ่มอยู่ใน ROI ค่าเริ่มต้น (0.7)
+    size = min(qr_size, span // rows, span // cols)
+    cache = {}
+    end = (batches[-1][0].t + hold) if batches else 0
+    i = 0
+    k = 0
+    while i / fps < end:
+        t = i / fps
+        while k < len(batches) and batches[k][0].t + hold < t:
+            k += 1
+        if k < len(batches) and batches[k][0].t <= t:
+            tokens = tuple(scan.token for scan in batches[k])
+            if tokens not in cache:
+                frame = blank.copy()
+                y0 = (height - rows * size) // 2
+                x0 = (width - cols * size) // 2
+                for n, token in enumerate(tokens):
+                    y = y0 + (n // cols) * size
+                    x = x0 + (n % cols) * size
+                    frame[y:y + size, x:x + size] = cv2.cvtColor(render_qr(token, size), cv2.COLOR_GRAY2BGR)
+                cache[tokens] = frame
+            yield Frame(cache[tokens], t, tokens[0], tokens)
+        else:
+            yield Frame(blank, t)
+        i += 1
+
+
+def directory_frames(path, fps=15):
+    files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTS))
+    for i, f in enumerate(files):
+        img = cv2.imread(f, cv2.IMREAD_COLOR)
+        if img is not None:
+            yield Frame(img, i / fps)
+
+
+def video_frames(path, fps=None):
+    cap = cv2.VideoCapture(path)
+    fps = fps or cap.get(cv2.CAP_PROP_FPS) or 15
+    i = 0
+    try:
+        while True:
+            ret, img = cap.read()
+            if not ret:
+                break
+            yield Frame(img, i / fps)
+            i += 1
+    finally:
+        cap.release()
+
+
+# -------------------- STATS --------------------
+def percentiles(values_ms):
+    if not values_ms:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    arr = np.asarray(values_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "max": round(float(arr.max()), 3)}
+
+
+class ReplayStats:
+    def __init__(self, mode):
+        self.mode = mode
+        self.events = 0
+        self.attempts = 0
+        self.scans = 0
+        self.rejected = 0
+        self.skipped = 0
+        self.decode_ms = []
+        self.e2e_ms = []
+        self.virtual_sec = 0.0
+        self.wall_sec = 0.0
+
+    def report(self):
+        minutes = self.virtual_sec / 60.0 if self.virtual_sec else 0
+        return {
+            "mode": self.mode,
+            "events": self.events,
+            "attempts": self.attempts,
+            "scans": self.scans,
+            "rejected": self.rejected,
+            "skipped": self.skipped,
+            "virtual_sec": round(self.virtual_sec, 3),
+            "wall_sec": round(self.wall_sec, 3),
+            "scans_per_sec": round(self.scans / self.virtual_sec, 4) if self.virtual_sec else 0,
+            "scans_per_min": round(self.scans / minutes, 2) if minutes else 0,
+            "events_per_wall_sec": round(self.events / self.wall_sec, 2) if self.wall_sec else 0,
+            "decode_ms": percentiles(self.decode_ms),
+            "e2e_ms": percentiles(self.e2e_ms),
+        }
+
+
+# -------------------- RUNNERS --------------------
+def make_station(location, clock, ser, cooldown=5, stay=600, gate=None, decode=zbar_decode, log_file=None,
+                 multi=None):
+    """StationRuntime แบบ headless ที่ใช้ FakeSerial + log ชั่วคราว และเวลาเสมือนของ clock"""
+    log_file = log_file or os.path.join(tempfile.gettempdir(), f"replay_qr_log_{location}.json")
+    if os.path.exists(log_file):
+        os.remove(log_file)
+    epoch0 = time.time()
+    station_clock = lambda: epoch0 + clock.now()
+    reader = ReaderLogic(location, cooldown, stay, clock=station_clock, log_file=log_file)
+    return StationRuntime(location, sinks=[SerialDisplaySink(ser), LogSink(location, log_file)],
+                          reader=reader, gate=gate, decode=decode, clock=station_clock, multi=multi), epoch0
+
+
+def _count(stats, outcome):
+    if outcome.result is None:
+        return
+    if outcome.result["status"] == -1:
+        stats.rejected += 1
+    else:
+        stats.scans += 1
+
+
+def replay_webcam(frames, decode=zbar_decode, location="Replay", cooldown=5, stay=600,
+                  send_interval=WEBCAM_SEND_INTERVAL_SEC, display_hold=WEBCAM_DISPLAY_HOLD_SEC,
+                  gate=None, serial_lines=None, log_file=None, lockout="token", multi=None):
+    """
+    เล่นเฟรมผ่าน StationRuntime.step_frame (logic เดียวกับ read_qrcode_webcam.py)
+    lockout="global" ใช้ ScanGate แบบเดิม (ล็อกทั้งสถานีหลังทุกการ decode) เพื่อเทียบ
+    multi="roi"/"frame" ใช้ step_group (group check-in) แทน; decode ควรเป็นแบบอ่านทุก QR ในภาพ
+    e2e = เวลาที่ QR ปรากฏในเฟรมแรก -> เขียน Serial
+    (เฟรมที่บันทึกจริงไม่มี token กำกับ จะนับจากเฟรมแรกที่ decode ได้แทน)
+    เฟรมที่มีเฟรมใหม่กว่ามาถึงแล้วระหว่างที่สถานียัง decode อยู่จะถูกข้าม (skipped) เหมือนกล้องจริง
+    """
+    clock = ReplayClock()
+    ser = FakeSerial(clock, serial_lines)
+    station, epoch0 = make_station(location, clock, ser, cooldown, stay,
+                                   gate or make_gate(lockout, send_interval, display_hold), decode, log_file, multi)
+    stats = ReplayStats("webcam")
+    first_seen = {}
+    wall0 = time.perf_counter()
+
+    frames = iter(frames)
+    upcoming = next(frames, None)
+    while upcoming is not None:
+        frame, upcoming = upcoming, next(frames, None)
+        clock.advance_to(frame.t)
+        stats.events += 1
+        for token in frame.group or ((frame.token,) if frame.token else ()):
+            first_seen.setdefault(token, frame.t)
+        if upcoming is not None and upcoming.t <= clock.now():
+            stats.skipped += 1
+            continue
+        station.poll_mode()
+        writes = len(ser.writes)
+        if multi:
+            outcomes = station.step_group(frame.image)
+        else:
+            outcome = station.step_frame(frame.image)
+            outcomes = [outcome] if outcome is not None else []
+        if not outcomes:
+            continue
+        stats.attempts += 1
+        stats.decode_ms.append(outcomes[0].decode_ms)
+        for outcome in outcomes:
+            if outcome.token:
+                first_seen.setdefault(outcome.token, frame.t)
+            if len(ser.writes) > writes and outcome.result:
+                stats.e2e_ms.append((ser.writes[-1][0] - first_seen.pop(outcome.token, frame.t)) * 1000.0)
+            _count(stats, outcome)
+
+    stats.virtual_sec = clock.now()
+    stats.wall_sec = time.perf_counter() - wall0
+    return stats, ser
+
+
+def replay_bcode(scans, location="Replay", cooldown=5, stay=600, send_interval=BCODE_SEND_INTERVAL_SEC,
+                 gate=None, key_interval=0.002, serial_lines=None, log_file=None, lockout="token"):
+    """
+    เล่น scan stream ผ่าน evdev key decoding + StationRuntime.step_token (logic เดียวกับ read_qrcode_bcode.py)
+    e2e = เวลากด ENTER จาก scanner -> เขียน Serial (รวมเวลาที่รอ lockout)
+    """
+    try:
+        from .barcode_input import KeyDecoder
+    except ImportError:
+        from barcode_input import KeyDecoder
+
+    clock = ReplayClock()
+    ser = FakeSerial(clock, serial_lines)
+    station, epoch0 = make_station(location, clock, ser, cooldown, stay,
+                                   gate or make_gate(lockout, send_interval), log_file=log_file)
+    keys = KeyDecoder()
+    stats = ReplayStats("bcode")
+    wall0 = time.perf_counter()
+
+    for event in FakeInputDevice(scans, key_interval).read_loop():
+        token = keys.feed(event)
+        if not token:
+            continue
+        stats.events += 1
+        clock.advance_to(event.t)
+        station.poll_mode()
+        if not station.gate.ready(station.clock()):
+            # token รอในคิวจนกว่า lockout จะหมด
+            clock.advance_to(station.gate.next_ready() - epoch0 + 1e-6)
+        writes = len(ser.writes)
+        t0 = time.perf_counter()
+        outcome = station.step_token(token)
+        stats.decode_ms.append((time.perf_counter() - t0) * 1000.0)
+        stats.attempts += 1
+        if len(ser.writes) > writes:
+            stats.e2e_ms.append((ser.writes[-1][0] - event.t) * 1000.0)
+        _count(stats, outcome)
+
+    stats.virtual_sec = clock.now()
+    stats.wall_sec = time.perf_counter() - wall0
+    return stats, ser
+
+
+def print_report(report):
+    print(f"[{report['mode']}] events={report['events']} attempts={report['attempts']} "
+          f"scans={report['scans']} rejected={report['rejected']} skipped={report['skipped']}")
+    print(f"  virtual {report['virtual_sec']}s | wall {report['wall_sec']}s | "
+          f"{report['scans_per_sec']} scans/s ({report['scans_per_min']} scans/min)")
+    for key in ("decode_ms", "e2e_ms"):
+        p = report[key]
+        print(f"  {key:<10} p50={p['p50']} p95={p['p95']} p99={p['p99']} max={p['max']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded/synthetic input through the station scan logic")
+    parser.add_argument("station", choices=("webcam", "bcode"))
+    parser.add_argument("--frames", help="directory of recorded frames (webcam)")
+    parser.add_argument("--video", help="recorded video file (webcam)")
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--scans", type=int, default=50, help="synthetic scan events")
+    parser.add_argument("--unique", type=int, default=None, help="distinct tokens in the synthetic stream")
+    parser.add_argument("--rate", type=float, default=0.5, help="synthetic scans per second")
+    parser.add_argument("--hold", type=float, default=1.0, help="seconds each synthetic QR stays in view")
+    parser.add_argument("--group", type=int, default=1, help="synthetic visitors holding up their QR codes together")
+    parser.add_argument("--multi", choices=("roi", "frame"), help="group check-in mode (decode every QR per frame)")
+    parser.add_argument("--decoder", default="zbar",
+                        help="zbar / opencv / aruco / wechat, or a comma separated cascade such as zbar,wechat")
+    parser.add_argument("--lockout", choices=("token", "global"), default="token",
+                        help="per-token cooldown (current) or the old station-wide lockout")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.station == "webcam":
+        if args.frames:
+            frames = directory_frames(args.frames, args.fps)
+        elif args.video:
+            frames = video_frames(args.video, args.fps)
+        else:
+            scans = synthetic_scans(args.scans, args.rate, args.unique)
+            frames = synthetic_frames(scans, args.fps, args.hold, group=args.group)
+        stats, _ = replay_webcam(frames, get_decoder(args.decoder, multi=bool(args.multi)), lockout=args.lockout,
+                                 multi=args.multi)
+    else:
+        stats, _ = replay_bcode(synthetic_scans(args.scans, args.rate, args.unique), lockout=args.lockout)
+
+    report = stats.report()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# Sampling profiler for station processes: folded stacks, speedscope JSON and a hot-function table
+#
+#   kill -USR1 <pid>                                   # sample for 10 s (toggle)
+#   python read_qrcode_module/read_qrcode_webcam.py --profile 30
+#   STATION_PROFILE=30 STATION_PROFILE_HZ=200 python read_qrcode_module/read_qrcode_bcode.py
+#
+# Nothing runs until a profile is started: the sampler is a daemon thread that
+# reads sys._current_frames() at the given rate, so the station loop is never
+# instrumented and a production process can be profiled without a restart.
+# Open profiles/*.speedscope.json in https://www.speedscope.app or feed the
+# .folded file to flamegraph.pl.
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_HZ = 100
+DEFAULT_SECONDS = 10
+
+
+def _frame_key(code):
+    return code.co_name, os.path.basename(code.co_filename), code.co_firstlineno
+
+
+class StackSampler:
+    def __init__(self, out_dir="profiles", hz=DEFAULT_HZ, name="station", max_depth=64):
+        self.out_dir = out_dir
+        self.interval = 1.0 / hz
+        self.name = name
+        self.max_depth = max_depth
+        self.stacks = Counter()  # (thread, frame_key, ...) root-first -> samples
+        self.samples = 0
+        self.duration = 0.0
+        self.last_paths = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=DEFAULT_SECONDS):
+        """เริ่ม sample seconds วินาที (None = จนกว่าจะ stop); คืน False ถ้ากำลังทำงานอยู่แล้ว"""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampler", daemon=True)
+            self._thread.start()
+        print(f"[PROFILE] sampling at {1.0 / self.interval:.0f} Hz" + (f" for {seconds} s" if seconds else ""))
+        return True
+
+    def stop(self):
+        """หยุดและเขียนผล; คืน dict ของไฟล์ที่เขียน"""
+        thread = self._thread
+        if thread is None:
+            return self.last_paths
+        self._stop.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        return self.last_paths
+
+    def toggle(self, seconds=DEFAULT_SECONDS):
+        if self.running:
+            self.stop()
+        else:
+            self.start(seconds)
+
+    def _run(self, seconds):
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds if seconds else None
+        started = time.monotonic()
+        next_t = started
+        while not self._stop.is_set():
+            if deadline and time.monotonic() >= deadline:
+                break
+            self.sample_once(skip=me)
+            next_t += self.interval
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_t = time.monotonic()  # ตามไม่ทัน ไม่ต้องเร่งชดเชย
+        self.duration = time.monotonic() - started
+        try:
+            self.last_paths = self.write()
+            print(f"[PROFILE] {self.samples} samples -> {self.last_paths['speedscope']}")
+        except OSError as e:
+            print(f"[PROFILE] write failed: {e}")
+
+    def sample_once(self, skip=None):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_key(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    # -------------------- OUTPUT --------------------
+    @staticmethod
+    def _label(key):
+        return key if isinstance(key, str) else f"{key[0]} ({key[1]}:{key[2]})"
+
+    def folded(self):
+        """Brendan Gregg collapsed-stack format: thread;outer;...;inner count"""
+        return "\n".join(";".join(self._label(k) for k in stack) + f" {n}"
+                         for stack, n in self.stacks.most_common()) + "\n"
+
+    def hot_functions(self, limit=30):
+        """[(function, self samples, total samples)] เรียงตาม self time"""
+        own, total = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            frames = [k for k in stack if not isinstance(k, str)]
+            if frames:
+                own[frames[-1]] += n
+            for key in set(frames):
+                total[key] += n
+        return [(self._label(k), n, total[k]) for k, n in own.most_common(limit)]
+
+    def speedscope(self):
+        frames, index = [], {}
+        profiles = {}
+        for stack, n in self.stacks.items():
+            ids = []
+            for key in stack[1:]:
+                if key not in index:
+                    index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                ids.append(index[key])
+            prof = profiles.setdefault(stack[0], {"samples": [], "weights": []})
+            prof["samples"].append(ids)
+            prof["weights"].append(n * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "read_qrcode_module.sampler",
+            "shared": {"frames": frames},
+            "profiles": [{"type": "sampled", "name": thread, "unit": "seconds", "startValue": 0,
+                          "endValue": sum(p["weights"]), "samples": p["samples"], "weights": p["weights"]}
+                         for thread, p in sorted(profiles.items())],
+        }
+
+    def write(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        paths = {"folded": base + ".folded", "speedscope": base + ".speedscope.json", "hot": base + ".hot.txt"}
+        with open(paths["folded"], "w", encoding="UTF-8") as f:
+            f.write(self.folded())
+        with open(paths["speedscope"], "w", encoding="UTF-8") as f:
+            json.dump(self.speedscope(), f)
+        with open(paths["hot"], "w", encoding="UTF-8") as f:
+            f.write(f"{self.samples} samples, {1.0 / self.interval:.0f} Hz\n")
+            f.write(f"{'self':>7} {'total':>7}  function\n")
+            for label, own, total in self.hot_functions():
+                f.write(f"{own / max(self.samples, 1) * 100:6.1f}% {total / max(self.samples, 1) * 100:6.1f}%  {label}\n")
+        return paths
+
+
+def install(sampler, signum=None, seconds=DEFAULT_SECONDS, env_prefix="STATION_PROFILE"):
+    """
+    ผูก SIGUSR1 (ค่าเริ่มต้น) ให้ toggle การ sample และเริ่มทันทีถ้าตั้ง env
+    <env_prefix>=seconds ไว้; <env_prefix>_HZ เปลี่ยนอัตรา sample
+    """
+    hz = os.environ.get(env_prefix + "_HZ")
+    if hz:
+        sampler.interval = 1.0 / float(hz)
+    signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+    if signum is not None and threading.current_thread() is threading.main_thread():
+        signal.signal(signum, lambda *_: sampler.toggle(seconds))
+    env_seconds = os.environ.get(env_prefix)
+    if env_seconds:
+        sampler.start(float(env_seconds))
+    return sampler
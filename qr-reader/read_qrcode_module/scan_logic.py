@@ -0,0 +1,259 @@
+# Scan logic shared by the webcam and barcode stations (and the replay harness)
+import os
+import re
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+import pytz
+from datetime import datetime
+
+try:
+    from .qr_reader import QRData
+    from .reader_logic import apply_forced_mode
+except ImportError:
+    from qr_reader import QRData
+    from reader_logic import apply_forced_mode
+
+try:
+    from pyzbar.pyzbar import decode as _zbar_decode, ZBarSymbol
+    ZBAR_OK = True
+except Exception as e:
+    _zbar_decode = None
+    ZBAR_OK = False
+    ZBAR_IMPORT_ERROR = e
+
+timezone = pytz.timezone("Asia/Bangkok")
+time_format = "%I:%M:%S %p"
+token_format = re.compile(r"^[A-Za-z0-9_\-]{22}$")  # base64url 22 ตัว
+LOG_FILE = "qr_log.json"
+
+
+# -------------------- DECODE --------------------
+def zbar_decode(img):
+    if not ZBAR_OK:
+        raise ImportError(f"pyzbar import failed: {ZBAR_IMPORT_ERROR}")
+    return [r.data for r in _zbar_decode(img, symbols=[ZBarSymbol.QRCODE])]
+
+
+_cv_detector = None
+
+
+def opencv_decode(img):
+    global _cv_detector
+    if _cv_detector is None:
+        _cv_detector = cv2.QRCodeDetector()
+    data, _, _ = _cv_detector.detectAndDecode(np.ascontiguousarray(img))
+    return [data.encode("utf-8")] if data else []
+
+
+def opencv_decode_multi(img):
+    """ทุก QR ในภาพ (detectAndDecodeMulti) สำหรับโหมด group check-in"""
+    global _cv_detector
+    if _cv_detector is None:
+        _cv_detector = cv2.QRCodeDetector()
+    ok, decoded, _, _ = _cv_detector.detectAndDecodeMulti(np.ascontiguousarray(img))
+    return [data.encode("utf-8") for data in decoded if data] if ok else []
+
+
+def roi_box(frame, ratio=0.7):
+    """ROI กลางจอ -> (roi_x, roi_y, reader_size, roi_x2, roi_y2)"""
+    h, w = frame.shape[:2]
+    reader_size = int(min(h, w) * ratio)
+    roi_x = max(0, (w - reader_size) // 2)
+    roi_y = max(0, (h - reader_size) // 2)
+    roi_x2 = min(w, roi_x + reader_size)
+    roi_y2 = min(h, roi_y + reader_size)
+    return roi_x, roi_y, reader_size, roi_x2, roi_y2
+
+
+def decode_candidates(candidates, decode=zbar_decode):
+    """ลอง decode ทุกภาพ x 4 การหมุน คืน token แรกที่อ่านได้ (หรือ None)"""
+    for img in candidates:
+        for k in range(4):
+            test = np.rot90(img, k)
+            try:
+                res = decode(test)
+            except Exception:
+                res = []
+            if not res or not res[0]:
+                continue
+            token = res[0].decode("utf-8", errors="ignore").strip()
+            if token:
+                return token
+    return None
+
+
+def decode_all(candidates, decode=zbar_decode, is_new=None):
+    """
+    ทุก token ที่อ่านได้ (ไม่ซ้ำ เรียงตามที่เจอ) สำหรับโหมดหลาย QR
+    หยุดที่ภาพแรกที่ได้ token ใหม่ (is_new(token) -> False = token ที่ยังอยู่ใน cooldown)
+    ลองหมุนภาพเฉพาะเมื่อยังไม่เจอ QR เลย
+    """
+    tokens = []
+    for k in range(4):
+        for img in candidates:
+            try:
+                res = decode(np.rot90(img, k) if k else img)
+            except Exception:
+                res = []
+            for data in res:
+                token = data.decode("utf-8", errors="ignore").strip()
+                if token and token not in tokens:
+                    tokens.append(token)
+            if any(is_new is None or is_new(token) for token in tokens):
+                return tokens
+        if tokens:
+            break
+    return tokens
+
+
+# -------------------- RATE LIMIT --------------------
+class ScanGate:
+    """
+    Global scan lockout used by the stations: after every attempt nothing is
+    scanned for send_interval seconds, and after a hit the result is held on
+    screen for display_hold seconds.
+    """
+
+    def __init__(self, send_interval, display_hold=0):
+        self.send_interval = send_interval
+        self.display_hold = display_hold
+        self.expiry_time = 0
+        self.display_until = 0
+
+    def holding(self, now):
+        return now < self.display_until
+
+    def ready(self, now):
+        return not self.holding(now) and now > self.expiry_time
+
+    def next_ready(self):
+        return max(self.expiry_time, self.display_until)
+
+    def showing(self, now):
+        return self.holding(now)
+
+    def allow(self, token, now):
+        return True
+
+    def after_attempt(self, now, hit=False, token=None):
+        self.expiry_time = now + self.send_interval
+        if hit:
+            self.display_until = now + self.display_hold
+
+
+class TokenDebounce:
+    """
+    Per-token rate limit: a token that was just handled is ignored for
+    cooldown seconds (a QR held up to the camera is decoded on many frames
+    in a row), while any other token is handled at once. Failed decodes
+    never lock anything, so every frame the loop can afford is decoded, and
+    the last result stays on screen for display_hold seconds without
+    blocking the next visitor. Same interface as ScanGate.
+    """
+
+    def __init__(self, cooldown, display_hold=0, max_tokens=1024):
+        self.cooldown = cooldown
+        self.display_hold = display_hold
+        self.max_tokens = max_tokens
+        self.recent = OrderedDict()  # token -> หมด cooldown เมื่อไร (เรียงตามเวลาเพราะ cooldown คงที่)
+        self.display_until = 0
+
+    def holding(self, now):
+        return False
+
+    def showing(self, now):
+        return now < self.display_until
+
+    def ready(self, now):
+        return True
+
+    def next_ready(self):
+        return 0
+
+    def allow(self, token, now):
+        expiry = self.recent.get(token)
+        return expiry is None or now >= expiry
+
+    def after_attempt(self, now, hit=False, token=None):
+        if token:
+            self.recent[token] = now + self.cooldown
+            self.recent.move_to_end(token)
+            while self.recent and (len(self.recent) > self.max_tokens or next(iter(self.recent.values())) <= now):
+                self.recent.popitem(last=False)
+        if hit:
+            self.display_until = now + self.display_hold
+
+
+def make_gate(lockout, interval, display_hold=0):
+    """lockout="token" -> TokenDebounce (ค่าเริ่มต้น), "global" -> ScanGate แบบเดิม (ล็อกทั้งสถานี)"""
+    if lockout == "global":
+        return ScanGate(interval, display_hold)
+    return TokenDebounce(interval, display_hold)
+
+
+# -------------------- TOKEN HANDLING --------------------
+def process_token(qr_reader, token, check_mode, now_str=None):
+    """
+    ส่ง token เข้า ReaderLogic (+ forced mode จาก ESP32)
+    คืน (result, serial_line) หรือ (None, None) ถ้า token ผิดรูปแบบ
+    result["log"] = True เมื่อควรบันทึกลง qr_log.json
+    """
+    if not token or not token_format.match(token):
+        return None, None
+    if now_str is None:
+        now_str = datetime.now(timezone).strftime(time_format)
+
+    result = qr_reader.read_qr(token)
+    result = apply_forced_mode(qr_reader, token, result, check_mode)
+    status = result.get("status", -1)
+
+    serial_line = None
+    result["log"] = False
+    if status != -1 and result.get("qr_data"):
+        result["log"] = True
+        serial_line = f"{token},{status},{now_str}\n"
+    elif result.get("next_checkout_str"):
+        # กรณีก่อนถึงเวลา checkout: ส่งเวลาที่ checkout ได้ไปที่ Serial
+        serial_line = f"TIME,-1,Checkout at {result['next_checkout_str']}\n"
+    return result, serial_line
+
+
+def group_summary(results, now_str):
+    """
+    สรุปผลหลาย QR เป็นบรรทัดเดียวสำหรับจอ TFT: (serial_line, ข้อความ, status)
+    status ของไอคอน: มี check in = 1, มีแต่ check out = 0, ไม่มีทั้งคู่ = -1
+    """
+    checked_in = sum(r["status"] == 1 for r in results)
+    checked_out = sum(r["status"] == 0 for r in results)
+    waiting = len(results) - checked_in - checked_out
+    parts = [f"{n} {label}" for n, label in ((checked_in, "in"), (checked_out, "out"), (waiting, "wait")) if n]
+    status = 1 if checked_in else 0 if checked_out else -1
+    text = ", ".join(parts)
+    return f"GROUP,{status},{text} {now_str}\n", text, status
+
+
+def safe_write_log(token, location, status, ts_now, log_file=LOG_FILE):
+    """กันไฟล์ log พัง: ถ้าเขียนล้มเหลว จะรีเซ็ตเป็น [] แล้วลองใหม่"""
+    safe_write_logs([(token, status, ts_now)], location, log_file)
+
+
+def safe_write_logs(rows, location, log_file=LOG_FILE):
+    """เหมือน safe_write_log แต่เขียน [(token, status, ts), ...] ทั้งชุดในครั้งเดียว"""
+    records = [QRData(token, location, status, int(ts)) for token, status, ts in rows]
+    if not records:
+        return
+    try:
+        QRData.write_many(records, log_file)
+        return
+    except Exception as e:
+        print("log write error, trying to reset file:", e)
+        try:
+            if os.path.exists(log_file):
+                os.replace(log_file, log_file + f".corrupt.{int(time.time())}.json")
+            with open(log_file, "w", encoding="utf-8") as f:
+                f.write("[]")
+            QRData.write_many(records, log_file)
+        except Exception as e2:
+            print("fatal: cannot reset log file:", e2)
@@ -0,0 +1,154 @@
+# Indexed local scan store (SQLite, WAL) next to / instead of scanning the flat qr_log.json
+#
+#   store = ScanStore("qr_log.db")
+#   store.add(token, "Place1", 1, epoch)          # buffered, committed once per flush window
+#   store.last_scan(token, location="Place1")     # -> (location, check, epoch) or None
+#   store.scans_between("Place1", start, end)     # -> [(token, check, epoch), ...]
+#
+# Inserts are buffered and written with executemany() in one transaction per
+# flush window (flush_interval seconds or batch_size rows, whichever first),
+# so a scan costs a list append on the station thread. Every query is a
+# constant SQL string, so sqlite3's statement cache keeps it prepared.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id       INTEGER PRIMARY KEY,
+    token    TEXT    NOT NULL,
+    location TEXT    NOT NULL,
+    "check"  INTEGER NOT NULL,
+    epoch    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_token_epoch ON scans (token, epoch);
+CREATE INDEX IF NOT EXISTS scans_location_epoch ON scans (location, epoch);
+"""
+
+INSERT_SQL = 'INSERT INTO scans (token, location, "check", epoch) VALUES (?, ?, ?, ?)'
+LAST_SCAN_SQL = 'SELECT location, "check", epoch FROM scans WHERE token = ? ORDER BY epoch DESC, id DESC LIMIT 1'
+# "+location": ไม่ให้ planner เลือก index ของ location (ทั้งสถานี) แทน index ของ token
+LAST_SCAN_AT_SQL = ('SELECT location, "check", epoch FROM scans WHERE token = ? AND +location = ? '
+                    'ORDER BY epoch DESC, id DESC LIMIT 1')
+RANGE_SQL = ('SELECT token, "check", epoch FROM scans WHERE location = ? AND epoch >= ? AND epoch < ? '
+             'ORDER BY epoch, id')
+RECENT_SQL = 'SELECT token, "check", epoch FROM scans WHERE location = ? ORDER BY epoch DESC, id DESC LIMIT ?'
+COUNT_SQL = "SELECT COUNT(*) FROM scans"
+
+
+class ScanStore:
+    def __init__(self, path="qr_log.db", flush_interval=1.0, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: อาจเสียแค่ transaction ล่าสุดถ้าไฟดับ
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._pending = []
+        self._timer = None
+        self.flushes = 0
+
+    # -------------------- WRITE --------------------
+    def add(self, token, location, check, epoch):
+        """เก็บลง buffer; commit เมื่อครบ batch_size หรือครบ flush_interval วินาทีหลัง record แรกใน buffer"""
+        with self._lock:
+            self._pending.append((token, location, int(check), int(epoch)))
+            if len(self._pending) >= self.batch_size or not self.flush_interval:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def add_many(self, rows):
+        with self._lock:
+            self._pending.extend((t, loc, int(c), int(e)) for t, loc, c, e in rows)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return 0
+            rows, self._pending = self._pending, []
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(INSERT_SQL, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._pending = rows + self._pending
+                raise
+            self.flushes += 1
+            return len(rows)
+
+    def import_json(self, log_file):
+        """นำเข้า qr_log.json เดิม (array ของ {token, location, check, epoch}) คืนจำนวนแถว"""
+        if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+            return 0
+        with open(log_file, "r", encoding="UTF-8") as f:
+            logs = json.load(f)
+        rows = [(log["token"], log.get("location", ""), log["check"], log["epoch"])
+                for log in logs if log.get("token") and log.get("epoch")]
+        self.add_many(rows)
+        return len(rows)
+
+    # -------------------- QUERY --------------------
+    def _query(self, sql, params):
+        with self._lock:
+            if self._pending:
+                self.flush()  # อ่านต้องเห็นสิ่งที่เพิ่ง add
+            return self._conn.execute(sql, params).fetchall()
+
+    def last_scan(self, token, location=None):
+        """scan ล่าสุดของ token (เฉพาะ location ถ้าระบุ) -> (location, check, epoch) หรือ None"""
+        if location is None:
+            rows = self._query(LAST_SCAN_SQL, (token,))
+        else:
+            rows = self._query(LAST_SCAN_AT_SQL, (token, location))
+        return rows[0] if rows else None
+
+    def scans_between(self, location, start, end=None):
+        """scan ทั้งหมดของ location ในช่วง [start, end) เรียงตามเวลา"""
+        return self._query(RANGE_SQL, (location, int(start), int(end if end is not None else time.time() + 1)))
+
+    def recent(self, location, limit=800):
+        return self._query(RECENT_SQL, (location, limit))
+
+    def checked_in(self, location, limit=800):
+        """
+        {token: epoch} ของ token ที่ scan ล่าสุดเป็น check in ภายใน limit แถวล่าสุดของ location
+        ใช้สร้าง scan_history ตอน ReaderLogic เริ่มทำงาน (token ที่ check out ไปแล้วจะไม่ถูกนับ)
+        """
+        history, seen = {}, set()
+        for token, check, epoch in self.recent(location, limit):
+            if token in seen:
+                continue
+            seen.add(token)
+            if check == 1:
+                history[token] = epoch
+        return history
+
+    def count(self):
+        return self._query(COUNT_SQL, ())[0][0]
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+def open_store(path, seed_log=None):
+    """เปิด ScanStore; ถ้าเพิ่งสร้าง (ว่าง) และมี qr_log.json เดิม จะนำเข้าให้ก่อน"""
+    store = ScanStore(path)
+    if seed_log and store.count() == 0:
+        imported = store.import_json(seed_log)
+        if imported:
+            print(f"Scan store: imported {imported} records from {seed_log}")
+    return store
@@ -0,0 +1,634 @@
+# Station runtime: input source -> scan logic -> output sinks, with explicit start()/stop()
+import json
+import time
+import threading
+import configparser
+import serial
+import serial.tools.list_ports
+from collections import namedtuple
+from datetime import datetime
+from queue import Queue, Empty
+
+try:
+    from .metrics import Histogram, DECODE_BUCKETS_MS, WRITE_BUCKETS_MS
+    from .preprocess import RoiPreprocessor
+    from .qr_reader import QRData
+    from .reader_logic import ReaderLogic, poll_mode_from_serial
+    from .scan_logic import (TokenDebounce, roi_box, decode_candidates, decode_all, process_token,
+                             group_summary, safe_write_log, safe_write_logs, zbar_decode, timezone, time_format, LOG_FILE)
+except ImportError:
+    from metrics import Histogram, DECODE_BUCKETS_MS, WRITE_BUCKETS_MS
+    from preprocess import RoiPreprocessor
+    from qr_reader import QRData
+    from reader_logic import ReaderLogic, poll_mode_from_serial
+    from scan_logic import (TokenDebounce, roi_box, decode_candidates, decode_all, process_token,
+                            group_summary, safe_write_log, safe_write_logs, zbar_decode, timezone, time_format, LOG_FILE)
+
+CONFIG_FILE = "config.ini"
+DEV_PATH = "/dev/input/by-id/usb-SM_SM-2D_PRODUCT_HID_KBW_APP-000000000-event-kbd"
+TOPIC = "openhouse/qrscan"
+
+# cooldown ต่อ token / เวลาแสดงผล ของแต่ละสถานี (วินาที)
+WEBCAM_SEND_INTERVAL_SEC = 5
+WEBCAM_DISPLAY_HOLD_SEC = 3
+BCODE_SEND_INTERVAL_SEC = 2
+
+ScanInput = namedtuple("ScanInput", "kind payload t")
+ScanOutcome = namedtuple("ScanOutcome", "kind token result serial_line now_str t decode_ms")
+
+
+def load_config(path=CONFIG_FILE):
+    config = configparser.ConfigParser()
+    config.read(path)
+    multi_code = config.get("Device", "MultiCode", fallback="off").strip().lower()  # off / roi / frame
+    return {
+        "location": config.get("Device", "Location"),
+        "cooldown": config.getint("Device", "ScanCooldown"),
+        "stay": config.getint("Device", "StayDuration"),
+        "camera_width": config.getint("Device", "CameraWidth", fallback=1280),
+        "camera_height": config.getint("Device", "CameraHeight", fallback=720),
+        "camera_fourcc": config.get("Device", "CameraFourcc", fallback=None),
+        "camera_decode": config.get("Device", "CameraDecode", fallback="bgr"),
+        "decoder": config.get("Device", "Decoder", fallback="zbar"),
+        "multi_code": None if multi_code == "off" else multi_code,
+        "roi_ratio": config.getfloat("Device", "RoiRatio", fallback=0.7),
+        "roi_upscale": config.getfloat("Device", "RoiUpscale", fallback=1.5),
+        "capture_profile": config.get("Device", "CaptureProfile", fallback=None),
+        "display_protocol": config.get("Device", "DisplayProtocol", fallback="text"),
+        "scan_store": config.get("Device", "ScanStore", fallback=None),
+    }
+
+
+def open_serial_once(baudrate=115200, timeout=1, port=None):
+    """ลองเปิด serial port หนึ่งรอบ (เฉพาะ port ที่ระบุ หรือทุก port ที่เจอ) คืน None ถ้าไม่สำเร็จ"""
+    devices = [port] if port else [p.device for p in serial.tools.list_ports.comports()]
+    for device in devices:
+        try:
+            ser = serial.Serial(device, baudrate, timeout=timeout)
+            print(f"Connected to serial port: {device}")
+            return ser
+        except serial.SerialException:
+            continue
+    return None
+
+
+def get_serial_port(baudrate=115200, timeout=1, port=None):
+    """เปิด serial port แรกที่ใช้ได้ (หรือเฉพาะ port ที่ระบุ) วนลองใหม่ทุก 2 วินาที"""
+    try:
+        while True:
+            ser = open_serial_once(baudrate, timeout, port)
+            if ser is not None:
+                return ser
+            print("No available serial ports. Retrying in 2 seconds...")
+            time.sleep(2)
+    except KeyboardInterrupt:
+        print("QR Code Reader is shutting down..."); raise SystemExit
+
+
+# -------------------- INPUT SOURCES --------------------
+class WebcamSource:
+    kind = "frame"
+
+    def __init__(self, width=None, height=None, max_index=5, retry_delay=2, max_bad_frames=5, fourcc=None,
+                 decode="bgr"):
+        self.width = width
+        self.height = height
+        self.fourcc = fourcc
+        self.decode = decode
+        self.max_index = max_index
+        self.retry_delay = retry_delay
+        self.max_bad_frames = max_bad_frames
+        self.cap = None
+        self.bad_frames = 0
+        self.done = False
+
+    def _open(self):
+        try:
+            from .camera import Camera
+        except ImportError:
+            from camera import Camera
+        size = {k: v for k, v in (("width", self.width), ("height", self.height), ("fourcc", self.fourcc)) if v}
+        while True:
+            for cam in range(self.max_index):
+                cap = Camera(camera_index=cam, decode=self.decode, **size)  # ตั้งค่า FOURCC/FPS ใน camera.py
+                if hasattr(cap, "cap") and cap.cap.isOpened():
+                    print(f"Camera index {cam} is available.")
+                    return cap
+                cap.release()
+            print("No available camera devices. Retrying in 2 seconds...")
+            time.sleep(self.retry_delay)
+
+    def start(self):
+        if self.cap is None:
+            self.cap = self._open()
+
+    def read(self):
+        try:
+            ret, frame = self.cap.get_frame()
+        except Exception:
+            ret, frame = False, None
+        if not ret or frame is None:
+            self.bad_frames += 1
+            if self.bad_frames >= self.max_bad_frames:
+                self.cap.release(); self.cap = self._open(); self.bad_frames = 0
+            return None
+        self.bad_frames = 0
+        return ScanInput("frame", frame, time.time())
+
+    def stop(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class BarcodeSource:
+    kind = "token"
+
+    def __init__(self, dev_path=DEV_PATH, timeout=0.01):
+        self.dev_path = dev_path
+        self.timeout = timeout
+        self.q = Queue()
+        self.thread = None
+        self.done = False
+
+    def start(self):
+        if self.thread is None:
+            try:
+                from .barcode_input import evdev_reader
+            except ImportError:
+                from barcode_input import evdev_reader
+            self.thread = threading.Thread(target=evdev_reader, args=(self.dev_path, self.q), daemon=True)
+            self.thread.start()
+
+    def read(self):
+        try:
+            return ScanInput("token", self.q.get(timeout=self.timeout), time.time())
+        except Empty:
+            return None
+
+    def stop(self):
+        pass  # evdev read_loop ไม่มีทางหยุด -> thread เป็น daemon
+
+
+class SyntheticSource:
+    """
+    Feeds ScanEvent(token, t) or Frame(image, t) items. With realtime=True each
+    item is released at its t (seconds after start()); otherwise as fast as
+    the runtime reads them. done becomes True after the last item.
+    """
+
+    def __init__(self, items, realtime=True, kind=None):
+        self.items = list(items)
+        self.realtime = realtime
+        self.kind = kind or ("frame" if self.items and hasattr(self.items[0], "image") else "token")
+        self.i = 0
+        self.t0 = None
+        self.done = False
+
+    def start(self):
+        self.t0 = time.time()
+
+    def read(self):
+        if self.i >= len(self.items):
+            self.done = True
+            return None
+        item = self.items[self.i]
+        if self.realtime:
+            wait = self.t0 + item.t - time.time()
+            if wait > 0:
+                time.sleep(min(wait, 0.01))
+                return None
+        self.i += 1
+        payload = item.image if self.kind == "frame" else item.token
+        return ScanInput(self.kind, payload, self.t0 + item.t if self.realtime else time.time())
+
+    def stop(self):
+        self.done = True
+
+
+# -------------------- OUTPUT SINKS --------------------
+class SerialDisplaySink:
+    """
+    ส่งผลไปจอ TFT ของ ESP32 และอ่าน MODE: ที่ ESP32 ส่งกลับมา แบบ blocking บน thread ของสถานี
+    (ใช้กับ replay); สถานีจริงใช้ DisplayChannel ที่ส่ง/reconnect อยู่เบื้องหลัง
+    """
+
+    def __init__(self, ser=None, baudrate=115200, port=None):
+        self.ser = ser
+        self.baudrate = baudrate
+        self.port = port
+
+    def start(self):
+        if self.ser is None:
+            self.ser = get_serial_port(self.baudrate, port=self.port)
+
+    def poll_mode(self, current_mode):
+        return poll_mode_from_serial(self.ser, current_mode)
+
+    def write(self, line):
+        try:
+            self.ser.write(line.encode("utf-8"))
+        except serial.SerialException:
+            print("Serial port disconnected. Attempting to reconnect...")
+            try: self.ser.close()
+            except Exception: pass
+            self.ser = get_serial_port(self.baudrate, port=self.port)
+
+    def emit(self, outcome):
+        if outcome.serial_line:
+            self.write(outcome.serial_line)
+
+    def emit_batch(self, outcomes, summary_line):
+        if summary_line:
+            self.write(summary_line)  # จอแสดงสรุปทั้งกลุ่มครั้งเดียว
+
+    def stop(self):
+        try:
+            if self.ser is not None:
+                self.ser.close()
+        except Exception:
+            pass
+
+
+class LogSink:
+    """qr_log.json (800 รายการล่าสุด) และ ScanStore ถ้ามี (เก็บทุก scan, commit เป็นชุด)"""
+
+    def __init__(self, location, log_file=LOG_FILE, store=None):
+        self.location = location
+        self.log_file = log_file
+        self.store = store
+        self.write_ms = Histogram(WRITE_BUCKETS_MS)
+
+    def emit(self, outcome):
+        if outcome.result and outcome.result["log"]:
+            t0 = time.perf_counter()
+            safe_write_log(outcome.token, self.location, outcome.result["status"], outcome.t, self.log_file)
+            if self.store is not None:
+                self.store.add(outcome.token, self.location, outcome.result["status"], int(outcome.t))
+            self.write_ms.observe((time.perf_counter() - t0) * 1000.0)
+
+    def emit_batch(self, outcomes, summary_line=None):
+        """group check-in: เขียน qr_log.json ครั้งเดียว และ commit ลง store เป็นชุดเดียว"""
+        rows = [(o.token, o.result["status"], o.t) for o in outcomes if o.result and o.result["log"]]
+        if not rows:
+            return
+        t0 = time.perf_counter()
+        safe_write_logs(rows, self.location, self.log_file)
+        if self.store is not None:
+            self.store.add_many((token, self.location, status, int(t)) for token, status, t in rows)
+        self.write_ms.observe((time.perf_counter() - t0) * 1000.0)
+
+    def stop(self):
+        if self.store is not None:
+            self.store.flush()
+
+
+class PublisherSink:
+    """
+    Publishes logged scans (same JSON as qr_log.json entries) through
+    publish(topic, payload), e.g. a paho-mqtt client's publish.
+    """
+
+    def __init__(self, location, publish, topic=TOPIC):
+        self.location = location
+        self.publish = publish
+        self.topic = topic
+
+    @classmethod
+    def mqtt(cls, location, host="localhost", port=1883, topic=TOPIC):
+        import paho.mqtt.client as mqtt
+        client = mqtt.Client()
+        client.connect(host, port)
+        client.loop_start()
+        return cls(location, client.publish, topic)
+
+    def emit(self, outcome):
+        if outcome.result and outcome.result["log"]:
+            payload = QRData(outcome.token, self.location, outcome.result["status"], int(outcome.t)).compress_data()
+            try:
+                self.publish(self.topic, json.dumps(payload))
+            except Exception as e:
+                print(f"Publish error: {e}")
+
+
+class ConsoleSink:
+    def __init__(self, scan_history=None, prefix=""):
+        self.scan_history = scan_history
+        self.prefix = prefix
+
+    def emit(self, outcome):
+        if outcome.result is None:
+            if outcome.kind == "frame" and not outcome.token:
+                print(f"{self.prefix}No QR Code")
+            return
+        result = outcome.result
+        extra = f" | Checkout time: {result['next_checkout_str']}" if result.get("next_checkout_str") else ""
+        print(f'{self.prefix}{result["message"]}{extra} at: {outcome.now_str}')
+        if self.scan_history is not None:
+            print(f"{self.prefix}{self.scan_history}")
+
+
+# -------------------- WINDOW --------------------
+class WebcamView:
+    RED_COLOR    = (0, 0, 255)
+    GREEN_COLOR  = (0, 255, 0)
+    BLUE_COLOR   = (255, 0, 0)
+    YELLOW_COLOR = (255, 255, 0)
+    WHITE_COLOR  = (255, 255, 255)
+
+    def __init__(self, title="QR Code Scanner", fullscreen=True, key_handlers=None, roi_ratio=0.7):
+        import cv2
+        self.cv2 = cv2
+        self.title = title
+        self.roi_ratio = roi_ratio
+        self.key_handlers = key_handlers if key_handlers is not None else {}  # ord(key) -> callable
+        cv2.namedWindow(title, cv2.WINDOW_NORMAL)
+        if fullscreen:
+            cv2.setWindowProperty(title, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    @classmethod
+    def color_for(cls, status):
+        return cls.GREEN_COLOR if status == 1 else cls.RED_COLOR if status == 0 else cls.WHITE_COLOR
+
+    def drawText(self, frame, x, y, text, color=GREEN_COLOR):
+        self.cv2.putText(frame, text, (x, y), self.cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2, self.cv2.LINE_AA)
+
+    def show(self, frame, now_str, last_info=None):
+        """วาด overlay แล้วแสดงผล คืน False เมื่อผู้ใช้กด q หรือปิดหน้าต่าง"""
+        cv2 = self.cv2
+        if frame.ndim == 2:  # กล้องโหมด decode="gray"
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        self.drawText(frame, 10, 30, now_str, self.YELLOW_COLOR)
+        roi_x, roi_y, reader_size, _, _ = roi_box(frame, self.roi_ratio)
+        if last_info:
+            msg, color, ts_str = last_info
+            cv2.rectangle(frame, (roi_x, roi_y), (roi_x + reader_size, roi_y + reader_size), color, 3)
+            self.drawText(frame, roi_x, roi_y - 50, f"{msg} at: {ts_str}", color)
+        # UI ช่วยเล็ง
+        self.drawText(frame, roi_x, roi_y - 10, "Place QR Code here", self.BLUE_COLOR)
+        if not last_info:
+            cv2.rectangle(frame, (roi_x, roi_y), (roi_x + reader_size, roi_y + reader_size), self.WHITE_COLOR, 3)
+        cv2.imshow(self.title, frame)
+        # ปิดโปรแกรมแบบนุ่มนวล
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord("q") or cv2.getWindowProperty(self.title, cv2.WND_PROP_VISIBLE) < 1:
+            return False
+        if key in self.key_handlers:
+            self.key_handlers[key]()
+        return True
+
+    def close(self):
+        self.cv2.destroyWindow(self.title)
+
+
+# -------------------- RUNTIME --------------------
+class StationRuntime:
+    """
+    One check-in station: pulls frames or tokens from source, runs them
+    through the gate (per-token TokenDebounce by default, or the old global
+    ScanGate lockout) + ReaderLogic, and hands every outcome to the sinks.
+
+    run() blocks on the calling thread (needed for the OpenCV window);
+    start() runs the same loop on a background thread, so several headless
+    stations can share one process. step_frame()/step_token() process a
+    single input and are what the replay harness drives directly.
+
+    multi="roi" / "frame" is the group check-in mode: step_group() decodes
+    every QR in the ROI (or the whole frame) and runs them through ReaderLogic
+    as one batch; sinks with emit_batch() get the whole group at once (one
+    qr_log.json write, one aggregated TFT line), others get each outcome.
+    """
+
+    def __init__(self, location, source=None, sinks=(), reader=None, cooldown=5, stay=600,
+                 gate=None, headless=True, decode=zbar_decode, name=None, clock=time.time,
+                 roi_ratio=0.7, upscale=1.5, multi=None):
+        self.location = location
+        self.name = name or location
+        self.source = source
+        self.sinks = list(sinks)
+        self.clock = clock
+        self.reader = reader or ReaderLogic(location, cooldown, stay, clock=clock)
+        kind = getattr(source, "kind", "frame" if source is not None else "token")
+        if gate is None:
+            gate = (TokenDebounce(WEBCAM_SEND_INTERVAL_SEC, WEBCAM_DISPLAY_HOLD_SEC) if kind == "frame"
+                    else TokenDebounce(BCODE_SEND_INTERVAL_SEC))
+        self.gate = gate
+        self.decode = decode
+        self.roi_ratio = roi_ratio
+        self.multi = multi
+        self.preprocessor = RoiPreprocessor(upscale=upscale)
+        self.headless = headless
+        self.view = None
+        self.key_handlers = {}
+        self.check_mode = 1
+        self.last_info = None
+        # ตัวนับสำหรับ metrics (อ่านตอน scrape เท่านั้น)
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.debounced = 0
+        self.scan_counts = {}
+        self.decode_ms = Histogram(DECODE_BUCKETS_MS)
+        self.running = False
+        self._opened = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- lifecycle ----------
+    def open(self):
+        if self._opened:
+            return
+        for sink in self.sinks:
+            if hasattr(sink, "start"):
+                sink.start()
+        if self.source is not None:
+            self.source.start()
+        if not self.headless:
+            self.view = WebcamView("QR Code Scanner" if self.name == self.location else self.name,
+                                   key_handlers=self.key_handlers, roi_ratio=self.roi_ratio)
+        self._opened = True
+
+    def start(self):
+        self.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=f"station-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        if self.source is not None:
+            self.source.stop()
+        for sink in self.sinks:
+            if hasattr(sink, "stop"):
+                sink.stop()
+        if self.view is not None:
+            self.view.close()
+            self.view = None
+        self._opened = False
+
+    def run(self):
+        self.open()
+        self.running = True
+        try:
+            while not self._stop.is_set():
+                try:
+                    if not self._step_source():
+                        break
+                except Exception as e:
+                    print(f"Error: {e} at: {datetime.now(timezone).strftime('%H:%M:%S')}")
+        finally:
+            self.running = False
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---------- loop ----------
+    def poll_mode(self):
+        for sink in self.sinks:
+            if hasattr(sink, "poll_mode"):
+                self.check_mode = sink.poll_mode(self.check_mode)
+        return self.check_mode
+
+    def _step_source(self):
+        self.poll_mode()
+        now = self.clock()
+        if self.source.kind == "token" and not self.gate.ready(now):
+            # token รอในคิวจนกว่า lockout จะหมด
+            time.sleep(min(0.01, max(0.0, self.gate.next_ready() - now)))
+            return True
+        item = self.source.read()
+        if item is None:
+            return not getattr(self.source, "done", False)
+        if item.kind == "frame":
+            self.frames_captured += 1
+            now_str = datetime.now(timezone).strftime(time_format)
+            if self.multi:
+                self.step_group(item.payload, now_str=now_str)
+            else:
+                self.step_frame(item.payload, now_str=now_str)
+            if self.view is not None:
+                return self.view.show(item.payload, now_str, self.last_info)
+        else:
+            self.step_token(item.payload)
+        return True
+
+    def _frame_ready(self, now):
+        if self.last_info and self.gate.holding(now):
+            self.frames_dropped += 1
+            return False
+        if self.last_info and not self.gate.showing(now):
+            self.last_info = None  # หมดเวลาแสดงผลแล้ว
+        if not self.gate.ready(now):
+            self.frames_dropped += 1
+            return False
+        return True
+
+    def step_frame(self, frame, now=None, now_str=None):
+        """สแกนหนึ่งเฟรม (ถ้า lockout หมดแล้ว) คืน ScanOutcome หรือ None ถ้าข้ามเฟรมนี้"""
+        now = self.clock() if now is None else now
+        if not self._frame_ready(now):
+            return None
+
+        roi_x, roi_y, _, roi_x2, roi_y2 = roi_box(frame, self.roi_ratio)
+        t0 = time.perf_counter()
+        token = decode_candidates(self.preprocessor.process(frame[roi_y:roi_y2, roi_x:roi_x2]), self.decode)
+        decode_ms = (time.perf_counter() - t0) * 1000.0
+        self.decode_ms.observe(decode_ms)
+        if token and not self.gate.allow(token, now):
+            self.debounced += 1  # QR เดิมยังอยู่หน้ากล้อง
+            return None
+        outcome = self._dispatch("frame", token, now_str, decode_ms)
+        self.gate.after_attempt(self.clock(), hit=bool(outcome.result), token=token if outcome.result else None)
+        return outcome
+
+    def step_group(self, frame, now=None, now_str=None):
+        """
+        โหมดหลาย QR: decode ทุก QR ใน ROI (multi="roi") หรือทั้งเฟรม (multi="frame")
+        ตัด token ที่ยังอยู่ใน cooldown แล้วประมวลผลที่เหลือเป็นชุดเดียว
+        คืน [ScanOutcome] (ว่างถ้าข้ามเฟรม หรือทุก QR ในเฟรมเพิ่ง scan ไป)
+        """
+        now = self.clock() if now is None else now
+        if not self._frame_ready(now):
+            return []
+        if self.multi == "frame":
+            region = frame
+        else:
+            roi_x, roi_y, _, roi_x2, roi_y2 = roi_box(frame, self.roi_ratio)
+            region = frame[roi_y:roi_y2, roi_x:roi_x2]
+        t0 = time.perf_counter()
+        tokens = decode_all(self.preprocessor.process(region), self.decode,
+                            lambda token: self.gate.allow(token, now))
+        decode_ms = (time.perf_counter() - t0) * 1000.0
+        self.decode_ms.observe(decode_ms)
+        fresh = [token for token in tokens if self.gate.allow(token, now)]
+        self.debounced += len(tokens) - len(fresh)
+        if tokens and not fresh:
+            return []
+        if len(fresh) <= 1:
+            token = fresh[0] if fresh else None
+            outcome = self._dispatch("frame", token, now_str, decode_ms)
+            self.gate.after_attempt(self.clock(), hit=bool(outcome.result), token=token if outcome.result else None)
+            return [outcome]
+        outcomes = self._dispatch_group(fresh, now_str, decode_ms)
+        for outcome in outcomes:
+            if outcome.result:
+                self.gate.after_attempt(self.clock(), hit=True, token=outcome.token)
+        return outcomes
+
+    def step_token(self, token, now_str=None):
+        """
+        ประมวลผล token จาก scanner หนึ่งครั้ง คืน ScanOutcome
+        (result=None ถ้า token ผิดรูปแบบ หรือเพิ่ง scan token นี้ไปภายใน cooldown)
+        """
+        now = self.clock()
+        if token and not self.gate.allow(token, now):
+            self.debounced += 1
+            return ScanOutcome("token", token, None, None, now_str, now, 0.0)
+        outcome = self._dispatch("token", token, now_str, 0.0)
+        if outcome.result:
+            self.gate.after_attempt(self.clock(), hit=True, token=token)
+        return outcome
+
+    def _process(self, kind, token, now_str, decode_ms):
+        result, serial_line = process_token(self.reader, token, self.check_mode, now_str)
+        if token:
+            status = result["status"] if result else None
+            self.scan_counts[status] = self.scan_counts.get(status, 0) + 1
+        return ScanOutcome(kind, token, result, serial_line, now_str, self.clock(), decode_ms)
+
+    def _dispatch(self, kind, token, now_str, decode_ms):
+        now_str = now_str or datetime.now(timezone).strftime(time_format)
+        outcome = self._process(kind, token, now_str, decode_ms)
+        result = outcome.result
+        if result:
+            extra = f" | Checkout time: {result['next_checkout_str']}" if result.get("next_checkout_str") else ""
+            self.last_info = (result["message"] + extra, WebcamView.color_for(result["status"]), now_str)
+        for sink in self.sinks:
+            try:
+                sink.emit(outcome)
+            except Exception as e:
+                print(f"[{self.name}] sink {type(sink).__name__} error: {e}")
+        return outcome
+
+    def _dispatch_group(self, tokens, now_str, decode_ms):
+        now_str = now_str or datetime.now(timezone).strftime(time_format)
+        outcomes = [self._process("frame", token, now_str, decode_ms) for token in tokens]
+        results = [o.result for o in outcomes if o.result]
+        summary_line = None
+        if results:
+            summary_line, text, status = group_summary(results, now_str)
+            self.last_info = (text, WebcamView.color_for(status), now_str)
+        for sink in self.sinks:
+            try:
+                if hasattr(sink, "emit_batch"):
+                    sink.emit_batch(outcomes, summary_line)
+                else:
+                    for outcome in outcomes:
+                        sink.emit(outcome)
+            except Exception as e:
+                print(f"[{self.name}] sink {type(sink).__name__} error: {e}")
+        return outcomes
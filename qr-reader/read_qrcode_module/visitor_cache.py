@@ -0,0 +1,171 @@
+# Cross-station visitor progress, built from the openhouse/qrscan MQTT topic
+#
+#   python -m read_qrcode_module.visitor_cache --host 192.168.106.166 --port 8883 --booths Place1,Place2,Place3
+#
+# Every station publishes the same JSON as its qr_log.json entries
+# ({token, location, check, epoch}); VisitorCache folds those into one small
+# record per token: a bitmask of booths visited, of booths completed (checked
+# out) and of booths with an open check-in. Lookups are a dict get plus three
+# array reads, so a station can show "3/8 booths" without asking the cloud.
+import argparse
+import json
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+try:
+    from .station import TOPIC
+except ImportError:
+    from station import TOPIC
+
+MAX_BOOTHS = 64  # หนึ่ง bit ต่อ booth ใน uint64
+
+Progress = namedtuple("Progress", "visited completed open total last_epoch")
+
+
+def _bits(mask):
+    return bin(mask).count("1")  # int.bit_count() ต้องใช้ Python 3.10+ (Pi OS Bullseye = 3.9)
+
+
+class VisitorCache:
+    def __init__(self, booths=(), topic=TOPIC):
+        self.topic = topic
+        self.booths = {}         # location -> bit index
+        self.expected = set(booths)
+        for booth in booths:
+            self._booth_bit(booth)
+        self.index = {}          # token -> row
+        self.visited = array("Q")
+        self.completed = array("Q")
+        self.open = array("Q")
+        self.last_epoch = array("q")
+        self.messages = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _booth_bit(self, location):
+        bit = self.booths.get(location)
+        if bit is None:
+            if len(self.booths) >= MAX_BOOTHS:
+                return None
+            bit = self.booths[location] = len(self.booths)
+        return bit
+
+    @property
+    def total(self):
+        return len(self.expected) or len(self.booths)
+
+    # -------------------- INGEST --------------------
+    def feed(self, token, location, check, epoch):
+        with self._lock:
+            bit = self._booth_bit(location)
+            if bit is None:
+                self.errors += 1
+                return
+            row = self.index.get(token)
+            if row is None:
+                row = len(self.visited)
+                # เติม array ก่อนใส่ index: thread ที่อ่านอยู่จะไม่เห็น row ที่ยังไม่มีข้อมูล
+                self.visited.append(0)
+                self.completed.append(0)
+                self.open.append(0)
+                self.last_epoch.append(0)
+                self.index[token] = row
+            flag = 1 << bit
+            self.visited[row] |= flag
+            if check == 1:
+                self.open[row] |= flag
+            elif check == 0:
+                self.open[row] &= ~flag
+                self.completed[row] |= flag
+            self.last_epoch[row] = max(self.last_epoch[row], int(epoch))
+            self.messages += 1
+
+    def on_message(self, payload):
+        """payload เป็น JSON ของ scan หนึ่งครั้ง (bytes หรือ str); อย่างอื่น เช่น eventType register จะถูกข้าม"""
+        try:
+            msg = json.loads(payload)
+            token, location = msg["token"], msg["location"]
+            check, epoch = int(msg["check"]), int(msg["epoch"])
+        except (ValueError, KeyError, TypeError):
+            self.errors += 1
+            return
+        self.feed(token, location, check, epoch)
+
+    # -------------------- LOOKUP --------------------
+    def progress(self, token):
+        row = self.index.get(token)
+        if row is None:
+            return Progress(0, 0, 0, self.total, None)
+        return Progress(_bits(self.visited[row]), _bits(self.completed[row]), _bits(self.open[row]),
+                        self.total, self.last_epoch[row])
+
+    def booths_of(self, token, which="completed"):
+        row = self.index.get(token)
+        if row is None:
+            return []
+        mask = getattr(self, which)[row]
+        return [loc for loc, bit in self.booths.items() if mask >> bit & 1]
+
+    def summary(self, token):
+        """ข้อความสั้นสำหรับจอ TFT เช่น "3/8" (booth ที่ check out แล้ว / booth ทั้งหมด)"""
+        p = self.progress(token)
+        return f"{p.completed}/{p.total}"
+
+    def __len__(self):
+        return len(self.index)
+
+    # -------------------- BROKER --------------------
+    @classmethod
+    def mqtt(cls, host="localhost", port=1883, topic=TOPIC, booths=()):
+        """subscribe topic บน broker จริง (paho-mqtt) คืน (cache, client)"""
+        import paho.mqtt.client as mqtt
+        cache = cls(booths, topic)
+        client = mqtt.Client()
+        client.on_connect = lambda c, *_: c.subscribe(topic)
+        client.on_message = lambda _c, _u, message: cache.on_message(message.payload)
+        client.connect(host, port)
+        client.loop_start()
+        return cache, client
+
+
+class LocalBroker:
+    """
+    In-process stand-in for the MQTT broker: publish(topic, payload) fans out
+    to subscribe()d callbacks. publish has the same signature as a paho
+    client's, so it plugs straight into PublisherSink for tests and replay.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.published = 0
+
+    def subscribe(self, topic, callback):
+        self.subscribers.setdefault(topic, []).append(callback)
+
+    def publish(self, topic, payload):
+        self.published += 1
+        for callback in list(self.subscribers.get(topic, ())):
+            callback(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow visitor progress on the scan topic")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--topic", default=TOPIC)
+    parser.add_argument("--booths", default="", help="comma separated booth locations (default: every one seen)")
+    args = parser.parse_args()
+    booths = [b.strip() for b in args.booths.split(",") if b.strip()]
+    cache, client = VisitorCache.mqtt(args.host, args.port, args.topic, booths)
+    try:
+        while True:
+            time.sleep(10)
+            print(f"{len(cache)} visitors, {len(cache.booths)} booths, {cache.messages} scans, {cache.errors} bad")
+    except KeyboardInterrupt:
+        client.loop_stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,18 @@ const unsigned long debounceDelay = 200;
 
 uint16_t COLOR_BROWN, COLOR_ORANGE;
 
+// Binary display frames (read_qrcode_module/display_protocol.py):
+// A5 5A | ver | type | seq | len | payload[len] | crc16 (big-endian, CRC-16/CCITT-FALSE over ver..payload)
+const uint8_t FRAME_MAGIC0 = 0xA5;
+const uint8_t FRAME_MAGIC1 = 0x5A;
+const uint8_t FRAME_VERSION = 1;
+const uint8_t FRAME_STATUS = 0x01;
+const uint8_t FRAME_ACK = 0x03;
+const size_t FRAME_HEADER = 6;
+uint8_t frameBuf[FRAME_HEADER + 255 + 2];
+size_t frameLen = 0;
+String textLine;
+
 void drawCentered(const String& str, int32_t y, uint16_t fgcolor, uint16_t bgcolor = TFT_WHITE, uint8_t textSize = largeTextSize){
   tft.setTextSize(textSize);
   tft.setTextColor(fgcolor, bgcolor);
@@ -58,6 +70,76 @@ void drawStatus(int status) {
   }
 }
 
+uint16_t crc16(const uint8_t* data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+void sendAck(uint8_t seq) {
+  uint8_t out[FRAME_HEADER + 1 + 2] = {FRAME_MAGIC0, FRAME_MAGIC1, FRAME_VERSION, FRAME_ACK, seq, 1, seq};
+  uint16_t crc = crc16(out + 2, 5);
+  out[7] = crc >> 8;
+  out[8] = crc & 0xFF;
+  Serial.write(out, sizeof(out));
+}
+
+void showStatus(int status, const String& message) {
+  tft.fillScreen(TFT_WHITE);
+  drawStatus(status);
+  if (message.length()) {
+    drawCentered(message, 20, TFT_BLACK, TFT_WHITE, smallTextSize);
+  }
+}
+
+void handleFrame() {
+  uint8_t len = frameBuf[5];
+  uint16_t crc = ((uint16_t)frameBuf[FRAME_HEADER + len] << 8) | frameBuf[FRAME_HEADER + len + 1];
+  if (frameBuf[2] != FRAME_VERSION || crc16(frameBuf + 2, 4 + len) != crc) {
+    return;  // host ไม่ได้ ACK -> รู้ว่า frame นี้หาย
+  }
+  if (frameBuf[3] == FRAME_STATUS && len >= 1) {
+    String message;
+    for (size_t i = FRAME_HEADER + 1; i < FRAME_HEADER + len; i++) {
+      message += (char)frameBuf[i];
+    }
+    showStatus((int8_t)frameBuf[FRAME_HEADER], message);
+    sendAck(frameBuf[4]);  // ACK หลังวาดจอเสร็จ
+  }
+}
+
+// รับทั้ง frame แบบ binary และบรรทัด text แบบเดิม
+void feedSerial(uint8_t b) {
+  if (frameLen == 0) {
+    if (b == FRAME_MAGIC0 && textLine.length() == 0) {
+      frameBuf[frameLen++] = b;
+    } else if (b == '\n') {
+      textLine.trim();
+      printData(textLine);
+      textLine = "";
+      lastUpdate = millis();
+    } else {
+      textLine += (char)b;
+    }
+    return;
+  }
+  frameBuf[frameLen++] = b;
+  if (frameLen == 2 && b != FRAME_MAGIC1) {
+    frameLen = 0;
+    return;
+  }
+  if (frameLen >= FRAME_HEADER && frameLen == FRAME_HEADER + frameBuf[5] + 2) {
+    handleFrame();
+    frameLen = 0;
+    lastUpdate = millis();
+  }
+}
+
 void printData(String data) {
   tft.fillScreen(TFT_WHITE);
   int start = 0;
@@ -133,11 +215,8 @@ void loop() {
   }
   lastButtonState = reading;
 
-  if (Serial.available()) {
-    String serialInput = Serial.readStringUntil('\n');
-    serialInput.trim();
-    printData(serialInput);
-    lastUpdate = millis();
+  while (Serial.available()) {
+    feedSerial(Serial.read());
   }
   if (millis() - lastUpdate > idleTimeout) {
     tft.fillScreen(TFT_WHITE);
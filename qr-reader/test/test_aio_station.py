@@ -0,0 +1,58 @@
+import os
+import asyncio
+import select
+import tempfile
+import unittest
+import serial
+from read_qrcode_module.aio_station import AsyncBarcodeStation, AsyncSerialSink, SerialStream
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.replay import FakeInputDevice, ScanEvent, gen_token
+from read_qrcode_module.scan_logic import ScanGate
+from read_qrcode_module.station import StationRuntime, LogSink
+
+
+class AsyncStationTest(unittest.TestCase):
+    def setUp(self):
+        self.log_file = os.path.join(tempfile.gettempdir(), "test_aio_qr_log.json")
+        self.master, self.slave = os.openpty()  # pty แทน ESP32
+
+    def tearDown(self):
+        os.close(self.master)
+        os.close(self.slave)
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+
+    def make_station(self, scans):
+        reader = ReaderLogic("Booth", 5, 600)
+        reader.scan_history = {}
+        stream = SerialStream(serial.Serial(os.ttyname(self.slave), 115200, timeout=1))
+        station = StationRuntime("Booth", sinks=[AsyncSerialSink(stream), LogSink("Booth", self.log_file)],
+                                 reader=reader, gate=ScanGate(0))
+        return AsyncBarcodeStation(station, FakeInputDevice(scans, realtime=True), stream)
+
+    def read_master(self):
+        data = b""
+        while True:
+            if not select.select([self.master], [], [], 0.2)[0]:
+                return data.decode("utf-8").splitlines()
+            data += os.read(self.master, 4096)
+
+    # scan -> serial line ผ่าน event loop ทั้งหมด
+    def test1_scans_reach_serial(self):
+        scans = [ScanEvent(gen_token(), 0.05 * (i + 1)) for i in range(3)]
+        asyncio.run(self.make_station(scans).run())
+        lines = self.read_master()
+        self.assertEqual([line.split(",")[0] for line in lines], [s.token for s in scans])
+
+    # ESP32 ส่ง MODE:0 มาระหว่างรอ scan
+    def test2_mode_line(self):
+        token = gen_token()
+        aio = self.make_station([ScanEvent(token, 0.2)])
+        os.write(self.master, b"MODE:0\n")
+        asyncio.run(aio.run())
+        self.assertEqual(aio.station.check_mode, 0)
+        self.assertEqual(len(self.read_master()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from read_qrcode_module.autotune import (CaptureProfile, autotune, apply_profile, load_profile, save_profile,
+                                         paste_qr, qr_matrix)
+from read_qrcode_module.camera import DecodedCapture
+from read_qrcode_module.replay import gen_token
+from read_qrcode_module.scan_logic import opencv_decode
+
+
+class FakeCapture:
+    """กล้องปลอม: รองรับเฉพาะ modes ที่กำหนด (ขอโหมดอื่นจะได้โหมดแรกแทน เหมือน V4L2)"""
+
+    def __init__(self, width, height, fourcc, modes=((640, 480), (1280, 720))):
+        self.width, self.height = (width, height) if (width, height) in modes else modes[0]
+        self.fourcc = fourcc
+        self.rng = np.random.default_rng(0)
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+                cv2.CAP_PROP_FOURCC: cv2.VideoWriter_fourcc(*self.fourcc)}[prop]
+
+    def read(self):
+        frame = self.rng.normal(150, 8, (self.height, self.width, 3))
+        return True, np.clip(frame, 0, 255).astype(np.uint8)
+
+    def release(self):
+        pass
+
+
+class AutotuneTest(unittest.TestCase):
+    def test1_paste_qr_decodes(self):
+        token = gen_token()
+        frame = paste_qr(np.full((480, 640, 3), 150, dtype=np.uint8), qr_matrix(token))
+        self.assertEqual(opencv_decode(frame), [token.encode()])
+
+    def test2_pick_cheapest_passing(self):
+        opened = []
+
+        def open_capture(w, h, fourcc):
+            opened.append((w, h, fourcc))
+            return FakeCapture(w, h, fourcc)
+
+        best, results = autotune(open_capture, fourccs=("MJPG",), roi_ratios=(0.5, 0.7), upscales=(1.0,),
+                                 frames=6, decode=opencv_decode, log=lambda _: None)
+        self.assertEqual(len(opened), 3)
+        self.assertEqual({(p.width, p.height) for p in results}, {(640, 480), (1280, 720)})  # 800x600 ซ้ำ
+        self.assertGreaterEqual(best.hit_rate, 0.9)
+        passing = [p for p in results if p.hit_rate >= 0.9]
+        self.assertEqual(best.capture_ms + best.decode_ms, min(p.capture_ms + p.decode_ms for p in passing))
+
+    def test3_profile_round_trip(self):
+        profile = CaptureProfile(640, 480, "MJPG", 0.6, 1.0, 30.0, 2.5, 8.0, 1.0, "gray")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "capture_profile.json")
+            self.assertIsNone(load_profile(path))
+            save_profile(profile, path, [profile])
+            self.assertEqual(load_profile(path), profile)
+            # profile ก่อนมี camera_decode ถูกวัดแบบ BGR
+            with open(path, "w", encoding="UTF-8") as f:
+                json.dump({k: v for k, v in profile._asdict().items() if k != "camera_decode"}, f)
+            self.assertEqual(load_profile(path).camera_decode, "bgr")
+        cfg = apply_profile({"camera_width": 1280, "camera_height": 720, "camera_decode": "bgr"}, profile)
+        self.assertEqual((cfg["camera_width"], cfg["camera_fourcc"], cfg["roi_ratio"], cfg["camera_decode"]),
+                         (640, "MJPG", 0.6, "gray"))
+
+    def test4_measures_through_camera_decode(self):
+        def open_capture(w, h, fourcc):
+            return DecodedCapture(FakeCapture(w, h, fourcc), "gray")
+
+        best, results = autotune(open_capture, modes=((640, 480),), fourccs=("MJPG",), roi_ratios=(0.7,),
+                                 upscales=(1.0,), frames=6, decode=opencv_decode, camera_decode="gray",
+                                 log=lambda _: None)
+        self.assertEqual(best.camera_decode, "gray")
+        self.assertGreaterEqual(best.hit_rate, 0.9)  # probe วางบนเฟรม gray ที่ผ่าน decode_frame
+
+
+if __name__ == "__main__":
+    unittest.main()
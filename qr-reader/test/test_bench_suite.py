@@ -0,0 +1,30 @@
+import unittest
+from bench.bench_suite import run_suite, compare
+
+
+class BenchSuiteTest(unittest.TestCase):
+    def test1_quick_run(self):
+        report = run_suite(quick=True)
+        self.assertEqual(set(report["results"]), {
+            "log_write_records_per_s", "load_data_1k_ms", "read_qr_decisions_per_s",
+            "store_insert_rows_per_s", "store_lookup_per_s", "store_range_1h_ms", "store_checked_in_ms",
+            "visitor_ingest_msgs_per_s", "visitor_lookup_us", "visitor_bytes_per_token",
+            "decode_ms_per_frame", "decode_hit_rate",
+        })
+        self.assertEqual(report["results"]["decode_hit_rate"]["value"], 1.0)
+        self.assertEqual(compare(report, report), [])
+
+    def test2_compare(self):
+        def report(rate, ms):
+            return {"results": {
+                "read_qr_decisions_per_s": {"value": rate, "unit": "decisions/s", "higher_is_better": True},
+                "load_data_1k_ms": {"value": ms, "unit": "ms", "higher_is_better": False},
+            }}
+        base = report(1000.0, 10.0)
+        self.assertEqual(compare(report(900.0, 11.0), base, 0.25), [])
+        regressions = compare(report(500.0, 20.0), base, 0.25)
+        self.assertEqual([r[0] for r in regressions], ["read_qr_decisions_per_s", "load_data_1k_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
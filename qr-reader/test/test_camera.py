@@ -0,0 +1,40 @@
+import unittest
+import cv2
+import numpy as np
+from read_qrcode_module.autotune import paste_qr, qr_matrix
+from read_qrcode_module.camera import Camera, decode_mjpeg
+from read_qrcode_module.replay import gen_token
+from read_qrcode_module.scan_logic import opencv_decode
+
+
+def camera_without_device(decode):
+    cam = Camera.__new__(Camera)  # ทดสอบเฉพาะส่วน decode ไม่เปิดกล้องจริง
+    cam.decode = decode
+    return cam
+
+
+class CameraDecodeTest(unittest.TestCase):
+    def setUp(self):
+        self.token = gen_token()
+        frame = paste_qr(np.full((720, 1280, 3), 160, dtype=np.uint8), qr_matrix(self.token))
+        self.bgr = frame
+        self.jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])[1]
+
+    def test1_luma_decode(self):
+        self.assertEqual(decode_mjpeg(self.jpeg, "bgr").shape, (720, 1280, 3))
+        gray = decode_mjpeg(self.jpeg, "gray")
+        self.assertEqual(gray.shape, (720, 1280))
+        self.assertEqual(decode_mjpeg(self.jpeg, "gray2").shape, (360, 640))
+        self.assertEqual(opencv_decode(gray), [self.token.encode()])
+        self.assertIsNone(decode_mjpeg(np.zeros(100, dtype=np.uint8), "gray"))
+
+    def test2_raw_buffer_and_fallback(self):
+        raw = self.jpeg.reshape(1, -1)  # Mat 1xN จาก V4L2 เมื่อปิด CONVERT_RGB
+        self.assertEqual(camera_without_device("gray")._decode(raw).shape, (720, 1280))
+        # backend ที่ decode เป็น BGR ให้อยู่แล้ว
+        self.assertEqual(camera_without_device("gray2")._decode(self.bgr).shape, (360, 640))
+        self.assertIs(camera_without_device("bgr")._decode(self.bgr), self.bgr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+from bench.bench_decoders import logo_qr, painted_logo, place
+from read_qrcode_module.decoders import WECHAT_OK, Cascade, get_decoder, parse_spec
+from read_qrcode_module.scan_logic import opencv_decode
+
+
+class DecodersTest(unittest.TestCase):
+    def test1_spec(self):
+        self.assertIs(get_decoder("opencv"), opencv_decode)
+        cascade = get_decoder("opencv, aruco,opencv")
+        self.assertIsInstance(cascade, Cascade)
+        self.assertEqual(cascade.names, ["opencv", "aruco"])
+        if not WECHAT_OK:  # backend ที่ไม่มีในเครื่องถูกข้าม
+            self.assertEqual(parse_spec("opencv,wechat"), ["opencv"])
+        with self.assertRaises(ValueError):
+            parse_spec("zxing")
+
+    def test2_cascade_falls_through(self):
+        rng = np.random.default_rng(0)
+        token = "58mxexBH0YJYeHoM-8dajz"  # token ตายตัว: opencv อ่าน logo QR แบบสุ่มไม่ได้ทุกตัว (~75%)
+        frame = place(logo_qr(token, painted_logo(rng)), rng)
+        cascade = Cascade(["opencv"])
+        cascade.backends.insert(0, lambda img: [])  # backend แรกอ่านไม่ได้
+        cascade.names.insert(0, "miss")
+        cascade.hits["miss"] = 0
+        self.assertEqual(cascade(frame), [token.encode()])
+        self.assertEqual((cascade.last, cascade.hits), ("opencv", {"miss": 0, "opencv": 1}))
+        self.assertEqual(cascade(np.full((100, 100), 255, np.uint8)), [])
+        self.assertIsNone(cascade.last)
+
+
+if __name__ == "__main__":
+    unittest.main()
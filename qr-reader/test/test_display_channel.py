@@ -0,0 +1,66 @@
+import os
+import select
+import time
+import unittest
+import serial
+from read_qrcode_module.display_channel import DisplayChannel
+
+
+class DisplayChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.master, self.slave = os.openpty()  # pty แทน ESP32
+        self.ser = serial.Serial(os.ttyname(self.slave), 115200, timeout=0.2)
+
+    def tearDown(self):
+        self.ser.close()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def open_pty(self, baudrate, timeout, port):
+        return self.ser
+
+    def read_master(self):
+        data = b""
+        while select.select([self.master], [], [], 0.3)[0]:
+            data += os.read(self.master, 4096)
+        return data.decode("utf-8").splitlines()
+
+    # ส่งหลายบรรทัดก่อนต่อได้ -> เหลือแค่สถานะล่าสุด
+    def test1_coalesce(self):
+        channel = DisplayChannel(open_serial=self.open_pty)
+        for i in range(5):
+            channel.send(f"token{i},0,now\n")
+        channel.start()
+        self.assertTrue(channel.flush(2.0))
+        channel.stop()
+        self.assertEqual(self.read_master(), ["token4,0,now"])
+        self.assertEqual(channel.dropped, 4)
+
+    def test2_mode_event(self):
+        channel = DisplayChannel(open_serial=self.open_pty).start()
+        os.write(self.master, b"MODE:0\n")
+        self.assertTrue(channel.mode_event.wait(2.0))
+        self.assertEqual(channel.poll_mode(1), 0)
+        channel.stop()
+
+    # port ยังไม่มี: send() ไม่ block และต่อใหม่เองเมื่อ port กลับมา
+    def test3_background_reconnect(self):
+        attempts = []
+
+        def flaky_open(baudrate, timeout, port):
+            attempts.append(time.monotonic())
+            return None if len(attempts) < 3 else self.open_pty(baudrate, timeout, port)
+
+        channel = DisplayChannel(open_serial=flaky_open, min_backoff=0.05).start()
+        t0 = time.perf_counter()
+        for i in range(100):
+            channel.send(f"token{i},0,now\n")
+        self.assertLess(time.perf_counter() - t0, 0.1)
+        self.assertTrue(channel.flush(2.0))
+        channel.stop()
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(self.read_master(), ["token99,0,now"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
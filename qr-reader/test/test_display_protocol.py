@@ -0,0 +1,61 @@
+import os
+import select
+import unittest
+import serial
+from read_qrcode_module.display_channel import DisplayChannel
+from read_qrcode_module.display_protocol import (FrameDecoder, BinaryProtocol, FRAME_STATUS, FRAME_ACK,
+                                                 encode_frame, encode_status, decode_status, crc16_ccitt)
+
+
+class DisplayProtocolTest(unittest.TestCase):
+    def test1_crc(self):
+        self.assertEqual(crc16_ccitt(b"123456789"), 0x29B1)  # CRC-16/CCITT-FALSE check value
+
+    def test2_roundtrip_and_resync(self):
+        frame = encode_status(7, 1, "10:15:00 AM")
+        corrupt = bytearray(encode_status(8, 0, "x"))
+        corrupt[-1] ^= 0xFF
+        decoder = FrameDecoder()
+        items = []
+        for b in b"MODE:0\n" + bytes(corrupt) + frame[:5]:
+            items += decoder.feed(bytes([b]))
+        items += decoder.feed(frame[5:] + b"MODE:1\n")
+        self.assertEqual(items[0], "MODE:0")
+        self.assertEqual(items[1].type, FRAME_STATUS)
+        self.assertEqual(items[1].seq, 7)
+        self.assertEqual(decode_status(items[1].payload), (1, "10:15:00 AM"))
+        self.assertEqual(items[2], "MODE:1")
+        self.assertEqual(decoder.errors, 1)
+
+    def test3_smaller_than_text(self):
+        line = "AbCdEfGhIjKlMnOpQrStUv,1,10:15:00 AM\n"
+        self.assertLess(len(BinaryProtocol().encode(line)), len(line))
+
+    # fake ESP32 บน pty ส่ง ACK กลับ -> ได้ round-trip ต่อ frame
+    def test4_ack_round_trip(self):
+        master, slave = os.openpty()
+        ser = serial.Serial(os.ttyname(slave), 115200, timeout=0.2)
+        protocol = BinaryProtocol()
+        channel = DisplayChannel(ser, protocol=protocol).start()
+        try:
+            channel.send("AbCdEfGhIjKlMnOpQrStUv,1,10:15:00 AM\n")
+            decoder = FrameDecoder()
+            frames = []
+            while not frames and select.select([master], [], [], 2.0)[0]:
+                frames = decoder.feed(os.read(master, 256))
+            self.assertEqual(decode_status(frames[0].payload), (1, "10:15:00 AM"))
+            os.write(master, encode_frame(FRAME_ACK, frames[0].seq, bytes([frames[0].seq])))
+            for _ in range(100):
+                if protocol.acked:
+                    break
+                select.select([], [], [], 0.01)
+            self.assertEqual(protocol.acked, 1)
+            self.assertEqual(len(protocol.rtt_ms), 1)
+        finally:
+            channel.stop()
+            os.close(master)
+            os.close(slave)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
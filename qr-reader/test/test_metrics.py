@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+import numpy as np
+from read_qrcode_module.metrics import serve_station_metrics
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.replay import gen_token
+from read_qrcode_module.scan_logic import ScanGate, opencv_decode
+from read_qrcode_module.station import StationRuntime, LogSink
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.log_file = os.path.join(tempfile.gettempdir(), "test_metrics_qr_log.json")
+
+    def tearDown(self):
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+
+    def test1_scrape(self):
+        reader = ReaderLogic("Booth", 5, 600, log_file=self.log_file)
+        station = StationRuntime("Booth", sinks=[LogSink("Booth", self.log_file)], reader=reader,
+                                 gate=ScanGate(0), decode=opencv_decode)
+        token = gen_token()
+        for t in (token, token, gen_token(), "not-a-token"):
+            station.step_token(t)
+        station.step_frame(np.full((480, 640, 3), 200, dtype=np.uint8))
+
+        server = serve_station_metrics(station, 0, "127.0.0.1")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=2) as resp:
+                body = resp.read().decode("utf-8")
+        finally:
+            server.stop()
+        # check_mode=1 (ค่าเริ่มต้นของ ESP32) บังคับเป็น check in ทุกครั้ง แต่ log เฉพาะ scan ที่มี qr_data
+        self.assertIn('station_scans_total{station="Booth",status="checkin"} 3', body)
+        self.assertIn('station_scans_total{station="Booth",status="invalid"} 1', body)
+        self.assertIn('station_log_write_latency_ms_count{station="Booth"} 2', body)
+        self.assertIn('station_decode_latency_ms_count{station="Booth"} 1', body)
+        self.assertIn('station_decode_latency_ms_bucket{station="Booth",le="+Inf"} 1', body)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
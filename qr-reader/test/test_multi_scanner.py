@@ -0,0 +1,72 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from read_qrcode_module.multi_scanner import MultiScannerHost, ScannerConfig, load_scanner_configs
+from read_qrcode_module.replay import FakeInputDevice, FakeSerial, ReplayClock, synthetic_scans
+from read_qrcode_module.station import SerialDisplaySink, LogSink, DEV_PATH
+
+
+class MultiScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.log_file = os.path.join(tempfile.gettempdir(), "test_multi_qr_log.json")
+        self.serials = {}
+
+    def tearDown(self):
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+
+    def make_sinks(self, cfg, reader):
+        reader.scan_history = {}
+        self.serials[cfg.name] = FakeSerial(ReplayClock())
+        return [SerialDisplaySink(self.serials[cfg.name]), LogSink(cfg.location, self.log_file)]
+
+    # scanner แต่ละตัวมี ReaderLogic/lockout ของตัวเอง
+    def test1_per_scanner_state(self):
+        scans = {f"/dev/fake{i}": synthetic_scans(3, rate=100, unique=3, seed=i) for i in range(3)}
+        devices = {path: FakeInputDevice(s) for path, s in scans.items()}
+        scanners = [ScannerConfig(f"Booth{i}", f"/dev/fake{i}", f"Place{i}", None) for i in range(3)]
+        host = MultiScannerHost(scanners, discover=lambda pattern: [pattern] if pattern in devices else [],
+                                open_device=devices.__getitem__, make_sinks=self.make_sinks, verbose=False)
+        for cfg in scanners:
+            host.station_for(cfg).gate.cooldown = 0
+
+        asyncio.run(host.run(until_idle=True))
+
+        for i, cfg in enumerate(scanners):
+            writes = [line.decode("utf-8") for _, line in self.serials[cfg.name].writes]
+            self.assertEqual([w.split(",")[0] for w in writes], [s.token for s in scans[f"/dev/fake{i}"]])
+            self.assertEqual(host.stations[cfg.name].reader.location, f"Place{i}")
+        self.assertEqual(host.tasks, {})
+
+    def test2_unmatched_device(self):
+        host = MultiScannerHost([ScannerConfig("Booth", "/dev/none", "Place", None)],
+                                discover=lambda pattern: [], make_sinks=self.make_sinks, verbose=False)
+        asyncio.run(host.run(until_idle=True))
+        self.assertEqual(host.stations, {})
+
+    # glob ที่ตรงหลาย device (keyboard ธรรมดา + scanner) ต้องไม่เดา; ค่าเริ่มต้นคือ DEV_PATH ตายตัว
+    def test3_ambiguous_glob(self):
+        kbds = ["/dev/input/by-id/usb-Dell_KB216-event-kbd", DEV_PATH]
+        opened = []
+        host = MultiScannerHost([ScannerConfig("Booth", "/dev/input/by-id/*-event-kbd", "Place", None)],
+                                discover=lambda pattern: kbds if "*" in pattern else [],
+                                open_device=opened.append, make_sinks=self.make_sinks, verbose=False)
+        asyncio.run(host.run(until_idle=True))
+        self.assertEqual((opened, host.stations, host.ambiguous), ([], {}, {"Booth"}))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "config.ini")
+            with open(path, "w") as f:
+                f.write("[Device]\nLocation = Place1\nScanCooldown = 5\nStayDuration = 600\n"
+                        "[Scanner:Booth2]\nLocation = Place2\n")
+            scanners, _, _ = load_scanner_configs(path)
+            self.assertEqual([cfg.device for cfg in scanners], [DEV_PATH])
+            with open(path, "w") as f:
+                f.write("[Device]\nLocation = Place1\nScanCooldown = 5\nStayDuration = 600\n")
+            scanners, _, _ = load_scanner_configs(path)
+            self.assertEqual([(cfg.name, cfg.device) for cfg in scanners], [("default", DEV_PATH)])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
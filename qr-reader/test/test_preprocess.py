@@ -0,0 +1,39 @@
+import unittest
+import cv2
+import numpy as np
+from read_qrcode_module.preprocess import RoiPreprocessor
+
+
+class PreprocessTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.roi = rng.integers(0, 256, size=(120, 120, 3), dtype=np.uint8)
+        self.pre = RoiPreprocessor()
+
+    # ผลลัพธ์ต้องเหมือนกับ pipeline เดิม
+    def test1_matches_legacy(self):
+        candidates = self.pre.process(self.roi)
+        gray = cv2.cvtColor(self.roi, cv2.COLOR_BGR2GRAY)
+        gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+        th2 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        self.assertEqual(len(candidates), 6)
+        self.assertTrue(np.array_equal(candidates[0], gray))
+        self.assertTrue(np.array_equal(candidates[2], th2))
+        self.assertEqual(candidates[3].shape, (180, 180))
+
+    # ใช้ buffer เดิมซ้ำ จนกว่าขนาด ROI จะเปลี่ยน
+    def test2_reuses_buffers(self):
+        first = [img.ctypes.data for img in self.pre.process(self.roi)]
+        second = [img.ctypes.data for img in self.pre.process(self.roi)]
+        self.assertEqual(first, second)
+        self.assertEqual(self.pre.allocations, 1)
+
+        self.pre.process(self.roi[:100, :100])
+        self.assertEqual(self.pre.allocations, 2)
+
+    def test3_empty_roi(self):
+        self.assertEqual(self.pre.process(self.roi[:0, :0]), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
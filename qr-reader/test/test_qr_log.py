@@ -30,7 +30,7 @@ class QRLogTest(unittest.TestCase):
             all_logs = json.load(log_file)
             self.assertEqual(len(all_logs), 800)
 
-        reader = ReaderLogic(self.test_location, 10, 300)
+        reader = ReaderLogic(self.test_location, 10, 300, log_file=self.test_log)
         self.assertEqual(len(reader.scan_history), 800)
 
 
@@ -0,0 +1,46 @@
+import unittest
+from queue import Queue
+from read_qrcode_module.barcode_input import evdev_reader
+from read_qrcode_module.replay import (FakeInputDevice, FakeSerial, ScanEvent, ReplayClock,
+                                       synthetic_scans, replay_bcode)
+from read_qrcode_module.reader_logic import poll_mode_from_serial
+
+
+class ReplayTest(unittest.TestCase):
+    # keystroke ปลอมต้องถอดกลับเป็น token เดิม (รวมตัวพิมพ์ใหญ่และ _)
+    def test1_fake_scanner_roundtrip(self):
+        tokens = ["Ab_9-zZ0qwertyuiopASDF", "0123456789abcdefghijkl"]
+        q = Queue()
+        evdev_reader(FakeInputDevice([ScanEvent(t, i) for i, t in enumerate(tokens)]), q)
+        self.assertEqual([q.get_nowait(), q.get_nowait()], tokens)
+
+    def test2_fake_serial_mode(self):
+        clock = ReplayClock()
+        ser = FakeSerial(clock, incoming=[(0.0, "MODE:0")])
+        self.assertEqual(poll_mode_from_serial(ser, 1), 0)
+        ser.write(b"x\n")
+        self.assertEqual(ser.writes[0][1], b"x\n")
+
+    def test3_replay_bcode(self):
+        scans = synthetic_scans(5, rate=0.1, unique=5)
+        stats, ser = replay_bcode(scans, send_interval=2)
+        report = stats.report()
+        self.assertEqual(report["scans"], 5)
+        self.assertEqual(len(ser.writes), 5)
+        for (_, line), scan in zip(ser.writes, scans):
+            self.assertTrue(line.decode("utf-8").startswith(f"{scan.token},1,"))
+        self.assertIsNotNone(report["e2e_ms"]["p50"])
+
+
+    # visitor ต่อแถวกัน: cooldown ต่อ token ต้องได้ scans/min มากกว่า lockout ทั้งสถานีแบบเดิม
+    def test4_token_lockout_throughput(self):
+        scans = synthetic_scans(30, rate=2.0, unique=30)
+        before = replay_bcode(scans, lockout="global")[0].report()
+        after = replay_bcode(scans, lockout="token")[0].report()
+        self.assertEqual((before["scans"], after["scans"]), (30, 30))
+        self.assertGreater(after["scans_per_min"], before["scans_per_min"] * 2)
+        self.assertLess(after["e2e_ms"]["p95"], before["e2e_ms"]["p95"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
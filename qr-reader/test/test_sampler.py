@@ -0,0 +1,57 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from read_qrcode_module.sampler import StackSampler
+
+
+def busy_decode_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(2000))
+
+
+class SamplerTest(unittest.TestCase):
+    def test1_profile_busy_thread(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_decode_loop, args=(stop,), name="worker", daemon=True)
+        worker.start()
+        with tempfile.TemporaryDirectory() as tmp:
+            sampler = StackSampler(tmp, hz=200, name="test")
+            self.assertTrue(sampler.start(0.3))
+            self.assertFalse(sampler.start(0.3))  # กำลังทำงานอยู่
+            time.sleep(0.5)
+            paths = sampler.stop()
+            stop.set()
+            worker.join()
+
+            self.assertFalse(sampler.running)
+            self.assertGreater(sampler.samples, 10)
+            hot = [label for label, _, _ in sampler.hot_functions()]
+            self.assertTrue(any(label.startswith("busy_decode_loop") or "<genexpr>" in label for label in hot))
+
+            with open(paths["folded"], encoding="UTF-8") as f:
+                folded = f.read()
+            self.assertIn("worker;", folded)
+            self.assertIn("busy_decode_loop (test_sampler.py:", folded)
+            with open(paths["speedscope"], encoding="UTF-8") as f:
+                doc = json.load(f)
+            self.assertIn("worker", [p["name"] for p in doc["profiles"]])
+            for prof in doc["profiles"]:
+                self.assertEqual(len(prof["samples"]), len(prof["weights"]))
+                for stack in prof["samples"]:
+                    self.assertTrue(all(0 <= i < len(doc["shared"]["frames"]) for i in stack))
+
+    def test2_stop_before_deadline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sampler = StackSampler(tmp, hz=100)
+            sampler.start(None)
+            time.sleep(0.05)
+            t0 = time.monotonic()
+            paths = sampler.stop()
+            self.assertLess(time.monotonic() - t0, 1.0)
+            self.assertTrue(paths and paths["hot"].startswith(tmp))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.replay import gen_token
+from read_qrcode_module.scan_logic import ScanGate
+from read_qrcode_module.scan_store import ScanStore, open_store
+from read_qrcode_module.station import StationRuntime, LogSink
+
+
+class ScanStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "qr_log.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test1_batched_flush(self):
+        store = ScanStore(self.path, flush_interval=60, batch_size=3)
+        a, b = gen_token(), gen_token()
+        store.add(a, "Place1", 1, 100)
+        store.add(b, "Place1", 1, 101)
+        self.assertEqual(store.flushes, 0)  # ยังอยู่ใน buffer
+        store.add(a, "Place1", 0, 200)
+        self.assertEqual(store.flushes, 1)  # ครบ batch_size -> transaction เดียว
+        store.add(b, "Place2", 1, 300)
+        self.assertEqual(store.last_scan(b), ("Place2", 1, 300))  # query flush buffer ก่อนอ่าน
+        self.assertEqual(store.last_scan(b, "Place1"), ("Place1", 1, 101))
+        self.assertIsNone(store.last_scan(gen_token()))
+        self.assertEqual(store.count(), 4)
+        store.close()
+
+        reopened = ScanStore(self.path)
+        self.assertEqual(reopened.scans_between("Place1", 100, 200), [(a, 1, 100), (b, 1, 101)])
+        self.assertEqual(reopened.checked_in("Place1"), {b: 101})  # a check out แล้ว
+        reopened.close()
+
+    def test2_timer_flush(self):
+        store = ScanStore(self.path, flush_interval=0.05)
+        store.add(gen_token(), "Place1", 1, 100)
+        timer = store._timer
+        timer.join(1.0)
+        self.assertEqual(store.flushes, 1)
+        store.close()
+
+    def test3_reader_logic_and_log_sink(self):
+        log_file = os.path.join(self.tmp.name, "qr_log.json")
+        store = ScanStore(self.path)
+        reader = ReaderLogic("Booth", 5, 600, log_file=log_file, store=store)
+        station = StationRuntime("Booth", sinks=[LogSink("Booth", log_file, store=store)], reader=reader,
+                                 gate=ScanGate(0))
+        token = gen_token()
+        station.step_token(token)
+        station.stop()
+        self.assertEqual(store.last_scan(token, "Booth")[1], 1)
+        self.assertEqual(reader.last_scan(token)[1], 1)
+        # สถานีเริ่มใหม่: scan_history มาจาก store ไม่ต้องอ่าน qr_log.json
+        os.remove(log_file)
+        self.assertIn(token, ReaderLogic("Booth", 5, 600, log_file=log_file, store=store).scan_history)
+        store.close()
+
+    def test4_import_json(self):
+        log_file = os.path.join(self.tmp.name, "qr_log.json")
+        token = gen_token()
+        with open(log_file, "w", encoding="UTF-8") as f:
+            json.dump([{"token": token, "location": "Place1", "check": 1, "epoch": 100}, {}], f)
+        store = open_store(self.path, log_file)
+        self.assertEqual(store.count(), 1)
+        store.close()
+        store = open_store(self.path, log_file)  # ไม่นำเข้าซ้ำ
+        self.assertEqual(store.count(), 1)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+import tempfile
+import unittest
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.replay import FakeSerial, ReplayClock, ScanEvent, synthetic_frames, synthetic_scans, gen_token
+from read_qrcode_module.scan_logic import ScanGate, TokenDebounce, opencv_decode_multi
+from read_qrcode_module.station import StationRuntime, SyntheticSource, SerialDisplaySink, LogSink
+
+
+class StationRuntimeTest(unittest.TestCase):
+    def setUp(self):
+        self.log_files = []
+
+    def tearDown(self):
+        for f in self.log_files:
+            if os.path.exists(f):
+                os.remove(f)
+
+    def make_station(self, location, scans):
+        log_file = os.path.join(tempfile.gettempdir(), f"test_station_{location}.json")
+        self.log_files.append(log_file)
+        reader = ReaderLogic(location, 5, 600)
+        reader.scan_history = {}
+        ser = FakeSerial(ReplayClock())
+        station = StationRuntime(location, SyntheticSource(scans, realtime=False),
+                                 sinks=[SerialDisplaySink(ser), LogSink(location, log_file)],
+                                 reader=reader, gate=ScanGate(0))
+        return station, ser
+
+    # หลายสถานีแบบ headless ใน process เดียว
+    def test1_virtual_stations(self):
+        stations = [self.make_station(f"Booth{i}", synthetic_scans(5, unique=5, seed=i)) for i in range(3)]
+        for station, _ in stations:
+            station.start()
+        deadline = time.time() + 5
+        while any(s.running for s, _ in stations) and time.time() < deadline:
+            time.sleep(0.01)
+        for station, ser in stations:
+            station.stop()
+            self.assertEqual(len(ser.writes), 5)
+            self.assertEqual(len(station.reader.scan_history), 5)
+
+    def test2_malformed_token(self):
+        station, ser = self.make_station("Booth", [])
+        outcome = station.step_token("not-a-token")
+        self.assertIsNone(outcome.result)
+        self.assertEqual(ser.writes, [])
+
+
+    # cooldown ต่อ token: token เดิมถูกข้าม token อื่นผ่านทันที จอแสดงผลไม่บล็อกการสแกน
+    def test3_token_debounce(self):
+        station, ser = self.make_station("Booth", [])
+        now = [1000.0]
+        station.clock = station.reader.clock = lambda: now[0]
+        station.gate = TokenDebounce(5, display_hold=3)
+        a, b = gen_token(), gen_token()
+        self.assertIsNotNone(station.step_token(a).result)
+        self.assertIsNone(station.step_token(a).result)  # ยังอยู่ใน cooldown
+        self.assertIsNotNone(station.step_token(b).result)
+        self.assertTrue(station.gate.showing(now[0]) and station.gate.ready(now[0]))
+        now[0] += 6  # เลย cooldown ของ ReaderLogic ด้วย
+        self.assertIsNotNone(station.step_token(a).result)
+        self.assertEqual((len(ser.writes), station.debounced), (3, 1))
+        self.assertEqual(list(station.gate.recent), [a])  # b หมด cooldown แล้วถูก prune
+
+    # group check-in: ทุก QR ในเฟรมผ่าน ReaderLogic ชุดเดียว เขียน log ครั้งเดียว จอได้บรรทัดสรุปบรรทัดเดียว
+    def test4_group_checkin(self):
+        station, ser = self.make_station("Booth", [])
+        station.multi, station.decode = "frame", opencv_decode_multi
+        station.gate = TokenDebounce(5, display_hold=0)
+        # token ตายตัว: opencv multi-decode อ่าน QR สุ่มพลาดได้บางชุด (~2%)
+        tokens = ["jx0gIwksgQh57tecnjXCOE", "_FNLXO5g6SVFIZRODy0ov9", "PF-I3kR0FEocpdZ9ouz0jX"]
+        frame = next(synthetic_frames([ScanEvent(t, 0.0) for t in tokens], group=3)).image
+        outcomes = station.step_group(frame)
+        self.assertEqual(sorted(o.token for o in outcomes), sorted(tokens))
+        self.assertTrue(all(o.result["status"] == 1 for o in outcomes))
+        self.assertEqual(len(ser.writes), 1)
+        self.assertTrue(ser.writes[0][1].startswith(b"GROUP,1,3 in "))
+        with open(self.log_files[-1], encoding="utf-8") as f:
+            self.assertEqual(sorted(e["token"] for e in json.load(f)), sorted(tokens))
+        self.assertEqual(station.step_group(frame), [])  # ยังถือ QR เดิมอยู่
+        self.assertEqual(station.debounced, 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+from read_qrcode_module.reader_logic import ReaderLogic
+from read_qrcode_module.replay import gen_token
+from read_qrcode_module.scan_logic import ScanGate
+from read_qrcode_module.station import StationRuntime, PublisherSink, TOPIC
+from read_qrcode_module.visitor_cache import VisitorCache, LocalBroker, MAX_BOOTHS
+
+
+class VisitorCacheTest(unittest.TestCase):
+    def test1_progress(self):
+        cache = VisitorCache(["Place1", "Place2", "Place3"])
+        token = gen_token()
+        cache.on_message(json.dumps({"token": token, "location": "Place1", "check": 1, "epoch": 100}))
+        cache.on_message(json.dumps({"token": token, "location": "Place1", "check": 0, "epoch": 800}).encode())
+        cache.on_message(json.dumps({"token": token, "location": "Place2", "check": 1, "epoch": 900}))
+        self.assertEqual(cache.progress(token), (2, 1, 1, 3, 900))
+        self.assertEqual(cache.summary(token), "1/3")
+        self.assertEqual(cache.booths_of(token, "open"), ["Place2"])
+        self.assertEqual(cache.progress(gen_token()), (0, 0, 0, 3, None))
+
+        cache.on_message(json.dumps({"eventType": "register", "token": token}))
+        cache.on_message(b"not json")
+        self.assertEqual((cache.messages, cache.errors), (3, 2))
+
+    def test2_stations_through_local_broker(self):
+        broker = LocalBroker()
+        cache = VisitorCache()
+        broker.subscribe(TOPIC, cache.on_message)
+        token = gen_token()
+        with tempfile.TemporaryDirectory() as tmp:
+            for location in ("Booth1", "Booth2"):
+                reader = ReaderLogic(location, 5, 600, log_file=os.path.join(tmp, f"{location}.json"))
+                station = StationRuntime(location, sinks=[PublisherSink(location, broker.publish)],
+                                         reader=reader, gate=ScanGate(0))
+                station.step_token(token)
+        self.assertEqual(broker.published, 2)
+        self.assertEqual(cache.progress(token).open, 2)
+        self.assertEqual(cache.summary(token), "0/2")
+
+    def test3_progress_wide_masks(self):
+        # ครบ MAX_BOOTHS (บิตบนสุดของ uint64 ด้วย) นับบิตต้องได้ทุก Python ที่รองรับ (3.8+)
+        booths = [f"Booth{i}" for i in range(MAX_BOOTHS)]
+        cache = VisitorCache(booths)
+        token = gen_token()
+        for epoch, location in enumerate(booths):
+            cache.feed(token, location, 1, 1000 + epoch)
+            if epoch % 2:
+                cache.feed(token, location, 0, 2000 + epoch)
+        self.assertEqual(cache.progress(token), (64, 32, 32, 64, 2063))
+        self.assertEqual(cache.summary(token), "32/64")
+        self.assertEqual(len(cache.booths_of(token, "open")), 32)
+
+
+if __name__ == "__main__":
+    unittest.main()